@@ -7,9 +7,13 @@
 ################################################################################
 
 # import numpy
-from numpy import dot, array, sum, zeros, outer, reshape
+import numpy as np
+from numpy import array, zeros, reshape
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+from .Membership import membershipDegrees
+
 ################################################################################
 # Fuzzy C-Means class
 ################################################################################
@@ -35,9 +39,25 @@ class FuzzyCMeans(object):
 
     Notice, however, that *no checking* is done. If your algorithm seems to be
     behaving strangely, try to check these conditions.
+
+    The memberships are computed with broadcasting, a chunk of examples at a
+    time, in buffers that are reused across the iterations: the memory used
+    besides the data and the membership matrix depends only on the size of
+    the chunks. The squared distances of examples with more than one dimension
+    are expanded as ``|x|^2 - 2 x.c + |c|^2``, so that the products of the
+    examples and the centers are computed by BLAS and the differences of
+    every example from every center are never held in memory. With more
+    workers, the examples are split in contiguous shards, one per worker
+    thread: every worker computes the memberships of its shard in place and
+    the partial sums of the centers, which are added in the order of the
+    shards at every step. The threads share the data and
+    the membership matrix, and numpy releases the interpreter lock during
+    the array operations, so that the shards are processed on different
+    cores.
     '''
 
-    def __init__(self, training_set, initial_conditions, m=2.):
+    def __init__(self, training_set, initial_conditions, m=2., dtype=np.float64, chunk=65536, weights=None,
+                 centers=None, workers=1):
         '''
         Initializes the algorithm.
 
@@ -57,19 +77,54 @@ class FuzzyCMeans(object):
             This is the aggregation value. The bigger it is, the smoother will
             be the classification. Please, consult the bibliography about the
             subject. ``m`` must be bigger than 1. Its default value is 2
+          dtype
+            The floating point type of the data and of the memberships
+            (``float64`` or ``float32``). The sums over the examples are always
+            accumulated in ``float64``.
+          chunk
+            The number of examples whose memberships are computed at a time.
+          weights
+            The weight of each example in the computation of the centers, for
+            example the number of times that a value occurs in the data. If
+            None, all the examples weigh one.
+          centers
+            The initial centers, one per line. If given, the initial
+            conditions are ignored: the memberships start at zero and are
+            computed from the centers by the first step.
+          workers
+            The number of threads that compute the memberships and the
+            centers. Every thread gets at least a chunk of examples.
         '''
-        self.__x = array(training_set)
-        self.__mu = array(initial_conditions)
+        self.__x = np.asarray(training_set, dtype=dtype)
+        self.__mu = None if centers is not None else array(initial_conditions, dtype=dtype)
+        self.__w = None if weights is None else np.asarray(weights, dtype=np.float64).reshape(-1, 1)
         self.m = m
         '''The fuzzyness coefficient. Must be bigger than 1, the closest it is
         to 1, the smoother the membership curves will be.'''
-        self.__c = self.centers()
+        self.chunk = chunk
+        '''The number of examples whose memberships are computed at a time.'''
+        self.__norms = None if self.__x.shape[1] == 1 else np.einsum('ij,ij->i', self.__x, self.__x)[:, None]
+        self.__buffers = {}
+        self.workers = max(1, min(workers, len(self.__x) // chunk))
+        '''The number of threads that compute the memberships and the centers.'''
+        self.__pool = None
+        self.iterations = 0
+        '''The number of steps run by the last call of the algorithm.'''
+        self.objective = None
+        '''The objective function J_m of the memberships computed in the last
+        step, that is the sum of ``mu ** m`` times the squared distance of each
+        example from each center (weighted by the weights of the examples).'''
+        if centers is None:
+            self.__c = self.centers()
+        else:
+            self.__c = array(centers, dtype=dtype).reshape(-1, self.__x.shape[1])
+            self.__mu = zeros((len(self.__x), len(self.__c)), dtype=dtype)
 
     def __getc(self):
         return self.__c
 
     def __setc(self, c):
-        self.__c = array(reshape(c, self.__c.shape))
+        self.__c = array(reshape(c, self.__c.shape), dtype=self.__x.dtype)
 
     c = property(__getc, __setc)
     '''A ``numpy`` array containing the centers of the classes in the algorithm.
@@ -108,9 +163,18 @@ class FuzzyCMeans(object):
           A vector containing, in each line, the position of the centers of the
           algorithm.
         '''
-        mm = self.__mu ** self.m
-        c = dot(self.__x.transpose(), mm) / sum(mm, axis=0)
-        self.__c = c.transpose()
+        x = self.__x
+        mu = self.__mu
+        M, D = x.shape
+        num = zeros((D, mu.shape[1]))
+        den = zeros(mu.shape[1])
+        for start in range(0, M, self.chunk):
+            mm = mu[start:start + self.chunk] ** self.m
+            if self.__w is not None:
+                mm = mm * self.__w[start:start + self.chunk]
+            num += np.dot(x[start:start + self.chunk].T, mm)
+            den += mm.sum(axis=0)
+        self.__c = (num / den).T.astype(x.dtype)
         return self.__c
 
     def membership(self):
@@ -125,17 +189,7 @@ class FuzzyCMeans(object):
           A vector containing, in each line, the membership of the corresponding
           example in each class.
         '''
-        x = self.__x
-        c = self.__c
-        M, _ = x.shape
-        C, _ = c.shape
-        r = zeros((M, C))
-        m1 = 1. / (self.m - 1.)
-        for k in range(M):
-            den = sum((x[k] - c) ** 2., axis=1)
-            frac = outer(den, 1. / den) ** m1
-            r[k, :] = 1. / sum(frac, axis=1)
-        self.__mu = r
+        self.__update(False)
         return self.__mu
 
     def step(self):
@@ -147,12 +201,111 @@ class FuzzyCMeans(object):
           The norm of the change in the membership values of the examples. It
           can be used to track convergence and as an estimate of the error.
         '''
-        old = self.__mu
-        self.membership()
-        self.centers()
-        return sum((self.__mu - old) ** 2.)
+        return self.__update(True)
+
+    def __update(self, step, track=True):
+        '''
+        Recalculates the memberships in place, one chunk of examples at a
+        time. The membership of an example in a class is
+        ``(dmin / d) ** (1 / (m - 1))``, normalised to sum to one, where ``d``
+        is the squared distance from the center and ``dmin`` the smallest of
+        them; an example that lies on one or more centers belongs to them
+        with equal memberships. If step is True, the change of the memberships
+        and the new centers are computed in the same pass; the change of an
+        example counts as many times as its weight. If track is False, the
+        step neither computes the change nor stores the memberships.
+        '''
+        M = len(self.__x)
+        bounds = [M * k // self.workers for k in range(self.workers + 1)]
+        shards = list(zip(range(self.workers), bounds[:-1], bounds[1:]))
+        if self.workers > 1:
+            if self.__pool is None:
+                self.__pool = ThreadPoolExecutor(max_workers=self.workers)
+            partials = list(self.__pool.map(lambda shard: self.__partial(shard, step, track), shards))
+        else:
+            partials = [self.__partial(shards[0], step, track)]
+        # the partial results are added in the order of the shards
+        error, objective, num, den = partials[0]
+        for partial in partials[1:]:
+            error, objective = error + partial[0], objective + partial[1]
+            num, den = num + partial[2], den + partial[3]
+        if step:
+            self.__c = (num / den).T.astype(self.__x.dtype)
+            self.objective = objective
+        return error
+
+    def __partial(self, shard, step, track):
+        '''
+        Recalculates the memberships of a shard of examples and returns the
+        change of the memberships, the objective function and the numerators
+        and denominators of the centers over the shard.
+        '''
+        index, first, last = shard
+        x = self.__x
+        c = self.__c
+        mu = self.__mu
+        D = x.shape[1]
+        C = c.shape[0]
+        diff, d, w, t, dmin = self.__allocate(index, min(self.chunk, max(last - first, 1)), C, D)
+        norms = None if self.__norms is None else np.einsum('ij,ij->i', c, c)
+        error = 0.
+        objective = 0.
+        num = zeros((D, C))
+        den = zeros(C)
+        for start in range(first, last, self.chunk):
+            n = min(self.chunk, last - start)
+            xk, mk = x[start:start + n], mu[start:start + n]
+            dk, wk, tk, lo = d[:n], w[:n], t[:n], dmin[:n]
+            if norms is None:
+                np.subtract(xk[:, None, :], c[None, :, :], out=diff[:n])
+                np.square(diff[:n], out=diff[:n])
+                np.sum(diff[:n], axis=2, out=dk)
+            else:
+                np.dot(xk, c.T, out=dk)
+                dk *= -2.
+                dk += self.__norms[start:start + n]
+                dk += norms
+                # the rounding errors can make the distance of an example from its own center negative
+                np.maximum(dk, 0., out=dk)
+            membershipDegrees(dk, self.m, out=wk, dmin=lo)
+            if step and track:
+                np.subtract(wk, mk, out=tk)
+                if self.__w is None:
+                    error += float(np.dot(_wide(tk.ravel()), _wide(tk.ravel())))
+                else:
+                    np.square(tk, out=tk)
+                    error += float(np.dot(self.__w[start:start + n, 0], tk.sum(axis=1, dtype=np.float64)))
+            if step:
+                np.power(wk, self.m, out=tk)
+                if self.__w is not None:
+                    tk *= self.__w[start:start + n]
+                num += np.dot(_wide(xk).T, _wide(tk))
+                den += tk.sum(axis=0, dtype=np.float64)
+                objective += float(np.vdot(_wide(tk), _wide(dk)))
+            if track:
+                mk[...] = wk
+        return error, objective, num, den
 
-    def __call__(self, emax=1.e-10, imax=20):
+    def __allocate(self, index, chunk, C, D):
+        shape = (chunk, C, D, self.__x.dtype)
+        if index not in self.__buffers or self.__buffers[index][0] != shape:
+            dtype = self.__x.dtype
+            # the differences from the centers are only needed by one-dimensional examples
+            self.__buffers[index] = (shape, (np.empty((chunk, C, D if D == 1 else 0), dtype),
+                                             np.empty((chunk, C), dtype), np.empty((chunk, C), dtype),
+                                             np.empty((chunk, C), dtype), np.empty((chunk, 1), dtype)))
+        return self.__buffers[index][1]
+
+    def close(self):
+        '''
+        Stops the worker threads. They are started again if the algorithm is
+        run after this call.
+        '''
+        if self.__pool is not None:
+            self.__pool.shutdown()
+            self.__pool = None
+
+    def __call__(self, emax=1.e-10, imax=20, ctol=None, otol=None, acceleration=None, depth=5, omega=1.5):
         '''
         The ``__call__`` interface is used to run the algorithm until
         convergence is found.
@@ -165,19 +318,93 @@ class FuzzyCMeans(object):
           imax
             Specifies the maximum number of iterations admitted in the execution
             of the algorithm. It defaults to 20.
+          ctol
+            If given (or if ``otol`` or ``acceleration`` are given), the
+            convergence is tested on the centers instead of the memberships:
+            the algorithm stops when no center moves by more than ``ctol``
+            in a step. If only ``acceleration`` is given, ``ctol`` defaults to
+            ``emax``.
+          otol
+            If given, the algorithm stops only when also the relative change
+            of the objective function in a step is not bigger than ``otol``.
+          acceleration
+            ``None`` for the plain alternating updates, ``"overrelaxation"``
+            to move the centers ``omega`` times the step, ``"anderson"`` to
+            extrapolate the centers from the last ``depth`` steps. An
+            accelerated point that does not lower the objective function is
+            discarded in favour of the plain step.
 
         :Returns:
           An array containing, at each line, the vectors representing the
           centers of the clustered regions.
         '''
+        if ctol is not None or otol is not None or acceleration is not None:
+            if ctol is None and otol is None:
+                # without a tolerance the first step would already pass the test on the centers
+                ctol = emax
+            return self.__solve(imax, ctol, otol, acceleration, depth, omega)
         error = 1.
         i = 0
         while error > emax and i < imax:
             error = self.step()
             i = i + 1
-            logging.warning("step: {0}, error: {1}".format(i, error))
+            logging.debug("step: {0}, error: {1}, objective: {2}".format(i, error, self.objective))
+        self.iterations = i
+        return self.c
+
+    def __solve(self, imax, ctol, otol, acceleration, depth, omega):
+        '''
+        Runs the algorithm as a fixed point iteration on the centers, where a
+        step maps the centers to the centers computed from their memberships.
+        The memberships are neither compared nor stored during the steps: they
+        are computed once, from the final centers.
+        '''
+        point = self.__c.copy()
+        fallback = None
+        residuals, images = [], []
+        previous = np.inf
+        i = 0
+        while i < imax:
+            self.__c = point
+            self.__update(True, track=False)
+            image, objective = self.__c.astype(np.float64), self.objective
+            i = i + 1
+            if fallback is not None and objective > previous:
+                # the accelerated point is worse than the plain step: it is discarded
+                logging.debug("step: {0}, accelerated point rejected, objective: {1}".format(i, objective))
+                point, fallback = fallback, None
+                residuals, images = [], []
+                continue
+            movement = float(np.max(np.abs(image - point)))
+            change = abs(previous - objective) / objective if objective > 0 and previous < np.inf else np.inf
+            previous = objective
+            logging.debug("step: {0}, movement: {1}, objective: {2}".format(i, movement, objective))
+            if (ctol is None or movement <= ctol) and (otol is None or change <= otol):
+                point = image
+                break
+            residuals.append((image - point).ravel())
+            images.append(image.ravel())
+            del residuals[:-depth - 1], images[:-depth - 1]
+            if acceleration == "anderson" and len(residuals) > 1:
+                dF = np.diff(residuals, axis=0).T
+                dG = np.diff(images, axis=0).T
+                gamma = np.linalg.lstsq(dF, residuals[-1], rcond=None)[0]
+                point, fallback = (image.ravel() - dG.dot(gamma)).reshape(image.shape), image
+            elif acceleration == "overrelaxation":
+                point, fallback = point + omega * (image - point), image
+            else:
+                point, fallback = image, None
+        self.__c = np.asarray(point, dtype=self.__x.dtype)
+        self.iterations = i
+        self.membership()
         return self.c
 
+
+def _wide(a):
+    # the products over a chunk are computed in float64 even when the examples are float32
+    return a.astype(np.float64, copy=False)
+
+
 ################################################################################
 # Test.
 # if __name__ == "main":
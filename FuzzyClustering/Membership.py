@@ -0,0 +1,51 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+
+def membershipDegrees(d, m, out=None, dmin=None):
+    """
+    This function computes the memberships of some examples in the clusters
+    of the fuzzy c-means, from their squared distances from the centers. An
+    example that lies on some centers belongs to them only, in equal parts.
+
+    :Parameters:
+    d: the squared distances of the examples from the centers, one line per
+       example;
+    m: the fuzzyness coefficient;
+    out: the array where the memberships are written (a new one if None);
+    dmin: the array of one column where the distances from the nearest
+          centers are written (a new one if None).
+
+    :Returns:
+    the array of the memberships, one line per example.
+
+    """
+    if dmin is None:
+        dmin = np.empty((len(d), 1), dtype=d.dtype)
+    np.min(d, axis=1, out=dmin[:, 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w = np.divide(dmin, d, out=out)
+    np.power(w, 1. / (m - 1.), out=w)
+    exact = dmin[:, 0] == 0
+    if exact.any():
+        w[exact] = d[exact] == 0
+    w /= np.sum(w, axis=1, keepdims=True)
+    return w
@@ -0,0 +1,208 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+
+import numpy as np
+
+from .Membership import membershipDegrees
+from .Seeding import initialCenters
+
+
+class MiniBatchFuzzyCMeans(object):
+    '''
+    This class performs the fuzzy c-means on a stream of chunks of examples,
+    one batch at a time. The memberships of a batch are computed from the
+    current centers and summarised in the sufficient statistics of the
+    centers (the sums of the weighted examples and of the weights), which
+    are accumulated over a pass on the stream. Neither the examples nor the
+    membership matrix are ever held in memory as a whole.
+
+    If the stream can be read more than once, the initial centers are found
+    with the fuzzy c-means on a uniform sample of one batch, drawn in a first
+    pass (the chunks often come sorted by value, so the first batch alone
+    would not be representative of the data), and the centers are updated at
+    the end of every pass: a pass is an iteration of the fuzzy c-means on all
+    the examples. If the stream can be read only once, the centers are
+    updated after every batch.
+    '''
+
+    def __init__(self, clusters=2, m=2., batchSize=65536, seed=None, dtype=np.float64, seeding="random"):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        clusters: number of clusters required.
+        m: the fuzzyness coefficient (bigger than 1).
+        batchSize: number of examples in a batch.
+        seed: seed of the sample and of the choice of the initial centers.
+        dtype: floating point type of the examples and of the memberships.
+        seeding: "random" to choose the initial centers at random among the
+                 distinct examples, "kmeans++", "quantile" or the list of the
+                 initial centers.
+
+        '''
+        self.clusters = clusters
+        self.m = m
+        self.batchSize = batchSize
+        self.dtype = dtype
+        self.c = None
+        '''The centers of the clusters, one per line.'''
+        self.shift = None
+        '''The largest shift of a center in the last pass on the stream.'''
+        self.passes = 0
+        '''The number of passes on the stream of the last call.'''
+        self.bounds = None
+        '''The smallest and the largest example (in every dimension) of the
+        last pass on the stream, for instance the domain of a Strong Fuzzy
+        Partition of the values.'''
+        self.seeding = seeding
+        self._random = np.random.RandomState(seed)
+
+    def __call__(self, source, emax=1.e-4, imax=100):
+        '''
+        This function runs passes on the stream until the centers stop
+        moving.
+
+        :Parameters:
+        source: a function that returns a new iterator of the chunks of
+                examples at every call, or an iterator of the chunks (in that
+                case only one pass is made). A chunk is an array of examples
+                (one per line) or of one-dimensional values.
+        emax: maximum shift of a center in a pass admitted at convergence.
+        imax: maximum number of passes.
+
+        :Returns:
+        the array of the centers, one per line.
+
+        '''
+        passes = imax if callable(source) else 1
+        if callable(source) and self.c is None:
+            self.c = self._initialCenters(self._sample(source()), emax, imax)
+        for i in range(passes):
+            previous = None if self.c is None else self.c.copy()
+            self.partialFit(source() if callable(source) else source, online=not callable(source))
+            self.shift = np.inf if previous is None else float(np.max(np.abs(self.c - previous)))
+            logging.debug("pass: {0}, shift: {1}".format(i + 1, self.shift))
+            self.passes = i + 1
+            if self.shift <= emax:
+                break
+        return self.c
+
+    def partialFit(self, chunks, online=False):
+        '''
+        This function makes one pass on the chunks of examples.
+
+        :Parameters:
+        chunks: an iterator of the chunks of examples.
+        online: if True, the centers are updated after every batch, otherwise
+                at the end of the pass.
+
+        '''
+        num, den = None, None
+        for batch in self._batches(chunks):
+            if self.c is None:
+                self.c = self._initialCenters(batch, emax=0., imax=0)
+            w = self.memberships(batch) ** self.m
+            if num is None:
+                num, den = np.zeros((batch.shape[1], self.clusters)), np.zeros(self.clusters)
+                low, high = batch.min(axis=0), batch.max(axis=0)
+            else:
+                low, high = np.minimum(low, batch.min(axis=0)), np.maximum(high, batch.max(axis=0))
+            num += np.dot(batch.T, w)
+            den += w.sum(axis=0)
+            if online:
+                self._update(num, den)
+        if num is not None:
+            self.bounds = (low, high)
+            if not online:
+                self._update(num, den)
+
+    def memberships(self, x):
+        '''
+        This function computes the memberships of some examples in the
+        clusters, as the fuzzy c-means does.
+
+        :Parameters:
+        x: the array of the examples, one per line.
+
+        :Returns:
+        the array of the memberships, one line per example.
+
+        '''
+        return membershipDegrees(np.square(x[:, None, :] - self.c[None, :, :]).sum(axis=2), self.m)
+
+    def _update(self, num, den):
+        # a cluster that has not collected any weight yet keeps its center
+        full = den > 0
+        self.c[full] = (num[:, full] / den[full]).T
+
+    def _initialCenters(self, batch, emax, imax):
+        # centers seeded on the batch, then refined with the fuzzy c-means on the batch
+        values, counts = np.unique(batch, axis=0, return_counts=True)
+        if len(values) < self.clusters:
+            raise Exception("[MiniBatchFuzzyCMeans] ERROR: the sample has fewer distinct examples than clusters.")
+        if self.seeding == "random":
+            self.c = values[np.sort(self._random.choice(len(values), self.clusters, replace=False))].copy()
+        else:
+            self.c = initialCenters(values, self.clusters, self.seeding, self._random, counts).astype(self.dtype)
+        for _ in range(imax):
+            w = self.memberships(batch) ** self.m
+            c = (np.dot(batch.T, w) / w.sum(axis=0)).T.astype(self.dtype)
+            shift = float(np.max(np.abs(c - self.c)))
+            self.c = c
+            if shift <= emax:
+                break
+        return self.c
+
+    def _sample(self, chunks):
+        # reservoir sampling of batchSize examples
+        sample, seen = None, 0
+        for batch in self._batches(chunks):
+            if sample is None:
+                sample = batch.copy()
+            else:
+                if len(sample) < self.batchSize:
+                    free = self.batchSize - len(sample)
+                    sample = np.concatenate([sample, batch[:free]])
+                    seen += min(free, len(batch))
+                    batch = batch[free:]
+                slots = self._random.randint(0, seen + np.arange(1, len(batch) + 1))
+                kept = slots < self.batchSize
+                sample[slots[kept]] = batch[kept]
+            seen += len(batch)
+        return sample
+
+    def _batches(self, chunks):
+        # the chunks are cut and joined into batches of batchSize examples
+        pending, size = [], 0
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=self.dtype)
+            if chunk.ndim == 1:
+                chunk = chunk.reshape(-1, 1)
+            while len(chunk):
+                take = chunk[:self.batchSize - size]
+                chunk = chunk[len(take):]
+                pending.append(take)
+                size += len(take)
+                if size == self.batchSize:
+                    yield np.concatenate(pending) if len(pending) > 1 else pending[0]
+                    pending, size = [], 0
+        if size:
+            yield np.concatenate(pending) if len(pending) > 1 else pending[0]
@@ -0,0 +1,126 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+SEEDINGS = ["random", "kmeans++", "quantile"]
+
+
+def randomPartitionMatrix(examples, clusters, random):
+    """
+    This function creates a random partition matrix: the membership of an
+    example in a cluster is drawn uniformly in what is left by the previous
+    clusters, and the last cluster takes the rest.
+
+    :Parameters:
+    examples: number of examples;
+    clusters: number of clusters;
+    random: the numpy RandomState.
+
+    :Returns:
+    the partition matrix, one line per example.
+
+    """
+    U = np.empty((examples, clusters))
+    cake = np.ones(examples)
+    for j in range(clusters - 1):
+        U[:, j] = random.uniform(0, cake)
+        cake -= U[:, j]
+    U[:, -1] = cake
+    return U
+
+
+def kmeansPlusPlus(x, clusters, random, weights=None):
+    """
+    This function chooses the initial centers with the k-means++ rule: every
+    center is an example drawn with probability proportional to its squared
+    distance from the nearest center already chosen.
+
+    :Parameters:
+    x: the examples, one per line;
+    clusters: number of clusters;
+    random: the numpy RandomState;
+    weights: the multiplicities of the examples (None if they are all one).
+
+    :Returns:
+    the centers, one per line.
+
+    """
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=np.float64)
+    centers = [x[random.choice(len(x), p=w / w.sum())]]
+    nearest = np.square(x - centers[0]).sum(axis=1)
+    for _ in range(clusters - 1):
+        p = w * nearest
+        total = p.sum()
+        # if every example lies on a center, the next one is drawn by weight only
+        index = random.choice(len(x), p=p / total if total > 0 else w / w.sum())
+        centers.append(x[index])
+        np.minimum(nearest, np.square(x - x[index]).sum(axis=1), out=nearest)
+    return np.array(centers, dtype=np.float64)
+
+
+def quantilePrototypes(x, clusters, weights=None, presorted=False):
+    """
+    This function chooses the initial centers at the quantiles (j + 0.5) / C
+    of the examples, separately for every dimension.
+
+    :Parameters:
+    x: the examples, one per line;
+    clusters: number of clusters;
+    weights: the multiplicities of the examples (None if they are all one);
+    presorted: True if the examples are one-dimensional and already sorted.
+
+    :Returns:
+    the centers, one per line.
+
+    """
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=np.float64)
+    levels = (np.arange(clusters) + 0.5) / clusters
+    centers = np.empty((clusters, x.shape[1]))
+    for k in range(x.shape[1]):
+        order = np.arange(len(x)) if presorted else np.argsort(x[:, k], kind="stable")
+        cumulative = np.cumsum(w[order])
+        positions = np.searchsorted(cumulative, levels * cumulative[-1], side="right")
+        centers[:, k] = x[order[np.minimum(positions, len(x) - 1)], k]
+    return centers
+
+
+def initialCenters(x, clusters, seeding, random, weights=None):
+    """
+    This function chooses the initial centers with a seeding strategy.
+
+    :Parameters:
+    x: the examples, one per line;
+    clusters: number of clusters;
+    seeding: "kmeans++", "quantile" or the list of the centers;
+    random: the numpy RandomState;
+    weights: the multiplicities of the examples (None if they are all one).
+
+    :Returns:
+    the centers, one per line.
+
+    """
+    if seeding == "kmeans++":
+        return kmeansPlusPlus(x, clusters, random, weights)
+    if seeding == "quantile":
+        return quantilePrototypes(x, clusters, weights)
+    centers = np.array(seeding, dtype=np.float64).reshape(clusters, -1)
+    if centers.shape[1] != x.shape[1]:
+        raise Exception("[Seeding] ERROR: the centers must have the dimension of the examples.")
+    return centers
@@ -0,0 +1,65 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+from .Membership import membershipDegrees
+
+
+def validityIndices(x, centers, weights=None, m=2., chunk=65536):
+    """
+    This function computes the validity indices of a fuzzy partition, from
+    the memberships of the examples in the clusters of some centers:
+
+    - the partition coefficient PC = sum(mu ** 2) / N (the higher the
+      better, 1 for a crisp partition);
+    - the partition entropy PE = -sum(mu * log(mu)) / N (the lower the
+      better, 0 for a crisp partition);
+    - the Xie-Beni index XB = sum(mu ** m * d ** 2) / (N * min(s ** 2)),
+      where d is the distance of an example from a center and s the
+      distance between two centers (the lower the better).
+
+    :Parameters:
+    x: the examples, one per line;
+    centers: the centers, one per line;
+    weights: the multiplicities of the examples (None if they are all one);
+    m: the fuzzyness coefficient;
+    chunk: the number of examples whose memberships are computed at a time.
+
+    :Returns:
+    the dictionary of the indices "pc", "pe" and "xb".
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    c = np.asarray(centers, dtype=np.float64)
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=np.float64)
+    pc = pe = compactness = 0.
+    for start in range(0, len(x), chunk):
+        d = np.square(x[start:start + chunk, None, :] - c[None, :, :]).sum(axis=2)
+        mu = membershipDegrees(d, m)
+        wk = w[start:start + chunk]
+        pc += float(np.dot(wk, np.square(mu).sum(axis=1)))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pe -= float(np.dot(wk, np.where(mu > 0, mu * np.log(mu), 0.).sum(axis=1)))
+        compactness += float(np.dot(wk, (mu ** m * d).sum(axis=1)))
+    n = w.sum()
+    separation = np.square(c[:, None, :] - c[None, :, :]).sum(axis=2)
+    separation = separation[~np.eye(len(c), dtype=bool)].min() if len(c) > 1 else np.inf
+    return {"pc": float(pc / n), "pe": float(pe / n),
+            "xb": float(compactness / (n * separation)) if separation > 0 else np.inf}
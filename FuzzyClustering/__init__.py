@@ -17,7 +17,8 @@
 	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from random import uniform
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
 from time import time
 
 import logging
@@ -25,6 +26,9 @@ import numpy as np
 from numpy import array
 
 from .FuzzyCMeans import FuzzyCMeans
+from .MiniBatchFuzzyCMeans import MiniBatchFuzzyCMeans
+from .Seeding import initialCenters, quantilePrototypes, randomPartitionMatrix
+from .Validity import validityIndices
 
 np.seterr(divide='ignore', invalid='ignore')
 
@@ -34,56 +38,362 @@ class FuzzyClustering(object):
     This class perform the fuzzy clustering of the data.
     """
 
-    def __init__(self, trainingset, clusters=2):
+    def __init__(self, trainingset, clusters=2, seed=None, dtype=np.float64, mode="exact", bins=1000,
+                 binning="width", batchSize=65536, seeding="random", acceleration=None, stopping="membership",
+                 threads=1):
         """
         Initializes the instance of the class.
         
         :Parameters:
-        trainingset: the matrix of data to be classified;
-        clusters: number of clusters required.
+        trainingset: the matrix of data to be classified (in "minibatch" mode,
+                     a function that returns a new iterator of the chunks of
+                     the data at every call);
+        clusters: number of clusters required;
+        seed: seed of the random numbers of the seeding (if None, they change
+              from run to run);
+        dtype: floating point type of the data and of the memberships
+               (float64 or float32);
+        mode: "exact" to cluster every example, "unique" to cluster the
+              distinct examples weighted by their multiplicities, "histogram"
+              to cluster the bins of the histogram of the values (only for
+              one-dimensional data) weighted by their counts, "minibatch" to
+              cluster the chunks of the data one batch at a time;
+        bins: number of bins of the histogram;
+        binning: "width" for bins of the same width, "quantile" for bins with
+                 the same number of values;
+        batchSize: number of examples in a batch of the "minibatch" mode;
+        seeding: "random" to start from a random partition matrix, "kmeans++"
+                 to start from centers chosen with the k-means++ rule,
+                 "quantile" to start from centers at evenly spaced quantiles
+                 of the data, or the list of the initial centers;
+        acceleration: None for the plain fuzzy c-means, "overrelaxation" or
+                      "anderson" to accelerate the updates of the centroids
+                      (the convergence is then tested on the centroids);
+        stopping: "membership" to stop when the change of the memberships is
+                  not bigger than the maximum error, "centroids" to stop when
+                  no centroid moves by more than the maximum error times the
+                  range of the data and the relative change of the objective
+                  function is not bigger than the maximum error;
+        threads: number of threads of a run of the fuzzy c-means, each one
+                 on a shard of the data.
         
         """
         self._clusters = clusters
-        self._trainingSet = array(trainingset)
-        self._partitionMatrix = self._createRandomPartitionMatrix()
+        self._dtype = dtype
+        self._seed = seed
+        self._seeding = seeding
+        self._solver = (acceleration, "centroids" if acceleration is not None else stopping, threads)
+        self._weights = None
+        self.iterations = None
+        '''The number of iterations of the last clustering (of the best
+        restart).'''
+        self.objective = None
+        '''The objective function J_m at the end of the last clustering (the
+        lowest among the restarts).'''
+        self.objectives = None
+        '''The objective functions of all the restarts of the last
+        clustering.'''
+        self.spread = None
+        '''The largest difference between the sorted centroids of two
+        restarts of the last clustering.'''
+        self._unique = None
+        self.tolerance = None
+        '''The largest shift of a centroid in one iteration of the fuzzy
+        c-means on all the examples, starting from the centroids found on the
+        distinct examples or on the bins, or in the last pass of the
+        "minibatch" mode (None in exact mode).'''
+        self.bounds = None
+        '''The smallest and the largest value (in every dimension) of the
+        examples, seen in the last pass of the "minibatch" mode (None in the
+        other modes, where the examples are in memory).'''
+        if mode == "minibatch":
+            # the data are never materialised: neither the examples nor the partition matrix
+            self._minibatch = MiniBatchFuzzyCMeans(clusters, batchSize=batchSize, seed=seed, dtype=dtype,
+                                                   seeding=seeding)
+            self._source = trainingset
+            return
+        self._minibatch = None
+        self._trainingSet = array(trainingset, dtype=np.float64)
+        if mode != "exact":
+            # the distinct examples and their multiplicities
+            values, counts = np.unique(self._trainingSet, axis=0, return_counts=True)
+            self._unique = (values, counts)
+            if mode == "histogram" and self._trainingSet.shape[1] == 1:
+                values, counts = self._histogram(values[:, 0], counts, bins, binning)
+            self._trainingSet, self._weights = values, counts
+        self._trainingSet = self._trainingSet.astype(dtype, copy=False)
 
-    def __call__(self, maxError=1.e-4, maxIter=100):
+    def __call__(self, maxError=1.e-4, maxIter=100, restarts=1, workers=1):
         """
-        This function compute the clustering process.
+        This function compute the clustering process. With more restarts,
+        the fuzzy c-means starts from different random initial conditions and
+        the centroids with the lowest objective function are kept; the
+        restarts can run in parallel processes, which read the data from
+        shared memory.
         
         :Parameters:
         maxError: maximum error admitted;
-        maxIter: maximum number of iterations admitted.
+        maxIter: maximum number of iterations admitted;
+        restarts: number of runs of the fuzzy c-means;
+        workers: number of processes that run the restarts.
         
         :Returns:
         centroids: list of centers of clustered regions.
         
         """
-        clustering = FuzzyCMeans(self._trainingSet, self._partitionMatrix)
-        logging.warning("\nClustering process in execution...")
+        if self._minibatch is not None:
+            logging.warning("\nMini-batch clustering process in execution...")
+            t0 = time()
+            centroids = self._minibatch(self._source, emax=maxError, imax=maxIter)
+            self.tolerance = self._minibatch.shift
+            self.iterations = self._minibatch.passes
+            self.bounds = self._minibatch.bounds
+            logging.warning("Time elapsed in clustering process: {0:.3f} seconds.".format(time() - t0))
+            return centroids.tolist()
+        if restarts > 1 and self._seeding not in ("random", "kmeans++"):
+            logging.warning("The seeding is deterministic: the clustering is executed once.")
+            restarts = 1
+        logging.warning("\nClustering process in execution (seeding: {0})...".format(
+            self._seeding if isinstance(self._seeding, str) else "centers"))
+        if self._weights is not None:
+            logging.warning("Clustering {0} weighted examples instead of {1}.".format(
+                len(self._trainingSet), int(self._weights.sum())))
         logging.warning("Tollerance:" + str(maxError) + "- Maximum number of iterations:" + str(maxIter))
         t0 = time()
-        centroids = clustering(emax=maxError, imax=maxIter)
+        arguments = (self._clusters, self._seeding, self._dtype, maxError, maxIter) + self._solver
+        seeds = [self._seed] + [None if self._seed is None else [self._seed, i] for i in range(1, restarts)]
+        if restarts > 1 and workers > 1:
+            runs = self._runShared(seeds, [arguments] * len(seeds), workers)
+        else:
+            runs = [_cluster(self._trainingSet, self._weights, seed, *arguments) for seed in seeds]
         tf = time()
         logging.warning("Time elapsed in clustering process: {0:.3f} seconds.".format(tf - t0))
+        centroids, self.objective, self.iterations = min(runs, key=lambda run: run[1])
+        self.objectives = [run[1] for run in runs]
+        logging.warning("Iterations: {0} - Objective: {1}".format(self.iterations, self.objective))
+        if restarts > 1:
+            ordered = np.array([run[0][np.lexsort(run[0].T[::-1])] for run in runs])
+            self.spread = float(np.max(ordered.max(axis=0) - ordered.min(axis=0)))
+            logging.warning("Objective of the {0} restarts: from {1} to {2} - Spread of the centroids: {3}".format(
+                restarts, min(self.objectives), max(self.objectives), self.spread))
+        if self._unique is not None:
+            self.tolerance = self._checkTolerance(centroids)
+            logging.warning("Tolerance with respect to the exact clustering: {0}".format(self.tolerance))
         return centroids.tolist()
 
-    def _createRandomPartitionMatrix(self):
+    def _checkTolerance(self, centroids):
         """
-        This function creates the partition matrix with random data.
-        
+        This function measures how far the centroids are from a fixed point of
+        the fuzzy c-means on all the examples, with one iteration on the
+        distinct examples weighted by their multiplicities (that is the same
+        as one iteration on all the examples).
+
         :Returns:
-        the list that represents the partition matrix of random data.
-        
+        the largest shift of a centroid.
+
+        """
+        values, counts = self._unique
+        check = FuzzyCMeans(values, None, dtype=self._dtype, weights=counts, centers=centroids)
+        check.step()
+        return float(np.max(np.abs(check.c - centroids)))
+
+    @staticmethod
+    def _histogram(values, counts, bins, binning):
+        """
+        This function groups the sorted distinct values in bins. Every bin is
+        represented by the mean of its values.
+
+        :Parameters:
+        values: the sorted distinct values;
+        counts: the multiplicities of the values;
+        bins: the number of bins;
+        binning: "width" or "quantile".
+
+        :Returns:
+        values: the column of the representatives of the non-empty bins;
+        counts: the number of values in every non-empty bin.
+
+        """
+        if len(values) <= bins:
+            return values.reshape(-1, 1), counts
+        if binning == "quantile":
+            cumulative = np.cumsum(counts)
+            edges = np.interp(np.linspace(0, cumulative[-1], bins + 1), cumulative, values)
+        else:
+            edges = np.linspace(values[0], values[-1], bins + 1)
+        index = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, bins - 1)
+        binCounts = np.bincount(index, weights=counts, minlength=bins)
+        sums = np.bincount(index, weights=values * counts, minlength=bins)
+        full = binCounts > 0
+        return (sums[full] / binCounts[full]).reshape(-1, 1), binCounts[full]
+
+    def validity(self, clusterRange, maxError=1.e-4, maxIter=100, restarts=1, workers=1):
+        """
+        This function computes the clustering for a range of numbers of
+        clusters and the validity indices of every partition (see
+        validityIndices), and recommends the number of clusters with the
+        lowest Xie-Beni index. The numbers of clusters are swept in ascending
+        order: the smallest one is run from the seeding (with its restarts in
+        parallel processes, keeping the lowest objective function), and every
+        other one starts from the centroids of the previous one and a new
+        centroid on the example farthest from them. The order of the sweep is
+        fixed, so the result does not depend on the number of workers.
+        One-dimensional data are sorted once, so that the quantile seeding
+        reads them without sorting again.
+
+        :Parameters:
+        clusterRange: the smallest and the largest number of clusters;
+        maxError: maximum error admitted;
+        maxIter: maximum number of iterations admitted;
+        restarts: number of runs of the smallest number of clusters (one if
+                  the seeding is deterministic);
+        workers: number of processes that run the restarts.
+
+        :Returns:
+        recommended: the recommended number of clusters;
+        table: the list of the dictionaries of the number of clusters
+               ("clusters"), the centroids, the objective function, the
+               iterations and the indices ("pc", "pe", "xb").
+
+        """
+        if self._minibatch is not None:
+            raise Exception("[FuzzyClustering validity] ERROR: the validity indices need the data in memory.")
+        candidates = list(range(clusterRange[0], clusterRange[1] + 1))
+        logging.warning("\nValidity of the clustering with {0} to {1} clusters...".format(candidates[0],
+                                                                                      candidates[-1]))
+        t0 = time()
+        x, weights = self._trainingSet, self._weights
+        presorted = x.shape[1] == 1
+        if presorted and self._unique is None:
+            # the distinct values and the bins are already sorted
+            order = np.argsort(x[:, 0], kind="stable")
+            x = x[order]
+            weights = None if weights is None else weights[order]
+        seeding = self._seeding
+        if seeding == "quantile" and presorted:
+            seeding = quantilePrototypes(x, candidates[0], weights, presorted=True).tolist()
+        if not isinstance(seeding, str) or seeding not in ("random", "kmeans++"):
+            restarts = 1
+        seeds = [self._seed] + [None if self._seed is None else [self._seed, i] for i in range(1, restarts)]
+        arguments = [(candidates[0], seeding, self._dtype, maxError, maxIter) + self._solver] * len(seeds)
+        if workers > 1 and len(seeds) > 1:
+            runs = self._runShared(seeds, arguments, workers, x, weights)
+        else:
+            runs = [_cluster(x, weights, seed, *argument) for seed, argument in zip(seeds, arguments)]
+        runs = [min(runs, key=lambda run: run[1])]
+        for clusters in candidates[1:]:
+            seeding = _farthestFirst(x, weights, runs[-1][0]).tolist()
+            runs.append(_cluster(x, weights, self._seed, clusters, seeding, self._dtype, maxError, maxIter,
+                                 *self._solver))
+        table = []
+        for clusters, (centroids, objective, iterations) in zip(candidates, runs):
+            row = {"clusters": clusters, "centroids": centroids.tolist(), "objective": objective,
+                   "iterations": iterations}
+            row.update(validityIndices(x, centroids, weights))
+            table.append(row)
+            logging.warning("C = {0}: PC = {1}, PE = {2}, XB = {3}".format(clusters, row["pc"], row["pe"], row["xb"]))
+        recommended = min(table, key=lambda row: row["xb"])["clusters"]
+        logging.warning("Validity computed in {0:.3f} seconds: {1} clusters are recommended.".format(time() - t0,
+                                                                                                 recommended))
+        return recommended, table
+
+    def _runShared(self, seeds, arguments, workers, x=None, weights=None):
         """
-        U = []
-        for _ in range(len(self._trainingSet)):
-            cake = 1.0
-            partition = []
-            for _ in range(self._clusters - 1):
-                cakeSlice = uniform(0, cake)
-                partition.append(cakeSlice)
-                cake -= cakeSlice
-            partition.append(1 - sum(partition))
-            U.append(partition)
-        return array(U)
+        This function runs the clusterings in parallel processes. The data are
+        copied once in shared memory, where the processes read them.
+
+        :Parameters:
+        seeds: the seed of every clustering;
+        arguments: the other arguments of _cluster for every clustering;
+        workers: number of processes;
+        x, weights: the data (the training set if None).
+
+        :Returns:
+        the list of the centroids, the objective function and the iterations
+        of every clustering.
+
+        """
+        blocks = []
+        try:
+            shared = []
+            if x is None:
+                x, weights = self._trainingSet, self._weights
+            for data in (x, weights):
+                if data is None:
+                    shared.append(None)
+                    continue
+                block = SharedMemory(create=True, size=max(data.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(data.shape, data.dtype, buffer=block.buf)[...] = data
+                shared.append((block.name, data.shape, data.dtype.str))
+            with ProcessPoolExecutor(max_workers=min(workers, len(seeds))) as executor:
+                return list(executor.map(_clusterShared, [shared] * len(seeds), seeds, arguments))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+
+def _cluster(x, weights, seed, clusters, seeding, dtype, maxError, maxIter, acceleration=None, stopping="membership",
+             threads=1):
+    """
+    This function runs the fuzzy c-means once, from initial conditions drawn
+    with a seed.
+
+    :Returns:
+    the centroids, the objective function and the number of iterations.
+
+    """
+    random = np.random.RandomState(seed)
+    if seeding == "random":
+        partitionMatrix, centers = randomPartitionMatrix(len(x), clusters, random), None
+    else:
+        partitionMatrix, centers = None, initialCenters(x, clusters, seeding, random, weights)
+    clustering = FuzzyCMeans(x, partitionMatrix, dtype=dtype, weights=weights, centers=centers, workers=threads)
+    try:
+        if stopping == "centroids":
+            scale = float(np.max(x) - np.min(x)) if len(x) else 0.
+            centroids = clustering(imax=maxIter, ctol=maxError * scale, otol=maxError, acceleration=acceleration)
+        else:
+            centroids = clustering(emax=maxError, imax=maxIter)
+    finally:
+        clustering.close()
+    return centroids, clustering.objective, clustering.iterations
+
+
+def _farthestFirst(x, weights, centroids):
+    """
+    This function adds a centroid to some centroids: the example with the
+    largest weighted squared distance from the nearest of them. The nearest
+    centroids of one-dimensional examples are found by binary search.
+
+    :Returns:
+    the new centroids, one per line.
+
+    """
+    if x.shape[1] == 1:
+        c = np.sort(centroids[:, 0])
+        position = np.searchsorted(c, x[:, 0])
+        nearest = np.minimum(np.square(x[:, 0] - c[np.maximum(position - 1, 0)]),
+                             np.square(x[:, 0] - c[np.minimum(position, len(c) - 1)]))
+    else:
+        nearest = np.concatenate([np.min(np.square(x[start:start + 65536, None, :] - centroids[None, :, :]).sum(axis=2),
+                                         axis=1) for start in range(0, len(x), 65536)])
+    if weights is not None:
+        nearest = nearest * weights
+    return np.vstack([centroids, x[np.argmax(nearest)]])
+
+
+def _clusterShared(shared, seed, arguments):
+    # a restart in a worker process, on the data in shared memory
+    blocks = [None if data is None else SharedMemory(name=data[0]) for data in shared]
+    try:
+        x, weights = [None if data is None else np.ndarray(data[1], np.dtype(data[2]), buffer=block.buf)
+                      for data, block in zip(shared, blocks)]
+        centroids, objective, iterations = _cluster(x, weights, seed, *arguments)
+        del x, weights
+        return centroids, objective, iterations
+    finally:
+        for block in blocks:
+            if block is not None:
+                block.close()
@@ -34,41 +34,103 @@ class FuzzyGranulation(object):
     Fuzzy Partition (SFP).
     '''
 
-    def __init__(self, dataset, centroids, labels):
+    def __init__(self, dataset, centroids, labels, interval=None):
         '''
         Initializes the instances of the class.
         
         :Parameters:
-        dataset: the list of elements.
+        dataset: the list (or the array) of elements (None if the elements
+                 are only streamed, see stream).
         centroids: the list of clusters centroids.
+        interval: the endpoints of the domain of the Strong Fuzzy Partition
+                  (if None, the smallest and the largest element of the
+                  dataset).
         
         '''
-        self._dataset = dataset
+        self._dataset = None if dataset is None else np.asarray(dataset, dtype=np.float64)
         self._labels = labels
-        self._sfp = StrongFuzzyPartition(centroids, labels, (min(self._dataset), max(self._dataset)))
-        self._table = None
+        if interval is None:
+            interval = (self._dataset.min(), self._dataset.max())
+        self._sfp = StrongFuzzyPartition(centroids, labels, interval)
+        self._memberships = None
 
     def __call__(self):
         '''
-        This function creates the table of membership degree to all fuzzy sets
-        of Strong Fuzzy Partition for all dataset elements.
+        This function computes the membership degrees of all the dataset
+        elements to the fuzzy sets of the Strong Fuzzy Partition, at once for
+        the whole dataset (see StrongFuzzyPartition.sparse).
           
         :Returns:
-        self.table: list formed by every item of the dataset and its membership
-                    degree to at least 2 fuzzy sets.
+        self.memberships: the SparseMemberships of the dataset elements, that
+                          hold the two fuzzy sets of every element and the
+                          membership degrees to them.
         
         '''
         logging.warning("\nFuzzy Granulation process in execution...")
         t0 = time()
-        self._table = [(x, self._sfp.membership(x)) for x in self._dataset]
+        self._memberships = self._sfp.sparse(self._dataset)
         tf = time()
         logging.warning(
             "Time elapsed in granulation process: {0:.3f} seconds.".format(tf - t0))
-        return self._table
+        return self._memberships
+
+    def stream(self, chunks, *consumers):
+        '''
+        This function computes the membership degrees of a stream of elements,
+        one chunk at a time: the memberships of a chunk are handed to the
+        consumers (for instance a SigmaCount, or a writer of the ontology)
+        and then released, so only one chunk is held in memory. The domain of
+        the Strong Fuzzy Partition must be known in advance (see bounds).
+
+        :Parameters:
+        chunks: an iterator of the chunks of elements.
+        consumers: the functions called with every chunk of elements and its
+                   SparseMemberships.
+
+        :Returns:
+        the number of elements granulated.
+
+        '''
+        logging.warning("\nStreaming Fuzzy Granulation process in execution...")
+        t0 = time()
+        elements = 0
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64)
+            memberships = self._sfp.sparse(chunk)
+            for consumer in consumers:
+                consumer(chunk, memberships)
+            elements += len(chunk)
+        logging.warning("Time elapsed in granulation process of {0} elements: {1:.3f} seconds.".format(
+            elements, time() - t0))
+        return elements
+
+    @staticmethod
+    def bounds(chunks):
+        '''
+        This function makes a first pass on a stream of elements to find the
+        domain of the Strong Fuzzy Partition, when the clustering did not
+        provide it.
+
+        :Parameters:
+        chunks: an iterator of the chunks of elements.
+
+        :Returns:
+        the smallest and the largest element.
+
+        '''
+        low, high = np.inf, -np.inf
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=np.float64)
+            if len(chunk):
+                low, high = min(low, float(chunk.min())), max(high, float(chunk.max()))
+        if low > high:
+            raise Exception("[FuzzyGranulation] ERROR: the stream of the elements is empty.")
+        return low, high
 
     def plot(self, xlabel, ylabel, path, title, eps=10):
         '''
-        This function draws the granulated elements of the dataset.
+        This function draws the granulated elements of the dataset, after
+        the call that granulates the whole dataset.
         
         :Parameters:
         xlabel: the label for x axis.
@@ -76,20 +138,16 @@ class FuzzyGranulation(object):
         
         '''
         pyplot.close('all')
-        points = {label: [] for label in self._labels}
-        for price, memberships in self._table:
-            for label, ms in memberships:
-                # if ms > 0:
-                points.get(label).append((price, ms))
         minY, maxY = (0.0, 1.0)
-        minU, maxU = (min(self._dataset), max(self._dataset))
+        minU, maxU = (self._dataset.min(), self._dataset.max())
         _, ax = pyplot.subplots()
         for _, fs in self._sfp():
             x, y = zip(*fs._points)
             ax.plot(x, y, color="k", linestyle=":")
-        for label, pts in points.items():
-            x, y = zip(*pts)
-            ax.plot(x, y, marker="o", linestyle="", label=label)
+        index, left, right = self._memberships.index, self._memberships.left, self._memberships.right
+        for k, label in enumerate(self._labels):
+            ms = np.where(index == k, left, 0.) + np.where(index + 1 == k, right, 0.)
+            ax.plot(self._dataset, ms, marker="o", linestyle="", label=label)
         ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), numpoints=1)
         ax.set_title(title)
         ax.set_xlabel(xlabel)
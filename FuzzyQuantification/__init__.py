@@ -20,9 +20,46 @@
 import logging
 from time import time
 
+import numpy as np
 from matplotlib import pyplot
 
-from StrongFuzzyPartition import StrongFuzzyPartition
+from StrongFuzzyPartition import StrongFuzzyPartition, SparseMemberships
+
+
+class SigmaCount(object):
+    '''
+    This class accumulates the sums of the membership degrees to the granules
+    of a Strong Fuzzy Partition over a stream of chunks of elements, so that
+    the sigma-counts are computed without holding the memberships of all the
+    elements (see FuzzyGranulation.stream).
+    '''
+
+    def __init__(self, granules):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        granules: the number of granules.
+
+        '''
+        self.sums = np.zeros(granules)
+        self.elements = 0
+
+    def __call__(self, chunk, memberships):
+        '''
+        This function adds the membership degrees of a chunk of elements.
+
+        :Parameters:
+        chunk: the chunk of elements.
+        memberships: the SparseMemberships of the elements of the chunk, or
+                     their matrix of membership degrees.
+
+        '''
+        if isinstance(memberships, SparseMemberships):
+            self.sums += memberships.sums()
+        else:
+            self.sums += np.asarray(memberships, dtype=float).sum(axis=0)
+        self.elements += len(memberships)
 
 
 class FuzzyQuantification(object):
@@ -37,11 +74,21 @@ class FuzzyQuantification(object):
         :Parameters:
         prototypes: the list of prototypes.
         qlabels: the list of quantifiers labels.
-        granules: the list of granules.
+        granules: the SparseMemberships of the elements to the granules of a
+                  Strong Fuzzy Partition, the SigmaCount accumulated over a
+                  stream of elements, or the matrix of membership degrees,
+                  where each column contains the degrees of the elements to
+                  the granule with the same index in glabels.
         glabels: the list of granules labels.
         
         '''
-        self._granules = granules
+        if isinstance(granules, SigmaCount):
+            self._sums, self._elements = granules.sums, granules.elements
+        elif isinstance(granules, SparseMemberships):
+            self._sums, self._elements = granules.sums(), len(granules)
+        else:
+            self._sums = np.asarray(granules, dtype=float).sum(axis=0)
+            self._elements = len(granules)
         self._granuleslabels = glabels
         self._quantifiers = StrongFuzzyPartition(prototypes, qlabels, (0.0, 1.0))
         self.cardinalities = None
@@ -121,5 +168,4 @@ class FuzzyQuantification(object):
         the value of calculated sigma-count.
         
         '''
-        G = [element.get(granule) for element in self._granules]
-        return sum(G) / len(self._granules)
+        return float(self._sums[self._granuleslabels.index(granule)]) / self._elements
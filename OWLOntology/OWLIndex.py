@@ -0,0 +1,282 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import os
+import sys
+from itertools import product
+from time import time
+from urllib.parse import urljoin
+from xml.etree import ElementTree
+
+OWL = "{http://www.w3.org/2002/07/owl#}"
+XML = "{http://www.w3.org/XML/1998/namespace}"
+
+
+class OWLIndex(object):
+    '''
+    This class answers the queries of GranulO from an ontology written in
+    OWL/XML syntax, without a SPARQL end-point. The file is parsed one axiom
+    at a time and the assertions are kept in indexes by class and by
+    property. The types are closed under the subclass axioms, the domain and
+    range axioms, the subproperty and inverse property axioms and the
+    equivalent classes defined as an intersection of classes and hasValue
+    restrictions; the other class expressions are ignored.
+    '''
+
+    def __init__(self, filename):
+        '''
+        Initializes the instance of the class.
+
+        :Parameter:
+        filename: filename of the ontology
+
+        '''
+        if not os.path.exists(filename):
+            raise Exception("[OWLIndex] ERROR: {} file does not exists.".format(filename))
+        self.filename = filename
+        self._base = ""
+        self._prefixes = {}
+        self._types = {}
+        self._superclasses = {}
+        self._definitions = []
+        self._objects = {}
+        self._data = {}
+        self._domains = {}
+        self._ranges = {}
+        self._superproperties = {}
+        self._inverses = []
+        self._members = {}
+
+        logging.warning("\nOWLIndex is reading the ontology " + filename + "...")
+        t0 = time()
+        self._parse(filename)
+        self._materialize()
+        logging.warning("Ontology has been indexed in {0:.3f} seconds: {1} individuals, {2} classes."
+                        .format(time() - t0, len(self._types), len(self._members)))
+
+    def binary(self, domainClass, dataProperty):
+        '''
+        This function extracts the values of a data property of the
+        individuals of a class.
+
+        :Parameters:
+        domainClass: the IRI of the class.
+        dataProperty: the IRI of the data property, or the list of the IRIs
+                      of some data properties, whose values are combined as
+                      the joins of a SPARQL query would do.
+
+        :Returns:
+        the list of the (individual, value) tuples (with a value for every
+        data property).
+
+        '''
+        members = self._members.get(domainClass, {})
+        columns = [self._data.get(p, {}) for p in (dataProperty if isinstance(dataProperty, list) else [dataProperty])]
+        return [(individual,) + values for individual in columns[0] if individual in members
+                for values in product(*[column.get(individual, {}) for column in columns])]
+
+    def ternary(self, domainClass, rangeClass, objectProperties, dataProperty):
+        '''
+        This function extracts the values of a data property of the auxiliary
+        individuals that link the individuals of a domain class to the
+        individuals of a range class.
+
+        :Parameters:
+        domainClass: the IRI of the domain class.
+        rangeClass: the IRI of the range class.
+        objectProperties: the IRIs of the object properties from the domain
+                          to the auxiliary individual and from the auxiliary
+                          individual to the range.
+        dataProperty: the IRI of the data property, or the list of the IRIs
+                      of some data properties.
+
+        :Returns:
+        the list of the (domain, range, auxiliary, value) tuples (with a value
+        for every data property).
+
+        '''
+        domains = self._members.get(domainClass, {})
+        ranges = self._members.get(rangeClass, {})
+        toAuxiliary = self._objects.get(objectProperties[0], {})
+        fromAuxiliary = self._objects.get(objectProperties[1], {})
+        columns = [self._data.get(p, {}) for p in (dataProperty if isinstance(dataProperty, list) else [dataProperty])]
+        return [(domain, range, auxiliary) + values
+                for domain, auxiliaries in toAuxiliary.items() if domain in domains
+                for auxiliary in auxiliaries
+                for range in fromAuxiliary.get(auxiliary, {}) if range in ranges
+                for values in product(*[column.get(auxiliary, {}) for column in columns])]
+
+    def count(self, classes, limit=0):
+        '''
+        This function counts the individuals of the classes.
+
+        :Parameters:
+        classes: the list of the IRIs of the classes.
+        limit: the maximum number of individuals counted for every class (0
+               to count all of them).
+
+        :Returns:
+        the dictionary where the keys are the classes and the values are the
+        numbers of individuals.
+
+        '''
+        return {c: min(len(self._members.get(c, {})), limit) if limit > 0 else len(self._members.get(c, {}))
+                for c in classes}
+
+    def _parse(self, filename):
+        depth = 0
+        for event, element in ElementTree.iterparse(filename, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if depth == 1:
+                    self._base = element.get(XML + "base") or element.get("ontologyIRI", "")
+                continue
+            depth -= 1
+            if depth == 1:
+                # an axiom has been read: it is indexed and its tree is released
+                self._axiom(element)
+                element.clear()
+
+    def _axiom(self, axiom):
+        tag = axiom.tag.replace(OWL, "")
+        children = list(axiom)
+        if tag == "Prefix":
+            self._prefixes[axiom.get("name")] = axiom.get("IRI")
+        elif tag == "ClassAssertion":
+            if children[0].tag == OWL + "Class":
+                self._type(self._iri(children[1]), self._iri(children[0]))
+        elif tag == "ObjectPropertyAssertion":
+            subject, object = self._iri(children[1]), self._iri(children[2])
+            if children[0].tag == OWL + "ObjectInverseOf":
+                subject, object = object, subject
+            self._objects.setdefault(self._iri(children[0]), {}).setdefault(subject, {})[object] = None
+        elif tag == "DataPropertyAssertion":
+            # the values are kept as the keys of a dictionary, so that an assertion is stored once
+            self._data.setdefault(self._iri(children[0]), {}).setdefault(self._iri(children[1]), {})[
+                sys.intern(children[2].text or "")] = None
+        elif tag == "SubClassOf":
+            if all(child.tag == OWL + "Class" for child in children):
+                self._superclasses.setdefault(self._iri(children[0]), set()).add(self._iri(children[1]))
+        elif tag == "EquivalentClasses":
+            named = [self._iri(child) for child in children if child.tag == OWL + "Class"]
+            for c in named:
+                self._superclasses.setdefault(c, set()).update(other for other in named if other != c)
+            for child in children:
+                if child.tag == OWL + "ObjectIntersectionOf":
+                    self._define(named, list(child))
+        elif tag in ("ObjectPropertyDomain", "DataPropertyDomain"):
+            if children[1].tag == OWL + "Class":
+                self._domains.setdefault(self._iri(children[0]), set()).add(self._iri(children[1]))
+        elif tag == "ObjectPropertyRange":
+            if children[1].tag == OWL + "Class":
+                self._ranges.setdefault(self._iri(children[0]), set()).add(self._iri(children[1]))
+        elif tag in ("SubObjectPropertyOf", "SubDataPropertyOf"):
+            if all(child.get("IRI") or child.get("abbreviatedIRI") for child in children):
+                self._superproperties.setdefault(self._iri(children[0]), set()).add(self._iri(children[1]))
+        elif tag == "InverseObjectProperties":
+            self._inverses.append((self._iri(children[0]), self._iri(children[1])))
+
+    def _define(self, named, operands):
+        # an equivalent class defined as the intersection of classes and hasValue restrictions
+        classes, restrictions = [], []
+        for operand in operands:
+            if operand.tag == OWL + "Class":
+                classes.append(self._iri(operand))
+            elif operand.tag == OWL + "ObjectHasValue":
+                restrictions.append((self._iri(operand[0]), self._iri(operand[1])))
+            else:
+                return
+        for c in named:
+            self._definitions.append((c, classes, restrictions))
+
+    def _iri(self, element):
+        if element.get("IRI") is not None:
+            return sys.intern(urljoin(self._base, element.get("IRI")))
+        if element.get("abbreviatedIRI") is not None:
+            prefix, _, name = element.get("abbreviatedIRI").partition(":")
+            return sys.intern(self._prefixes.get(prefix, prefix + ":") + name)
+        return sys.intern("_:" + element.get("nodeID", ""))
+
+    def _type(self, individual, c):
+        self._types.setdefault(individual, {})[c] = None
+
+    def _materialize(self):
+        for p, q in self._inverses:
+            for s, o in [(s, o) for s, objects in self._objects.get(p, {}).items() for o in objects]:
+                self._objects.setdefault(q, {}).setdefault(o, {})[s] = None
+            for s, o in [(s, o) for s, objects in self._objects.get(q, {}).items() for o in objects]:
+                self._objects.setdefault(p, {}).setdefault(o, {})[s] = None
+
+        for p in list(self._superproperties):
+            for q in self._closure(p, self._superproperties):
+                if p in self._objects:
+                    for s, objects in self._objects[p].items():
+                        self._objects.setdefault(q, {}).setdefault(s, {}).update(objects)
+                if p in self._data:
+                    for s, values in self._data[p].items():
+                        self._data.setdefault(q, {}).setdefault(s, {}).update(values)
+
+        for p, objects in self._objects.items():
+            for s, targets in objects.items():
+                for c in self._domains.get(p, ()):
+                    self._type(s, c)
+                for o in targets:
+                    for c in self._ranges.get(p, ()):
+                        self._type(o, c)
+        for p, values in self._data.items():
+            for s in values:
+                for c in self._domains.get(p, ()):
+                    self._type(s, c)
+
+        closures = {}
+        for individual, classes in self._types.items():
+            for c in list(classes):
+                if c not in closures:
+                    closures[c] = self._closure(c, self._superclasses)
+                for superclass in closures[c]:
+                    self._members.setdefault(superclass, {})[individual] = None
+        for individual, classes in self._types.items():
+            for c in classes:
+                self._members.setdefault(c, {})[individual] = None
+
+        # the defined classes are evaluated until no individual is added
+        changed = True
+        while changed:
+            changed = False
+            for c, classes, restrictions in self._definitions:
+                candidates = self._members.get(classes[0], {}) if classes else self._types
+                for individual in list(candidates):
+                    if individual in self._members.get(c, {}):
+                        continue
+                    if all(individual in self._members.get(other, {}) for other in classes[1:]) and \
+                            all(value in self._objects.get(p, {}).get(individual, {}) for p, value in restrictions):
+                        for superclass in [c] + list(self._closure(c, self._superclasses)):
+                            self._members.setdefault(superclass, {})[individual] = None
+                        changed = True
+
+    @staticmethod
+    def _closure(node, edges):
+        closure, pending = set(), [node]
+        while pending:
+            for parent in edges.get(pending.pop(), ()):
+                if parent not in closure and parent != node:
+                    closure.add(parent)
+                    pending.append(parent)
+        return closure
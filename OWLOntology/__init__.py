@@ -22,6 +22,7 @@ import sys
 from html import escape
 
 from utils import FileHandler
+from .OWLIndex import OWLIndex
 
 
 class OWLOntology(object):
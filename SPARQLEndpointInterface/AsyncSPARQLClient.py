@@ -0,0 +1,226 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+from time import time
+from urllib.parse import urlencode, urlsplit
+
+
+class AsyncSPARQLClient(object):
+    '''
+    This class is an asyncio client of a SPARQL end-point. It keeps a pool of
+    keep-alive HTTP/1.1 connections to the end-point, so that the queries do
+    not open a new connection each, and it sends the queries concurrently,
+    capping the number of queries in flight with a semaphore.
+    '''
+
+    def __init__(self, uri, connections=4, timeout=600., accept="application/sparql-results+json"):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        uri: the uri of the SPARQL end-point.
+        connections: maximum number of connections (and of concurrent
+                     queries).
+        timeout: maximum number of seconds to wait for the answer to a query
+                 (None to wait forever).
+        accept: the Accept header of the queries, which negotiates the
+                result format (see fetch).
+
+        '''
+        url = urlsplit(uri)
+        self._ssl = url.scheme == "https"
+        self._host = url.hostname
+        self._port = url.port or (443 if self._ssl else 80)
+        self._path = (url.path or "/") + ("?" + url.query if url.query else "")
+        self._connections = connections
+        self._timeout = timeout
+        self._accept = accept
+        self._idle = []
+        self._semaphore = None
+        self.opened = 0
+        '''The number of connections opened by the client.'''
+
+    async def query(self, statement):
+        '''
+        This function sends the query to the SPARQL end-point on a connection
+        of the pool.
+
+        :Parameters:
+        statement: query in string form to send.
+
+        :Returns:
+        resultset: the result-set in JSON format.
+
+        '''
+        _, text = await self.fetch(statement)
+        return json.loads(text)
+
+    async def fetch(self, statement):
+        '''
+        This function sends the query to the SPARQL end-point on a connection
+        of the pool, without parsing the answer.
+
+        :Parameters:
+        statement: query in string form to send.
+
+        :Returns:
+        contentType: the content type of the answer;
+        text: the decoded (and decompressed) body of the answer.
+
+        '''
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._connections)
+        async with self._semaphore:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    status, headers, body = await self._send(connection, statement)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # the end-point has closed the idle connection: the query is sent again on a new one
+                    connection[1].close()
+                    connection = await self._connect()
+                    status, headers, body = await self._send(connection, statement)
+            except BaseException:
+                # the state of the connection is unknown: it is closed instead of going back to the pool
+                connection[1].close()
+                raise
+            if headers.get("connection", "").lower() == "close":
+                connection[1].close()
+            else:
+                self._idle.append(connection)
+        if status != 200:
+            raise Exception("[AsyncSPARQLClient query] ERROR: the end-point answered with status {0}.".format(status))
+        if headers.get("content-encoding", "") == "gzip":
+            body = gzip.decompress(body)
+        return headers.get("content-type", ""), body.decode("utf-8")
+
+    async def queryAll(self, statements, raw=False):
+        '''
+        This function sends all the queries concurrently.
+
+        :Parameters:
+        statements: list of queries in string form to send.
+        raw: if True, the answers are not parsed (see fetch).
+
+        :Returns:
+        the list of the result-sets, in the same order of the queries.
+
+        '''
+        send = self.fetch if raw else self.query
+        return await asyncio.gather(*[send(statement) for statement in statements])
+
+    async def close(self):
+        '''
+        This function closes the idle connections of the pool.
+
+        '''
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._semaphore = None
+
+    def run(self, statements, raw=False):
+        '''
+        This function sends all the queries concurrently from synchronous
+        code, and closes the connections when all the answers have arrived.
+
+        :Parameters:
+        statements: list of queries in string form to send.
+        raw: if True, the answers are not parsed (see fetch).
+
+        :Returns:
+        the list of the result-sets, in the same order of the queries.
+
+        '''
+        async def main():
+            try:
+                return await self.queryAll(statements, raw)
+            finally:
+                await self.close()
+
+        logging.warning("\nAsyncSPARQLClient is executing {0} queries on {1} connections..."
+                        .format(len(statements), self._connections))
+        t0 = time()
+        resultsets = asyncio.run(main())
+        logging.warning("Queries have been executed in {0:.3f} seconds!".format(time() - t0))
+        return resultsets
+
+    async def _connect(self):
+        connection = await asyncio.open_connection(self._host, self._port, ssl=self._ssl or None)
+        self.opened += 1
+        return connection
+
+    async def _send(self, connection, statement):
+        try:
+            return await asyncio.wait_for(self._request(connection, statement), self._timeout)
+        except asyncio.TimeoutError:
+            raise Exception("[AsyncSPARQLClient query] ERROR: the end-point has not answered in {0} seconds."
+                            .format(self._timeout))
+
+    async def _request(self, connection, statement):
+        reader, writer = connection
+        body = urlencode({"query": statement}).encode("utf-8")
+        head = ("POST {0} HTTP/1.1\r\n"
+                "Host: {1}:{2}\r\n"
+                "Accept: {4}\r\n"
+                "Accept-Encoding: gzip\r\n"
+                "Content-Type: application/x-www-form-urlencoded\r\n"
+                "Content-Length: {3}\r\n"
+                "Connection: keep-alive\r\n"
+                "\r\n").format(self._path, self._host, self._port, len(body), self._accept)
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+        line = await reader.readline()
+        if not line:
+            raise ConnectionResetError("[AsyncSPARQLClient] the connection has been closed.")
+        status = int(line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            content = b"".join(chunks)
+        elif "content-length" in headers:
+            content = await reader.readexactly(int(headers["content-length"]))
+        else:
+            content = await reader.read()
+            headers["connection"] = "close"
+        return status, headers, content
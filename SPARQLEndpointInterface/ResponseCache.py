@@ -0,0 +1,225 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from time import time
+
+# a quoted string (kept as it is) or a run of white spaces (collapsed)
+WHITESPACE = re.compile(r'("(?:[^"\\]|\\.)*"|\'(?:[^\'\\]|\\.)*\')|\s+')
+
+
+class ResponseCache(object):
+    '''
+    This class stores the responses of a SPARQL end-point on disk, in gzip
+    compressed JSON files named after the hash of the end-point and of the
+    normalised query. The responses expire after a time to live and the
+    least recently used ones are evicted when the cache exceeds its size.
+    In replay mode the responses are only read: a query that has not been
+    recorded is an error, so that no live end-point is ever contacted.
+    '''
+
+    def __init__(self, directory, ttl=0, maxSize=0, replay=False):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        directory: the directory where the responses are stored.
+        ttl: the time to live of the responses in seconds (0 if they never
+             expire).
+        maxSize: the maximum size of the cache in bytes (0 if it is
+                 unbounded).
+        replay: if True, the responses are only served from the cache.
+
+        '''
+        self.directory = directory
+        self.ttl = ttl
+        self.maxSize = maxSize
+        self.replay = replay
+        self._size = None
+
+    @staticmethod
+    def normalize(statement):
+        '''
+        This function normalises the text of a query, collapsing the white
+        spaces outside the quoted strings.
+
+        :Parameters:
+        statement: query in string form.
+
+        :Returns:
+        the normalised query.
+
+        '''
+        return WHITESPACE.sub(lambda match: match.group(1) or " ", statement).strip()
+
+    def key(self, uri, statement, kind):
+        '''
+        This function creates the key of a response.
+
+        :Parameters:
+        uri: the uri of the SPARQL end-point.
+        statement: query in string form.
+        kind: the kind of the response (the format of the result-set).
+
+        :Returns:
+        the key of the response.
+
+        '''
+        return hashlib.sha256("\n".join([uri, kind, ResponseCache.normalize(statement)]).encode("utf-8")).hexdigest()
+
+    def get(self, uri, statement, kind):
+        '''
+        This function reads a response from the cache. A hit marks the
+        response as recently used.
+
+        :Parameters:
+        uri: the uri of the SPARQL end-point.
+        statement: query in string form.
+        kind: the kind of the response (the format of the result-set).
+
+        :Returns:
+        the response, or None if it is missing or expired.
+
+        '''
+        filename = self._filename(self.key(uri, statement, kind))
+        try:
+            with gzip.open(filename, "rt", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, EOFError, ValueError):
+            entry = None
+        if entry is not None and not self.replay and self.ttl > 0 and time() - entry["recorded"] > self.ttl:
+            entry = None
+        if entry is None:
+            if self.replay:
+                raise Exception("[ResponseCache get] ERROR: no recorded response for the query:\n\n" + statement)
+            return None
+        os.utime(filename)
+        return entry["response"]
+
+    def put(self, uri, statement, kind, response):
+        '''
+        This function writes a response into the cache and evicts the least
+        recently used responses if the cache exceeds its size. The file is
+        written under a temporary name and then renamed, so that a response
+        is never read half-written.
+
+        :Parameters:
+        uri: the uri of the SPARQL end-point.
+        statement: query in string form.
+        kind: the kind of the response (the format of the result-set).
+        response: the response to store (it must be serializable in JSON).
+
+        '''
+        if self.replay:
+            return
+        filename = self._filename(self.key(uri, statement, kind))
+        temporary = self._temporary(filename)
+        with gzip.open(temporary, "wt", encoding="utf-8") as file:
+            json.dump({"endpoint": uri, "kind": kind, "query": statement, "recorded": time(),
+                       "response": response}, file, separators=(",", ":"))
+        self._commit(temporary, filename)
+
+    def record(self, uri, statement, kind, fields, rows):
+        '''
+        This function writes a result-set into the cache while it is read,
+        without building it in memory: the rows are written to the temporary
+        file as they pass through and the file is renamed into place only
+        when the iteration is complete. A result-set that is not read to its
+        end is not stored.
+
+        :Parameters:
+        uri: the uri of the SPARQL end-point.
+        statement: query in string form.
+        kind: the kind of the response (the format of the result-set).
+        fields: the list of the variables of the result-set.
+        rows: the iterator of the rows.
+
+        :Returns:
+        the iterator of the same rows.
+
+        '''
+        if self.replay:
+            yield from rows
+            return
+        filename = self._filename(self.key(uri, statement, kind))
+        temporary = self._temporary(filename)
+        complete = False
+        try:
+            with gzip.open(temporary, "wt", encoding="utf-8") as file:
+                header = json.dumps({"endpoint": uri, "kind": kind, "query": statement, "recorded": time(),
+                                     "response": {"fields": fields, "rows": []}}, separators=(",", ":"))
+                # the rows are written inside the empty list closing the header
+                file.write(header[:-3])
+                separator = ""
+                for row in rows:
+                    file.write(separator + json.dumps(row, separators=(",", ":")))
+                    separator = ","
+                    yield row
+                file.write(header[-3:])
+            complete = True
+            self._commit(temporary, filename)
+        finally:
+            if not complete:
+                try:
+                    os.remove(temporary)
+                except OSError:
+                    pass
+
+    def _temporary(self, filename):
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        return filename + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+
+    def _commit(self, temporary, filename):
+        replaced = os.path.getsize(filename) if os.path.exists(filename) else 0
+        os.replace(temporary, filename)
+        if self.maxSize > 0:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                # a response that is written again replaces the size of the old one
+                self._size += os.path.getsize(filename) - replaced
+            if self._size > self.maxSize:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self._size = sum(size for _, size, _ in entries)
+        # the least recently used responses are removed until the cache is back to 90% of its size
+        while entries and self._size > 0.9 * self.maxSize:
+            filename, size, _ = entries.pop(0)
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            self._size -= size
+
+    def _entries(self):
+        for path, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(".json.gz"):
+                    stat = os.stat(os.path.join(path, filename))
+                    yield os.path.join(path, filename), stat.st_size, stat.st_mtime
+
+    def _filename(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json.gz")
@@ -17,10 +17,25 @@
 	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import csv
+import gzip
+import io
+import json
 import logging
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from time import time
 
-from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper import SPARQLWrapper, JSON, CSV, TSV
+
+from .AsyncSPARQLClient import AsyncSPARQLClient
+from .ResponseCache import ResponseCache
+
+# Accept headers of the streamed result formats: JSON is the fallback for the end-points that do not support them.
+ACCEPT = {TSV: "text/tab-separated-values, application/sparql-results+json;q=0.5",
+          CSV: "text/csv, application/sparql-results+json;q=0.5",
+          JSON: "application/sparql-results+json"}
 
 
 class SPARQLEndpointInterface(object):
@@ -29,6 +44,9 @@ class SPARQLEndpointInterface(object):
     SPARQL end-point interface.
     '''
 
+    responseCache = None
+    '''The ResponseCache shared by all the instances (None if disabled).'''
+
     def __init__(self, uri):
         '''
         Initializes the instance of the class.
@@ -37,6 +55,7 @@ class SPARQLEndpointInterface(object):
         uri: the uri of the ontology to query.
         
         '''
+        self._uri = uri
         self._sparql = SPARQLWrapper(uri)
 
     def __call__(self, statement):
@@ -51,6 +70,13 @@ class SPARQLEndpointInterface(object):
         
         '''
         resultset = []
+        cache = SPARQLEndpointInterface.responseCache
+        if cache is not None:
+            resultset = cache.get(self._uri, statement, JSON)
+            if resultset is not None:
+                logging.warning("\nSPARQLInterface has read the result of the following query from the response cache...")
+                logging.warning(statement)
+                return resultset
         self._sparql.setQuery(statement)
         self._sparql.setReturnFormat(JSON)
         logging.warning("\nSPARQLInterface is executing the following query...")
@@ -66,4 +92,269 @@ class SPARQLEndpointInterface(object):
         self._sparql.resetQuery()
         logging.warning("Result:")
         logging.warning(resultset)
+        if cache is not None:
+            cache.put(self._uri, statement, JSON, resultset)
         return resultset
+
+    def stream(self, statement, resultFormat=TSV):
+        '''
+        This function sends the query to the SPARQL end-point and reads the
+        result-set while it arrives, instead of building it in memory. The
+        result format is negotiated with the end-point (JSON is the fallback)
+        and the transfer can be compressed with gzip.
+
+        :Parameters:
+        statement: query in string form to send.
+        resultFormat: the preferred result format (TSV, CSV or JSON).
+
+        :Returns:
+        fields: the list of the variables of the result-set.
+        rows: the iterator of the rows; every row is a tuple of values in the
+              same order of fields (None for the unbound variables).
+
+        '''
+        return self._cached(statement, resultFormat, lambda: self._stream(statement, resultFormat))
+
+    def _stream(self, statement, resultFormat):
+        self._sparql.setQuery(statement)
+        self._sparql.setReturnFormat(resultFormat)
+        self._sparql.setOnlyConneg(True)
+        self._sparql.addCustomHttpHeader("Accept", ACCEPT.get(resultFormat))
+        self._sparql.addCustomHttpHeader("Accept-Encoding", "gzip")
+        logging.warning("\nSPARQLInterface is streaming the result of the following query...")
+        logging.warning(statement)
+        try:
+            t0 = time()
+            response = self._sparql.query().response
+            tf = time()
+            logging.warning("Query has been executed in {0:.3f} seconds!".format(tf - t0))
+        finally:
+            self._sparql.clearCustomHttpHeader("Accept")
+            self._sparql.clearCustomHttpHeader("Accept-Encoding")
+            self._sparql.setOnlyConneg(False)
+            self._sparql.resetQuery()
+        info = response.info()
+        if info.get("Content-Encoding", "") == "gzip":
+            response = gzip.GzipFile(fileobj=response)
+        text = io.TextIOWrapper(response, encoding="utf-8", newline="")
+        fields, rows = SPARQLEndpointInterface._read(info.get("Content-Type", ""), text)
+        return fields, SPARQLEndpointInterface._logCount(rows)
+
+    def paginate(self, statement, orderBy, pageSize=10000, inFlight=4, resultFormat=TSV, keyset=False,
+                 targetLatency=2.0):
+        '''
+        This function extracts the result-set of the query one page at a
+        time, so that the end-point never has to evaluate and send the whole
+        result-set in one response. The pages are defined by ORDER BY plus
+        LIMIT/OFFSET and up to inFlight pages are requested concurrently; the
+        size of the next pages grows or shrinks so that a page takes about
+        targetLatency seconds. With keyset pagination the pages are requested
+        one after the other, filtering on the first variable of orderBy.
+
+        :Parameters:
+        statement: query in string form, ending with the closing brace of
+                   the WHERE clause.
+        orderBy: list of the variables (without "?") that order the rows.
+        pageSize: number of rows of the first page.
+        inFlight: maximum number of pages requested concurrently.
+        resultFormat: result format of the pages (TSV, CSV or JSON).
+        keyset: if True, use keyset pagination instead of LIMIT/OFFSET.
+        targetLatency: the latency in seconds the page size adapts to.
+
+        :Returns:
+        fields: the list of the variables of the result-set.
+        rows: the iterator of the rows, in the same order of a single query
+              ordered by orderBy.
+
+        '''
+        # the whole result-set is cached, since the pages depend on the observed latency
+        kind = "/".join(["keyset" if keyset else "offset", resultFormat] + orderBy)
+        return self._cached(statement, kind, lambda: self._paginate(statement, orderBy, pageSize, inFlight,
+                                                                    resultFormat, keyset, targetLatency))
+
+    def _paginate(self, statement, orderBy, pageSize, inFlight, resultFormat, keyset, targetLatency):
+        if keyset:
+            key = orderBy[0]
+            ordering = " ORDER BY STR(?" + key + ") " + " ".join("?" + variable for variable in orderBy[1:])
+            closure = statement.rindex("}")
+            page = lambda size, last: SPARQLEndpointInterface._page(
+                self._uri, statement[:closure] + SPARQLEndpointInterface._keyFilter(key, last) + statement[closure:] +
+                ordering + " LIMIT {0}".format(size), resultFormat)
+            fields, first, _ = page(pageSize, None)
+            return fields, self._keysetPages(page, fields.index(key), first, pageSize)
+        ordering = " ORDER BY " + " ".join("?" + variable for variable in orderBy)
+        page = lambda size, offset: SPARQLEndpointInterface._page(
+            self._uri, statement + ordering + " LIMIT {0} OFFSET {1}".format(size, offset), resultFormat)
+
+        # the first page is requested alone: it gives the fields and the first measure of the latency
+        fields, first, latency = page(pageSize, 0)
+        return fields, self._offsetPages(page, first, latency, pageSize, inFlight, targetLatency)
+
+    def queryAll(self, statements, connections=4, resultFormat=JSON):
+        '''
+        This function sends many queries to the SPARQL end-point concurrently,
+        with an asyncio client that keeps a pool of keep-alive connections.
+        With a TSV or CSV result format the format is negotiated like in
+        stream (JSON is the fallback) and the answers are parsed in rows.
+
+        :Parameters:
+        statements: list of queries in string form to send.
+        connections: maximum number of connections (and of concurrent
+                     queries).
+        resultFormat: the preferred result format (TSV, CSV or JSON).
+
+        :Returns:
+        the list of the result-sets, in the same order of the queries: in
+        JSON format, or (fields, rows) tuples like the ones returned by
+        stream if the result format is TSV or CSV.
+
+        '''
+        cache = SPARQLEndpointInterface.responseCache
+        rows = resultFormat != JSON
+        resultsets = [None if cache is None else cache.get(self._uri, statement, resultFormat)
+                      for statement in statements]
+        pending = [statement for statement, resultset in zip(statements, resultsets) if resultset is None]
+        for statement in pending:
+            logging.warning(statement)
+        client = AsyncSPARQLClient(self._uri, connections, accept=ACCEPT.get(resultFormat))
+        answers = iter(client.run(pending, raw=rows) if pending else [])
+        for index, statement in enumerate(statements):
+            if resultsets[index] is None:
+                resultsets[index] = next(answers)
+                if rows:
+                    fields, parsed = SPARQLEndpointInterface._read(resultsets[index][0],
+                                                                   io.StringIO(resultsets[index][1], newline=""))
+                    resultsets[index] = {"fields": fields, "rows": list(parsed)}
+                if cache is not None:
+                    # the rows are cached like the ones of stream, which reads them with the same key
+                    cache.put(self._uri, statement, resultFormat, resultsets[index])
+        if rows:
+            return [(resultset["fields"], iter([tuple(row) for row in resultset["rows"]])) for resultset in resultsets]
+        return resultsets
+
+    def _cached(self, statement, kind, query):
+        cache = SPARQLEndpointInterface.responseCache
+        if cache is None:
+            return query()
+        response = cache.get(self._uri, statement, kind)
+        if response is not None:
+            logging.warning("\nSPARQLInterface has read the result of the following query from the response cache...")
+            logging.warning(statement)
+            return response["fields"], iter([tuple(row) for row in response["rows"]])
+        fields, rows = query()
+        return fields, cache.record(self._uri, statement, kind, fields, rows)
+
+    def _offsetPages(self, page, first, latency, pageSize, inFlight, targetLatency):
+        for row in first:
+            yield row
+        if len(first) < pageSize:
+            return
+        offset = size = pageSize
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=inFlight) as executor:
+            while True:
+                size = SPARQLEndpointInterface._adapt(size, latency, targetLatency)
+                while len(pending) < inFlight:
+                    pending.append((size, executor.submit(page, size, offset)))
+                    offset += size
+                requested, future = pending.popleft()
+                _, rows, latency = future.result()
+                for row in rows:
+                    yield row
+                if len(rows) < requested:
+                    # the last page has been reached: the pages after it are empty
+                    for _, future in pending:
+                        future.cancel()
+                    return
+
+    def _keysetPages(self, page, index, rows, pageSize):
+        last, size = None, pageSize
+        while len(rows) == size:
+            # the rows of the last key may continue in the next page, so they are requested again with it
+            complete = [row for row in rows if row[index] != rows[-1][index]]
+            if complete:
+                for row in complete:
+                    yield row
+                last, size = complete[-1][index], pageSize
+            else:
+                # a single key fills the whole page: the page is enlarged
+                size *= 2
+            _, rows, _ = page(size, last)
+        for row in rows:
+            yield row
+
+    @staticmethod
+    def _keyFilter(key, last):
+        if last is None:
+            return ""
+        return " FILTER(STR(?{0}) > \"{1}\") ".format(key, last.replace("\\", "\\\\").replace('"', '\\"'))
+
+    @staticmethod
+    def _page(uri, query, resultFormat):
+        t0 = time()
+        fields, rows = SPARQLEndpointInterface(uri)._stream(query, resultFormat)
+        rows = list(rows)
+        return fields, rows, time() - t0
+
+    @staticmethod
+    def _adapt(size, latency, targetLatency, minSize=100, maxSize=1000000):
+        ratio = min(max(targetLatency / max(latency, 1e-3), 0.5), 2.0)
+        return int(min(max(size * ratio, minSize), maxSize))
+
+    @staticmethod
+    def _logCount(rows):
+        count = 0
+        for row in rows:
+            count += 1
+            yield row
+        logging.warning("Result: {0} rows have been streamed.".format(count))
+
+    @staticmethod
+    def _read(contentType, text):
+        if "tab-separated-values" in contentType:
+            return SPARQLEndpointInterface._readTSV(text)
+        if "csv" in contentType:
+            return SPARQLEndpointInterface._readCSV(text)
+        return SPARQLEndpointInterface._readJSON(text)
+
+    @staticmethod
+    def _readTSV(text):
+        fields = [field[1:] for field in text.readline().rstrip("\r\n").split("\t")]
+        rows = (tuple(SPARQLEndpointInterface._term(term) for term in line.rstrip("\r\n").split("\t"))
+                for line in text if line.strip("\r\n"))
+        return fields, rows
+
+    @staticmethod
+    def _readCSV(text):
+        reader = csv.reader(text)
+        fields = next(reader, [])
+        rows = (tuple(value if value != "" else None for value in row) for row in reader if row)
+        return fields, rows
+
+    @staticmethod
+    def _readJSON(text):
+        resultset = json.load(text)
+        fields = resultset["head"]["vars"]
+        rows = (tuple(binding[field]["value"] if field in binding else None for field in fields)
+                for binding in resultset["results"]["bindings"])
+        return fields, rows
+
+    @staticmethod
+    def _term(term):
+        '''
+        This function converts a RDF term of a TSV result-set in its value:
+        IRIs lose the angle brackets and literals lose the quotes, the
+        datatype and the language tag.
+
+        '''
+        if term == "":
+            return None
+        if term[0] == "<":
+            return term[1:-1]
+        if term[0] == '"':
+            value = term[1:term.rindex('"')]
+            if "\\" in value:
+                value = re.sub(r"\\(.)", lambda m: {"t": "\t", "n": "\n", "r": "\r"}.get(m.group(1), m.group(1)),
+                               value)
+            return value
+        return term
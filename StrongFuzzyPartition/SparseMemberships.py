@@ -0,0 +1,91 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+
+class SparseMemberships(object):
+    '''
+    This class holds the membership degrees of some elements to the fuzzy
+    sets of a Strong Fuzzy Partition. An element has a membership degree
+    greater than zero to two consecutive fuzzy sets at most, so only the
+    index of the left fuzzy set and the degrees to the left and to the right
+    fuzzy set are stored for every element, in three arrays: the memory is
+    linear in the number of elements, whatever the number of fuzzy sets.
+    '''
+
+    def __init__(self, index, left, right, granules):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        index: the index of the left fuzzy set of every element (the right
+               one is the next).
+        left: the membership degree of every element to the left fuzzy set.
+        right: the membership degree of every element to the right fuzzy set.
+        granules: the number of fuzzy sets.
+
+        '''
+        self.index = np.asarray(index, dtype=np.int32)
+        self.left = np.asarray(left, dtype=np.float64)
+        self.right = np.asarray(right, dtype=np.float64)
+        self.granules = granules
+
+    def __len__(self):
+        return len(self.index)
+
+    def sums(self):
+        '''
+        This function calculates the sum of the membership degrees of all the
+        elements to every fuzzy set.
+
+        :Returns:
+        the array of the sums, in the order of the fuzzy sets.
+
+        '''
+        return np.bincount(self.index, self.left, self.granules) + \
+            np.bincount(self.index + 1, self.right, self.granules)
+
+    def degrees(self):
+        '''
+        This function iterates over the membership degrees of the elements.
+
+        :Returns:
+        for every element, the list of the (index, degree) pairs of the fuzzy
+        sets where the degree is greater than zero, in the order of the fuzzy
+        sets.
+
+        '''
+        for index, left, right in zip(self.index.tolist(), self.left.tolist(), self.right.tolist()):
+            yield [pair for pair in ((index, left), (index + 1, right)) if pair[1] > 0]
+
+    def dense(self):
+        '''
+        This function creates the membership matrix.
+
+        :Returns:
+        the matrix of the membership degrees, with a line for every element
+        and a column for every fuzzy set.
+
+        '''
+        matrix = np.zeros((len(self.index), self.granules))
+        rows = np.arange(len(self.index))
+        matrix[rows, self.index] = self.left
+        matrix[rows, self.index + 1] = self.right
+        return matrix
@@ -17,10 +17,12 @@
 	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+import numpy as np
 from matplotlib import pyplot
 
 from Fuzzython.fsets.trapezoid import Trapezoid
 from Fuzzython.fsets.triangular import Triangular
+from .SparseMemberships import SparseMemberships
 
 
 class StrongFuzzyPartition(object):
@@ -91,6 +93,62 @@ class StrongFuzzyPartition(object):
         '''
         return [(label, float(mf(x))) for label, mf in self._sfp]
 
+    def segments(self, x):
+        '''
+        This function calculates, for an array of elements, the two fuzzy sets
+        where the elements can have a membership degree greater than zero. The
+        fuzzy sets are linear between two consecutive prototypes, so the
+        segment of every element is found by binary search on the sorted
+        prototypes.
+
+        :Parameters:
+        x: the array of the elements.
+
+        :Returns:
+        index: the index of the left fuzzy set of every element (the right
+               one is the next);
+        left: the membership degree of every element to the left fuzzy set;
+        right: the membership degree of every element to the right fuzzy set.
+        '''
+        x = np.asarray(x, dtype=np.float64)
+        prototypes = np.asarray(self._prototypes, dtype=np.float64)
+        index = np.clip(np.searchsorted(prototypes, x, side="right") - 1, 0, self._N - 2)
+        start = prototypes[index]
+        width = prototypes[index + 1] - start
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the elements beyond the first and the last prototype belong to the shoulders only
+            right = np.clip(np.where(width > 0, (x - start) / width, x >= start), 0., 1.)
+        return index, 1. - right, right
+
+    def sparse(self, x):
+        '''
+        This function calculates the membership degrees of an array of
+        elements to the Strong Fuzzy Partition, keeping only the two fuzzy
+        sets of every element (see segments).
+
+        :Parameters:
+        x: the array of the elements.
+
+        :Returns:
+        the SparseMemberships of the elements.
+        '''
+        index, left, right = self.segments(x)
+        return SparseMemberships(index, left, right, self._N)
+
+    def memberships(self, x):
+        '''
+        This function calculates the membership degrees of an array of
+        elements to every fuzzy set defined in the Strong Fuzzy Partition.
+
+        :Parameters:
+        x: the array of the elements.
+
+        :Returns:
+        the matrix of the membership degrees, with a line for every element
+        and a column for every fuzzy set, in the order of the labels.
+        '''
+        return self.sparse(x).dense()
+
     def plot(self, xlabel, ylabel, path, str, eps=1e-3):
         '''
         This function draws fuzzy sets which define the Strong Fuzzy Partition.
@@ -22,20 +22,54 @@ import json
 import logging
 import os
 import shutil
+from concurrent.futures import ProcessPoolExecutor
 from re import findall
 from time import time
 
+import numpy as np
+
 from FuzzyClustering import FuzzyClustering
+from FuzzyClustering.FuzzyCMeans import FuzzyCMeans
 from FuzzyGranulation import FuzzyGranulation
-from FuzzyQuantification import FuzzyQuantification
-from OWLOntology import OWLOntology
-from SPARQLEndpointInterface import SPARQLEndpointInterface
-from utils import CSVHandler, ConsistencyCheck, ResultSetConverter, convertToListOfDict as converter
+from FuzzyQuantification import FuzzyQuantification, SigmaCount
+from OWLOntology import OWLIndex, OWLOntology
+from SPARQLEndpointInterface import ResponseCache, SPARQLEndpointInterface
+from StrongFuzzyPartition import SparseMemberships
+from utils import CSVHandler, CentroidStore, ConsistencyCheck, IdentifierDictionary, PairResult, ResultSetConverter, \
+    StageCache
 
 
 class Main:
     _time = ""
-    _index = 1
+    _inMemory = False
+    _exportCSV = True
+    _cache = None
+    _seed = None
+    _bulkExtraction = False
+    _bulkBatchSize = 0
+    _pruningEstimate = False
+    _resultFormat = ""
+    _pageSize = 0
+    _pagesInFlight = 4
+    _keysetPagination = False
+    _asyncConnections = 0
+    _prefetched = {}
+    _responseCache = None
+    _backend = None
+    _identifiers = IdentifierDictionary()
+    _clusteringPrecision = "float64"
+    _clusteringMode = "exact"
+    _clusteringBins = 1000
+    _clusteringBinning = "width"
+    _clusteringBatchSize = 65536
+    _clusteringSeeding = "random"
+    _clusteringRestarts = 1
+    _clusteringWorkers = 1
+    _clusterRange = None
+    _clusteringAcceleration = None
+    _clusteringStopping = "membership"
+    _clusteringThreads = 1
+    _centroidStore = None
 
 
 def executeQuery(SPARQLEndpoint, ontologyPrefix, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass="",
@@ -43,81 +77,297 @@ def executeQuery(SPARQLEndpoint, ontologyPrefix, dataPropertyToFuzzify, domainCl
     """
     Executes the SPARQL query and stores the resultset in a csv file. It has a different behaviour based on the input
     parameters. If rangeClass, auxiliaryClass, objectProperty and dataPropertyToFuzzify are not blank, the
-    operation is ternary; binary, otherwise.
+    operation is ternary; binary, otherwise. If a list of data properties is given, their values are extracted by the
+    same query, in the columns of a joint pair.
 
     :param SPARQLEndpoint: the SPARQL end point
     :param ontologyPrefix: the ontology prefix
     :param domainClass: the domain class
-    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties)
     :param rangeClass: the range class
     :param auxiliaryClass: the auxiliar class
     :param objectProperty: the object property
+    :return: the PairResult that holds the identifiers and the values of the dataset
     """
     nameProperty = createNameProperty(dataPropertyToFuzzify)
+    names = [createNameProperty(p) for p in dataPropertyToFuzzify] if isinstance(dataPropertyToFuzzify, list) else \
+        [nameProperty]
 
     # obtain a connection to the endpoint
     sparql = SPARQLEndpointInterface(SPARQLEndpoint)
 
+    query = extractionQuery(ontologyPrefix, dataPropertyToFuzzify, domainClass, rangeClass, auxiliaryClass,
+                            objectProperty)
+
+    # get the dataset from the stage cache, if the same query has already been sent to the same end point
+    key, pair = fromCache("query", dataSource(SPARQLEndpoint), query)
+    if pair is None:
+        # sends the query
+        if Main._backend is not None:
+            columns, fields = selectLocalColumns(ontologyPrefix, dataPropertyToFuzzify, domainClass, rangeClass,
+                                                 auxiliaryClass, objectProperty)
+        elif rangeClass == "" and auxiliaryClass == "" and objectProperty == ["", ""]:
+            columns, fields = selectColumns(sparql, query, names, [domainClass] + names, Main._identifiers)
+        else:
+            columns, fields = selectColumns(sparql, query, names, [auxiliaryClass, domainClass, rangeClass] + names,
+                                            Main._identifiers)
+        pair = PairResult(domainClass, rangeClass, auxiliaryClass, nameProperty)
+        pair.dictionary = Main._identifiers
+
+        # store only the identifiers of generic class
+        if rangeClass == "" and auxiliaryClass == "" and objectProperty == ["", ""]:
+            pair.fields = [domainClass] + names
+        elif rangeClass != "" and auxiliaryClass != "" and objectProperty != ["", ""]:
+            pair.fields = [domainClass, rangeClass, auxiliaryClass] + names
+        pair.identifiers = {field: columns.get(field) for field in pair.fields[:-len(names)]}
+        if len(names) > 1:
+            # the values of a joint pair, one column for each data property
+            pair.properties = names
+            pair.values = None if columns.get(names[0]) is None else np.column_stack([columns[n] for n in names])
+        else:
+            pair.values = columns.get(nameProperty)
+
+        if pair.values is None or len(pair.values) == 0:
+            logging.warning("\nSomething went wrong with the query:\n\n" + query)
+            raise Exception
+        toCache("query", key, pair)
+
+    exportDataset(pair)
+    return pair
+
+
+def extractionQuery(ontologyPrefix, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass="",
+                    objectProperty=""):
+    """
+    Builds the SPARQL query that extracts the dataset of a (domain, range) pair. If rangeClass, auxiliaryClass,
+    objectProperty and dataPropertyToFuzzify are not blank, the operation is ternary; binary, otherwise. If a list of
+    data properties is given, the query selects the values of all of them.
+
+    :param ontologyPrefix: the ontology prefix
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties)
+    :param domainClass: the domain class
+    :param rangeClass: the range class
+    :param auxiliaryClass: the auxiliar class
+    :param objectProperty: the object property
+    :return: the query
+    """
+    properties = dataPropertyToFuzzify if isinstance(dataPropertyToFuzzify, list) else [dataPropertyToFuzzify]
+
     targetDomainClass = ""
     targetRangeClass = ""
     targetauxiliaryClass = ""
-    targetdataPropertyToFuzzify = ""
+    targetdataPropertyToFuzzify = "".join(" ?" + createNameProperty(p) for p in properties)
 
     if rangeClass == "" and auxiliaryClass == "" and objectProperty == ["", ""]:
         targetDomainClass = " ?" + domainClass
-        targetdataPropertyToFuzzify = " ?" + nameProperty
-        whereClause = "  ?" + domainClass + " a ontology:" + domainClass + ". ?" + domainClass + " ontology:" + dataPropertyToFuzzify + " ?" + nameProperty
+        whereClause = "  ?" + domainClass + " a ontology:" + domainClass + "".join(
+            ". ?" + domainClass + " ontology:" + p + " ?" + createNameProperty(p) for p in properties)
     elif rangeClass != "" and auxiliaryClass != "" and objectProperty != ["", ""]:
         targetDomainClass = " ?" + domainClass
         targetRangeClass = " ?" + rangeClass
         targetauxiliaryClass = " ?" + auxiliaryClass
-        targetdataPropertyToFuzzify = " ?" + nameProperty
         whereClause = "?" + domainClass + " a ontology:" + domainClass + ". ?" + rangeClass + " a ontology:" + rangeClass + ".  ?" + domainClass + " ontology:" + \
                       objectProperty[0] + " ?" + auxiliaryClass + ".  ?" + auxiliaryClass + " ontology:" + \
-                      objectProperty[
-                          1] + " ?" + rangeClass + ". ?" + auxiliaryClass + " ontology:" + dataPropertyToFuzzify + " ?" + nameProperty
+                      objectProperty[1] + " ?" + rangeClass + "".join(
+                          ". ?" + auxiliaryClass + " ontology:" + p + " ?" + createNameProperty(p) for p in properties)
 
     query = ("PREFIX ontology: " + ontologyPrefix +
              " SELECT " + targetDomainClass + targetRangeClass + targetauxiliaryClass + targetdataPropertyToFuzzify +
              "    WHERE { "
              + whereClause + "}")
+    return query
 
-    # sends the query
-    rs, rs2, fields, fields2 = converter(sparql(query))
-    resultset = []
 
-    # store only the identifiers of generic class
+def executeBulkQuery(SPARQLEndpoint, ontologyPrefix, dataPropertyToFuzzify, domainClasses, rangeClasses=[""],
+                     auxiliaryClass="", objectProperty="", batchSize=0):
+    """
+    Executes the SPARQL queries that extract the datasets of all the (domain, range) pairs at once and stores every
+    dataset in its csv file. The classes (or the combinations of domain and range classes, if the operation is
+    ternary) are listed in a VALUES block, so a single query replaces the queries of many pairs; the rows are then
+    split by class into the datasets of the pairs.
+
+    :param SPARQLEndpoint: the SPARQL end point
+    :param ontologyPrefix: the ontology prefix
+    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param domainClasses: the domain classes list
+    :param rangeClasses: the range classes list (if empty, the operation is binary)
+    :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
+    :param objectProperty: the object property (if empty, the operation is binary)
+    :param batchSize: the number of classes (or combinations) listed in every query (0 to list all of them)
+    :return: the dictionary of the PairResult of every (domain, range) pair
+    """
+    nameProperty = createNameProperty(dataPropertyToFuzzify)
+    binary = rangeClasses == [""] and auxiliaryClass == "" and objectProperty == ["", ""]
+    pairs = [(domainClass, rangeClass) for domainClass in domainClasses for rangeClass in rangeClasses]
+    batchSize = batchSize if batchSize > 0 else len(pairs)
+
+    # obtain a connection to the endpoint
+    sparql = SPARQLEndpointInterface(SPARQLEndpoint)
+
+    if binary:
+        target = " ?domainClass ?domain ?value"
+        whereClause = ("  ?domain a ?domainClass. ?domain ontology:" + dataPropertyToFuzzify + " ?value")
+    else:
+        target = " ?domainClass ?rangeClass ?domain ?range ?auxiliary ?value"
+        whereClause = ("  ?domain a ?domainClass. ?range a ?rangeClass. ?domain ontology:" + objectProperty[0] +
+                       " ?auxiliary. ?auxiliary ontology:" + objectProperty[1] + " ?range. ?auxiliary ontology:" +
+                       dataPropertyToFuzzify + " ?value")
+
+    results = {}
+    for start in range(0, len(pairs), batchSize):
+        batch = pairs[start:start + batchSize]
+        if binary:
+            values = " VALUES ?domainClass {" + "".join(" ontology:" + domainClass for domainClass, _ in batch) + " }"
+        else:
+            values = (" VALUES (?domainClass ?rangeClass) {" +
+                      "".join(" (ontology:" + domainClass + " ontology:" + rangeClass + ")"
+                              for domainClass, rangeClass in batch) + " }")
+        query = ("PREFIX ontology: " + ontologyPrefix +
+                 " SELECT" + target +
+                 "    WHERE { " + values + whereClause + "}")
+
+        # get the datasets from the stage cache, if the same query has already been sent to the same end point
+        key, extracted = fromCache("query", dataSource(SPARQLEndpoint), query)
+        if extracted is None:
+            # sends the query and splits the rows by class
+            columns, fields = selectColumns(sparql, query, ["value"],
+                                            ["domain", "domainClass", "value"] if binary else
+                                            ["auxiliary", "domainClass", "rangeClass", "domain", "range", "value"],
+                                            Main._identifiers)
+            extracted = {}
+            for domainClass, rangeClass in batch:
+                # the mask of the rows of the pair
+                rows = np.zeros(0, dtype=bool)
+                if fields:
+                    rows = columns["domainClass"] == Main._identifiers.code(domainClass)
+                    if not binary:
+                        rows &= columns["rangeClass"] == Main._identifiers.code(rangeClass)
+                if not rows.any():
+                    logging.warning("\nSomething went wrong with the query:\n\n" + query)
+                    logging.warning("No data has been extracted for the pair (" + domainClass + ", " + rangeClass + ").")
+                    raise Exception
+                pair = PairResult(domainClass, rangeClass, auxiliaryClass, nameProperty)
+                pair.dictionary = Main._identifiers
+                if binary:
+                    pair.fields = [domainClass, nameProperty]
+                    pair.identifiers = {domainClass: columns["domain"][rows]}
+                else:
+                    pair.fields = [domainClass, rangeClass, auxiliaryClass, nameProperty]
+                    pair.identifiers = {domainClass: columns["domain"][rows], rangeClass: columns["range"][rows],
+                                        auxiliaryClass: columns["auxiliary"][rows]}
+                pair.values = columns["value"][rows]
+                extracted[(domainClass, rangeClass)] = pair
+            toCache("query", key, extracted)
+        results.update(extracted)
+
+    for pair in results.values():
+        exportDataset(pair)
+    return results
+
+
+def selectColumns(sparql, query, numericFields=(), orderBy=None, dictionary=None):
+    """
+    Sends a SELECT query and converts its resultset in columns, one for each variable: the numeric variables become
+    float64 arrays and the IRIs are reduced to the names of the individuals (or to their codes, if a dictionary is
+    given). If a result format is set, the resultset
+    is streamed in that format and its rows are converted while they arrive. If a page size is set and the variables
+    that order the rows are given, the resultset is extracted one page at a time, with concurrent requests.
+
+    :param sparql: the SPARQLEndpointInterface of the end point
+    :param query: the query
+    :param numericFields: the variables whose values are numbers
+    :param orderBy: the variables that order the rows of the pages (the first one is the key of keyset pagination)
+    :param dictionary: the IdentifierDictionary that encodes the individuals
+    :return: the dictionary of the columns and the list of the fields
+    """
+    if query in Main._prefetched:
+        # the query has already been sent by prefetchQueries, in the result format
+        if Main._resultFormat:
+            return ResultSetConverter.convertRowsToColumns(*Main._prefetched.pop(query), numericFields=numericFields,
+                                                           dictionary=dictionary)
+        return ResultSetConverter.convertToColumns(Main._prefetched.pop(query), numericFields, dictionary)
+    if Main._pageSize > 0 and orderBy:
+        return ResultSetConverter.convertRowsToColumns(
+            *sparql.paginate(query, orderBy, Main._pageSize, Main._pagesInFlight, Main._resultFormat or "tsv",
+                             Main._keysetPagination), numericFields=numericFields, dictionary=dictionary)
+    if Main._resultFormat:
+        return ResultSetConverter.convertRowsToColumns(*sparql.stream(query, Main._resultFormat),
+                                                       numericFields=numericFields, dictionary=dictionary)
+    return ResultSetConverter.convertToColumns(sparql(query), numericFields, dictionary)
+
+
+def prefetchQueries(SPARQLEndpoint, queries):
+    """
+    Sends concurrently the queries whose results are not in the stage cache, on a pool of keep-alive connections to
+    the end point, and keeps their resultsets (in the result format, if it is set) until selectColumns is called with
+    the same queries.
+
+    :param SPARQLEndpoint: the SPARQL end point
+    :param queries: the list of (stage, query) tuples, where stage is the stage that caches the result of the query
+    """
+    pending = [query for stage, query in queries if Main._cache is None or
+               not Main._cache.contains(stage, Main._cache.key(stage, dataSource(SPARQLEndpoint), query))]
+    if pending:
+        resultsets = SPARQLEndpointInterface(SPARQLEndpoint).queryAll(pending, Main._asyncConnections,
+                                                                      Main._resultFormat or "json")
+        Main._prefetched.update(zip(pending, resultsets))
+
+
+def selectLocalColumns(ontologyPrefix, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass="",
+                       objectProperty=""):
+    """
+    Extracts the dataset of a (domain, range) pair from the OWLIndex of the local backend, in the same columns of the
+    query built by extractionQuery.
+
+    :param ontologyPrefix: the ontology prefix
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties)
+    :param domainClass: the domain class
+    :param rangeClass: the range class
+    :param auxiliaryClass: the auxiliar class
+    :param objectProperty: the object property
+    :return: the dictionary of the columns and the list of the fields
+    """
+    iri = lambda name: ontologyPrefix.strip("<>") + name
+    if isinstance(dataPropertyToFuzzify, list):
+        names = [createNameProperty(p) for p in dataPropertyToFuzzify]
+        dataProperty = [iri(p) for p in dataPropertyToFuzzify]
+    else:
+        names = [createNameProperty(dataPropertyToFuzzify)]
+        dataProperty = iri(dataPropertyToFuzzify)
     if rangeClass == "" and auxiliaryClass == "" and objectProperty == ["", ""]:
-        resultset = [{domainClass: row.get(domainClass).split("#", 1)[1], nameProperty: row.get(nameProperty)} for
-                     row
-                     in rs2]
-        # save the resultset in the csv file
-        if not resultset == []:
-            if not os.path.exists('output/' + Main._time + '/csv_files/'):
-                os.makedirs('output/' + Main._time + '/csv_files/')
-            csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + domainClass + ".csv")
-            csvhandler.writeDict(resultset, fields2)
-    elif rangeClass != "" and auxiliaryClass != "" and objectProperty != ["", ""]:
-        resultset = [
-            {domainClass: row.get(domainClass).split("#", 1)[1],
-             auxiliaryClass: row.get(auxiliaryClass).split("#", 1)[1],
-             rangeClass: row.get(rangeClass).split("#", 1)[1], nameProperty: row.get(nameProperty)}
-            for
-            row in rs]
-        # save the resultset in the csv file
-        if not resultset == []:
-            if not os.path.exists('output/' + Main._time + '/csv_files/'):
-                os.makedirs('output/' + Main._time + '/csv_files/')
-            csvhandler = CSVHandler(
-                'output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + ".csv")
-            csvhandler.writeDict(resultset, fields)
-
-    if resultset == []:
-        logging.warning("\nSomething went wrong with the query:\n\n" + query)
-        raise Exception
+        fields = [domainClass] + names
+        rows = Main._backend.binary(iri(domainClass), dataProperty)
+    else:
+        fields = [domainClass, rangeClass, auxiliaryClass] + names
+        rows = Main._backend.ternary(iri(domainClass), iri(rangeClass), [iri(p) for p in objectProperty],
+                                     dataProperty)
+    return ResultSetConverter.convertRowsToColumns(fields, rows, numericFields=names, dictionary=Main._identifiers)
+
 
+def dataSource(SPARQLEndpoint):
+    """
+    Gets the source that answers the queries, which is part of the keys of their results in the stage cache
+
+    :param SPARQLEndpoint: the SPARQL end point
+    :return: the end point, or the ontology file if the queries are answered by the local backend
+    """
+    return SPARQLEndpoint if Main._backend is None else Main._backend.filename
+
+
+def exportDataset(pair):
+    """
+    Stores the dataset of a (domain, range) pair in its csv file, if the csv files have to be written
 
-def clustering(numclusters, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass=""):
+    :param pair: the PairResult returned by the query
+    """
+    if exportEnabled():
+        if not os.path.exists('output/' + Main._time + '/csv_files/'):
+            os.makedirs('output/' + Main._time + '/csv_files/')
+        csvhandler = CSVHandler(csvFile(pair))
+        csvhandler.writeDict(pair.rows(), pair.fields)
+
+
+def clustering(numclusters, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass="", pair=None):
     """
     Executes the fuzzy clustering using C-Means algorithm and stores the result (sorted centroids) in a csv file.
 
@@ -126,28 +376,247 @@ def clustering(numclusters, dataPropertyToFuzzify, domainClass, rangeClass="", a
     :param domainClass: the domain class
     :param rangeClass: the range class (blank if the operation is binary)
     :param auxiliaryClass: the auxiliar class (blank if the operation is binary)
+    :param pair: the PairResult returned by executeQuery (if None, the dataset is read from the csv file)
+    :return: the PairResult with the sorted centroids
     """
-    nameProperty = createNameProperty(dataPropertyToFuzzify)
-
     # get individuals and their values from csv file
-    csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + ".csv")
-    d, _ = csvhandler.readDict()
-    dataset = [[float(r.get(nameProperty))] for r in d]
-
-    # execute the process of fuzzy clustering and get the clusters centroids
-    fc = FuzzyClustering(trainingset=dataset, clusters=numclusters)
-    centers = sorted(fc())
+    if pair is None:
+        pair = readDataset(dataPropertyToFuzzify, domainClass, rangeClass, auxiliaryClass)
+    if Main._clusteringMode == "minibatch":
+        # the values are handed to the clustering one chunk at a time; they are slices of the extracted values, which
+        # are needed in memory by the next stages, so only the memory of the clustering is bounded
+        batchSize = Main._clusteringBatchSize
+        dataset = lambda: (pair.values[i:i + batchSize] for i in range(0, len(pair.values), batchSize))
+    else:
+        dataset = pair.values.reshape(-1, 1)
+
+    # the clustering starts from the centroids of the last successful run, if they are stored
+    storeKey, warm = None, None
+    if Main._centroidStore is not None:
+        storeKey = CentroidStore.key(domainClass, rangeClass, auxiliaryClass, dataPropertyToFuzzify, numclusters)
+        warm = Main._centroidStore.get(storeKey)
+    seeding = warm if warm is not None else Main._clusteringSeeding
+
+    # get the centroids from the stage cache, if the dataset, the clusters number, the seed and the clustering
+    # settings are unchanged
+    key, centers = fromCache("clustering", StageCache.digest(pair.values), numclusters, Main._seed,
+                             Main._clusteringPrecision, Main._clusteringMode, Main._clusteringBins,
+                             Main._clusteringBinning, Main._clusteringBatchSize, seeding,
+                             Main._clusteringRestarts, Main._clusteringAcceleration, Main._clusteringStopping)
+    if centers is None:
+        # execute the process of fuzzy clustering and get the clusters centroids
+        fc = FuzzyClustering(trainingset=dataset, clusters=numclusters, seed=Main._seed,
+                             dtype=np.dtype(Main._clusteringPrecision), mode=Main._clusteringMode,
+                             bins=Main._clusteringBins, binning=Main._clusteringBinning,
+                             batchSize=Main._clusteringBatchSize, seeding=seeding,
+                             acceleration=Main._clusteringAcceleration, stopping=Main._clusteringStopping,
+                             threads=Main._clusteringThreads)
+        centers = sorted(fc(restarts=Main._clusteringRestarts, workers=Main._clusteringWorkers))
+        toCache("clustering", key, centers)
+    pair.centroids = np.array([c[0] for c in centers])
+
+    if Main._centroidStore is not None:
+        if warm is not None:
+            movement = float(np.max(np.abs(pair.centroids - np.array(sorted(c[0] for c in warm)))))
+            logging.warning("Warm start from the centroids of the last successful run: the centroids moved by "
+                            "{0}.".format(movement))
+        else:
+            logging.warning("Warm start: no centroids of a previous run, the clustering started from scratch.")
+        Main._centroidStore.put(storeKey, centers, pair.name() + " " + dataPropertyToFuzzify + " " + str(numclusters))
 
     # store centroid in centroids.csv
-    csvhandler = CSVHandler(
-        'output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + "Centroids.csv")
-    csvhandler.write(centers)
+    if exportEnabled():
+        csvhandler = CSVHandler(csvFile(pair, "Centroids"))
+        csvhandler.write(centers)
 
     logging.warning("Centroids result of clustering process:")
     logging.warning(centers)
+    return pair
 
 
-def granulation(labels, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass=""):
+def jointClustering(labels, dataProperties, domainClass, rangeClass="", auxiliaryClass="", pair=None):
+    """
+    Executes the fuzzy clustering of the values of some data properties at once, as points with a coordinate for each
+    data property, and projects the centroids on every data property. Every coordinate is rescaled to [0, 1] before
+    the clustering, so that the data properties weigh the same whatever their units. The joint centroids and the
+    memberships of the individuals in the joint granules are stored in csv files, as well as the projected centroids.
+
+    :param labels: the labels list of the joint granules
+    :param dataProperties: the list of the data properties
+    :param domainClass: the domain class
+    :param rangeClass: the range class (blank if the operation is binary)
+    :param auxiliaryClass: the auxiliar class (blank if the operation is binary)
+    :param pair: the PairResult returned by executeQuery (if None, the dataset is read from the csv file)
+    :return: the PairResult with the joint centroids and memberships, whose projections hold the values and the sorted
+             projected centroids of every data property
+    """
+    if pair is None:
+        pair = readDataset(dataProperties, domainClass, rangeClass, auxiliaryClass)
+    low, high = pair.values.min(axis=0), pair.values.max(axis=0)
+    scale = np.where(high > low, high - low, 1.)
+    points = (pair.values - low) / scale
+    if Main._clusteringMode == "minibatch":
+        batchSize = Main._clusteringBatchSize
+        dataset = lambda: (points[i:i + batchSize] for i in range(0, len(points), batchSize))
+    else:
+        dataset = points
+    # the centroids given in the configuration are one-dimensional
+    seeding = Main._clusteringSeeding if isinstance(Main._clusteringSeeding, str) else "random"
+
+    key, centers = fromCache("clustering", StageCache.digest(pair.values), pair.properties, len(labels), Main._seed,
+                             Main._clusteringPrecision, Main._clusteringMode, Main._clusteringBins,
+                             Main._clusteringBinning, Main._clusteringBatchSize, seeding,
+                             Main._clusteringRestarts, Main._clusteringAcceleration, Main._clusteringStopping)
+    if centers is None:
+        fc = FuzzyClustering(trainingset=dataset, clusters=len(labels), seed=Main._seed,
+                             dtype=np.dtype(Main._clusteringPrecision), mode=Main._clusteringMode,
+                             bins=Main._clusteringBins, binning=Main._clusteringBinning,
+                             batchSize=Main._clusteringBatchSize, seeding=seeding,
+                             acceleration=Main._clusteringAcceleration, stopping=Main._clusteringStopping,
+                             threads=Main._clusteringThreads)
+        centers = sorted((np.array(fc(restarts=Main._clusteringRestarts, workers=Main._clusteringWorkers)) * scale +
+                          low).tolist())
+        toCache("clustering", key, centers)
+    pair.centroids = np.array(centers)
+    pair.labels = list(labels)
+    # the joint granules are quantified without the granulation stage, which creates the folder of the graphs
+    if not os.path.exists('output/' + Main._time + '/graphs'):
+        os.makedirs('output/' + Main._time + '/graphs')
+
+    # the memberships of all the individuals in the joint granules (in "minibatch" mode they are only summed, one
+    # batch at a time, and written in the csv file if it has to be)
+    centroids = (pair.centroids - low) / scale
+    element = pair.element()
+    csvhandler = CSVHandler(csvFile(pair, "Granules"))
+    if Main._clusteringMode == "minibatch":
+        pair.memberships = SigmaCount(len(labels))
+        if exportEnabled():
+            csvhandler.write([[element] + pair.properties + pair.labels])
+        for i in range(0, len(points), batchSize):
+            batch = slice(i, i + batchSize)
+            fcm = FuzzyCMeans(points[batch], None, centers=centroids, workers=Main._clusteringThreads)
+            memberships = fcm.membership()
+            fcm.close()
+            pair.memberships(points[batch], memberships)
+            if exportEnabled():
+                csvhandler.append(jointRows(pair.dictionary.decode(pair.identifiers.get(element)[batch]),
+                                            pair.values[batch], memberships))
+    else:
+        fcm = FuzzyCMeans(points, None, centers=centroids, workers=Main._clusteringThreads)
+        pair.memberships = fcm.membership()
+        fcm.close()
+        if exportEnabled():
+            csvhandler.write([[element] + pair.properties + pair.labels] +
+                             jointRows(pair.names(element), pair.values, pair.memberships))
+
+    # the projections of the joint granules on every data property
+    pair.projections = []
+    for index, name in enumerate(pair.properties):
+        projection = PairResult(domainClass, rangeClass, auxiliaryClass, name)
+        projection.tag = name
+        projection.fields = [field for field in pair.fields if field not in pair.properties] + [name]
+        projection.dictionary = pair.dictionary
+        projection.identifiers = pair.identifiers
+        projection.values = np.ascontiguousarray(pair.values[:, index])
+        projection.centroids = np.sort(pair.centroids[:, index])
+        pair.projections.append(projection)
+
+    if exportEnabled():
+        csvhandler = CSVHandler(csvFile(pair, "Centroids"))
+        csvhandler.write(centers)
+        for projection in pair.projections:
+            csvhandler = CSVHandler(csvFile(projection, "Centroids"))
+            csvhandler.write([[c] for c in projection.centroids.tolist()])
+
+    logging.warning("Centroids result of joint clustering process of " + ", ".join(pair.properties) + ":")
+    logging.warning(centers)
+    return pair
+
+
+def jointRows(names, values, memberships):
+    """
+    Creates the rows of the granules csv file of a joint granulation: every individual is stored with its values and
+    its membership degrees to all the joint granules
+
+    :param names: the names of the individuals
+    :param values: the matrix of the values of the individuals, with a column for each data property
+    :param memberships: the matrix of the membership degrees of the individuals
+    :return: the list of the rows
+    """
+    return [[Element] + row + degrees for Element, row, degrees in zip(names, values.tolist(), memberships.tolist())]
+
+
+def validity(labels, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass="", pair=None, counter=None):
+    """
+    Executes the fuzzy clustering with every number of granules in the range of the clusterRange setting and computes
+    the validity indices of the partitions (partition coefficient, partition entropy and Xie-Beni index). The indices
+    are stored in a csv file and the recommended number of granules is logged with its labels. The recommendation is
+    advisory only: the clustering and the granulation still use the configured fuzzy set labels, because the
+    integrated ontology defines the same granules for every pair.
+
+    :param labels: the fuzzy set labels list of the pair
+    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param domainClass: the domain class
+    :param rangeClass: the range class (blank if the operation is binary)
+    :param auxiliaryClass: the auxiliar class (blank if the operation is binary)
+    :param pair: the PairResult returned by executeQuery (if None, the dataset is read from the csv file)
+    :param counter: the counter of the pair, appended to the labels (see increaseLabels)
+    :return: the PairResult
+    """
+    if pair is None:
+        pair = readDataset(dataPropertyToFuzzify, domainClass, rangeClass, auxiliaryClass)
+
+    # the validity needs all the values: in minibatch mode the distinct values are clustered
+    mode = "unique" if Main._clusteringMode == "minibatch" else Main._clusteringMode
+    key, cached = fromCache("validity", StageCache.digest(pair.values), Main._clusterRange, Main._seed,
+                            Main._clusteringPrecision, mode, Main._clusteringBins, Main._clusteringBinning,
+                            Main._clusteringSeeding, Main._clusteringAcceleration, Main._clusteringStopping,
+                            Main._clusteringRestarts)
+    if cached is None:
+        fc = FuzzyClustering(trainingset=pair.values.reshape(-1, 1), clusters=Main._clusterRange[0],
+                             seed=Main._seed, dtype=np.dtype(Main._clusteringPrecision), mode=mode,
+                             bins=Main._clusteringBins, binning=Main._clusteringBinning,
+                             seeding=Main._clusteringSeeding if isinstance(Main._clusteringSeeding, str) else "random",
+                             acceleration=Main._clusteringAcceleration, stopping=Main._clusteringStopping,
+                             threads=Main._clusteringThreads)
+        cached = fc.validity(Main._clusterRange, restarts=Main._clusteringRestarts, workers=Main._clusteringWorkers)
+        toCache("validity", key, cached)
+    recommended, table = cached
+
+    if exportEnabled():
+        fields = ["clusters", "pc", "pe", "xb", "objective", "iterations"]
+        csvhandler = CSVHandler(csvFile(pair, "Validity"))
+        csvhandler.writeDict([{field: row[field] for field in fields} for row in table], fields)
+
+    logging.warning("Recommended number of granules (advisory, the granulation uses {0}): {1}, with labels {2}".format(
+        len(labels), recommended, granuleLabels(recommended, labels, counter)))
+    return pair
+
+
+def granuleLabels(numgranules, labels, counter=None):
+    """
+    Creates the labels of a number of granules: the configured labels if they are as many as the granules, otherwise
+    a standard linguistic scale (or numbered granules, if there are more than seven of them), followed by the counter
+    of the pair as the configured labels are
+
+    :param numgranules: the number of granules
+    :param labels: the configured fuzzy set labels list of the pair (already increased)
+    :param counter: the counter of the pair (None if the labels are not increased)
+    :return: the labels list
+    """
+    if numgranules == len(labels):
+        return list(labels)
+    scales = {2: ["Low", "High"],
+              3: ["Low", "Mid", "High"],
+              4: ["VeryLow", "Low", "High", "VeryHigh"],
+              5: ["VeryLow", "Low", "Mid", "High", "VeryHigh"],
+              6: ["VeryLow", "Low", "MidLow", "MidHigh", "High", "VeryHigh"],
+              7: ["VeryLow", "Low", "MidLow", "Mid", "MidHigh", "High", "VeryHigh"]}
+    scale = scales.get(numgranules, ["Granule" + str(i) for i in range(1, numgranules + 1)])
+    return scale if counter is None else increaseLabels(scale, counter)
+
+
+def granulation(labels, dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass="", pair=None):
     """
     Executes the granulation and stores the result in a csv file. It takes the centroids from the csv file calculated
     with clustering function. It also stores the graphs of Strong Fuzzy Partition and the result of granulation.
@@ -157,63 +626,130 @@ def granulation(labels, dataPropertyToFuzzify, domainClass, rangeClass="", auxil
     :param domainClass: the domain class
     :param rangeClass: the range class (if empty, the operation is binary)
     :param auxiliaryClass: the auxiliar class (if empty, the operation is binary)
+    :param pair: the PairResult returned by clustering (if None, dataset and centroids are read from the csv files)
+    :return: the PairResult with the sparse memberships of the granules (with their SigmaCount in "minibatch" mode)
     """
     nameProperty = createNameProperty(dataPropertyToFuzzify)
 
-    # get centroids from centroids.csv
-    csvhandler = CSVHandler(
-        'output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + "Centroids.csv")
-    centers = csvhandler.read()
+    # get general class dataPropertyToFuzzify and centroids from the csv files
+    if pair is None:
+        pair = readDataset(dataPropertyToFuzzify, domainClass, rangeClass, auxiliaryClass)
+        csvhandler = CSVHandler(csvFile(pair, "Centroids"))
+        pair.centroids = np.array([float(c[0]) for c in csvhandler.read()])
 
-    quantifierPrototypes = [float(c[0]) for c in centers]
+    quantifierPrototypes = pair.centroids.tolist()
+    pair.labels = list(labels)
+    if not os.path.exists('output/' + Main._time + '/graphs'):
+        os.makedirs('output/' + Main._time + '/graphs')
+    if Main._clusteringMode == "minibatch":
+        return streamGranulation(pair)
+
+    # get the memberships and the graphs from the stage cache, if the dataset, the centroids and the labels are
+    # unchanged (the memberships are cached in the sparse representation)
+    key, cached = fromCache("granulation", StageCache.digest(pair.values), pair.centroids, pair.labels, pair.name(),
+                            nameProperty, "sparse")
+    if cached is None:
+        # execute the process of fuzzy granulation and store the results
+        fuzzygranulation = FuzzyGranulation(pair.values, quantifierPrototypes, labels)
+        pair.memberships = fuzzygranulation()
+
+        # plot the SFP
+        fuzzygranulation.plotSFP("quantifierPrototypes", "Fuzzy membership",
+                                 'output/' + Main._time + '/graphs/' + pair.name())
+
+        # plot the result of granulation
+        if rangeClass == "" and auxiliaryClass == "":
+            fuzzygranulation.plot(domainClass + " " + nameProperty, "Fuzzy membership",
+                                  'output/' + Main._time + '/graphs/' + pair.name(),
+                                  "Classification of " + domainClass + " by " + nameProperty)
+        else:
+            fuzzygranulation.plot(auxiliaryClass + " " + nameProperty, "Fuzzy membership",
+                                  'output/' + Main._time + '/graphs/' + pair.name(),
+                                  "Classification of " + domainClass + " by " + auxiliaryClass + " from " + rangeClass)
+        toCache("granulation", key, (pair.memberships, readGraphs(pair, ["GranulesSFP", "Granules"])))
+    else:
+        pair.memberships, graphs = cached
+        writeGraphs(graphs)
 
-    # get general class dataPropertyToFuzzify from csv file
-    csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + ".csv")
-    d, _ = csvhandler.readDict()
-    dataset = [float(r.get(nameProperty)) for r in d]
+    # organize the results in order to save them in the csv files: every individual is stored with the labels of the
+    # two consecutive granules it can belong to and its membership degrees to them, while the labels and the
+    # prototypes of the granules are stored once
+    element = pair.element()
+    rows = granuleRows(pair.names(element), pair.values, pair.memberships, labels)
 
-    # execute the process of fuzzy granulation and store the results
-    fuzzygranulation = FuzzyGranulation(dataset, quantifierPrototypes, labels)
-    table = fuzzygranulation()
+    # save the results in granules.csv and partition.csv
+    if exportEnabled():
+        csvhandler = CSVHandler(csvFile(pair, "Granules"))
+        csvhandler.write([[element, nameProperty, "granule", "degree", "nextGranule", "nextDegree"]] + rows)
+        csvhandler = CSVHandler(csvFile(pair, "Partition"))
+        csvhandler.write([["granule", "prototype"]] + [list(row) for row in zip(labels, quantifierPrototypes)])
 
-    # plot the SFP
-    if not os.path.exists('output/' + Main._time + '/graphs'):
-        os.makedirs('output/' + Main._time + '/graphs')
+    logging.warning("Result of granulation process (element, value, granule, degree, next granule, degree):")
+    logging.warning(rows)
+    return pair
+
+
+def streamGranulation(pair):
+    """
+    Executes the granulation of a pair in the "minibatch" mode, one batch of clusteringBatchSize elements at a time:
+    the memberships of a batch are appended to the granules csv file and added to the sigma-counts of the granules,
+    then they are released. The granules csv file is always written, because the integration reads the memberships
+    from it (see individualDegrees). The memberships are not stored in the stage cache, since the csv file has to be
+    written anyway, and only the graph of the Strong Fuzzy Partition is drawn.
+
+    :param pair: the PairResult with the values, the centroids and the labels
+    :return: the PairResult whose memberships are the SigmaCount of the granules
+    """
+    element = pair.element()
+    codes = pair.identifiers.get(element)
+    batchSize = Main._clusteringBatchSize
+    chunks = lambda: (pair.values[i:i + batchSize] for i in range(0, len(pair.values), batchSize))
+
+    # the domain of the partition is found with a pass on the values
+    fuzzygranulation = FuzzyGranulation(None, pair.centroids.tolist(), pair.labels, FuzzyGranulation.bounds(chunks()))
+    if not os.path.exists('output/' + Main._time + '/csv_files/'):
+        os.makedirs('output/' + Main._time + '/csv_files/')
+    csvhandler = CSVHandler(csvFile(pair, "Granules"))
+    csvhandler.write([[element, pair.nameProperty, "granule", "degree", "nextGranule", "nextDegree"]])
+    written = 0
+
+    def write(chunk, memberships):
+        nonlocal written
+        names = pair.dictionary.decode(codes[written:written + len(chunk)])
+        csvhandler.append(granuleRows(names, chunk, memberships, pair.labels))
+        written += len(chunk)
+
+    pair.memberships = SigmaCount(len(pair.labels))
+    fuzzygranulation.stream(chunks(), write, pair.memberships)
     fuzzygranulation.plotSFP("quantifierPrototypes", "Fuzzy membership",
-                             'output/' + Main._time + '/graphs/' + auxiliaryClass + domainClass + rangeClass)
+                             'output/' + Main._time + '/graphs/' + pair.name())
+    if exportEnabled():
+        csvhandler = CSVHandler(csvFile(pair, "Partition"))
+        csvhandler.write([["granule", "prototype"]] + [list(row) for row in zip(pair.labels, pair.centroids.tolist())])
 
-    # plot the result of granulation
-    if rangeClass == "" and auxiliaryClass == "":
-        fuzzygranulation.plot(domainClass + " " + nameProperty, "Fuzzy membership",
-                              'output/' + Main._time + '/graphs/' + domainClass,
-                              "Classification of " + domainClass + " by " + nameProperty)
-    else:
-        fuzzygranulation.plot(auxiliaryClass + " " + nameProperty, "Fuzzy membership",
-                              'output/' + Main._time + '/graphs/' + auxiliaryClass + domainClass + rangeClass,
-                              "Classification of " + domainClass + " by " + auxiliaryClass + " from " + rangeClass)
+    logging.warning("The memberships of {0} elements have been written in {1}.".format(written, csvFile(pair,
+                                                                                                     "Granules")))
+    return pair
 
-    # organize the results in order to save them in the csv file
-    element = domainClass if (rangeClass == "" and auxiliaryClass == "") else auxiliaryClass
-    header = [element, nameProperty]
-    header.extend(labels)
-    matrix = []
-    for Element, memberships in zip(d, [ms for (_, ms) in table]):
-        row = {element: Element.get(element), nameProperty: Element.get(nameProperty)}
-        for label, degree in memberships:
-            row.setdefault(label, degree)
-        matrix.append(row)
 
-    # save the results in granules.csv
-    csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass +
-                            "Granules.csv")
-    csvhandler.writeDict(matrix, header)
+def granuleRows(names, values, memberships, labels):
+    """
+    Creates the rows of the granules csv file: every individual is stored with the labels of the two consecutive
+    granules it can belong to and its membership degrees to them
 
-    logging.warning("Matrix result of granulation process:")
-    logging.warning(matrix)
+    :param names: the names of the individuals
+    :param values: the values of the individuals
+    :param memberships: the SparseMemberships of the individuals
+    :param labels: the labels list
+    :return: the list of the rows
+    """
+    return [[Element, value, labels[index], left, labels[index + 1], right] for Element, value, index, left, right in
+            zip(names, np.asarray(values).tolist(), memberships.index.tolist(), memberships.left.tolist(),
+                memberships.right.tolist())]
 
 
 def quantification(quantifierLabels, quantifierPrototypes, dataPropertyToFuzzify, domainClass, rangeClass="",
-                   auxiliaryClass=""):
+                   auxiliaryClass="", pair=None):
     """
     Execute the quantification using FuzzyQuantification class. Stores the results in a csv file.
 
@@ -223,36 +759,50 @@ def quantification(quantifierLabels, quantifierPrototypes, dataPropertyToFuzzify
     :param domainClass: the domain class
     :param rangeClass: the range class (if empty, the operation is binary)
     :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
+    :param pair: the PairResult returned by granulation (if None, the granules are read from the csv file)
+    :return: the PairResult with the cardinalities and the quantification of the granules
     """
     nameProperty = createNameProperty(dataPropertyToFuzzify)
 
     # get the granules from granules.csv
-    csvhandler = CSVHandler(
-        'output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + "Granules.csv")
-    ds, granuleslabels = csvhandler.readDict()
-    granuleslabels = granuleslabels[2:]
-    granules = [{label: float(row.get(label)) for label in granuleslabels} for row in ds]
-
-    # execute the process of fuzzy quantification and get the results
-    fuzzyquantification = FuzzyQuantification(quantifierPrototypes, quantifierLabels, granules, granuleslabels)
-    quantification = fuzzyquantification()
-
-    # plot the quantifiers
-    fuzzyquantification.plotQuantifiers("quantifierPrototypes", "Fuzzy membership",
-                                        'output/' + Main._time + '/graphs/' + auxiliaryClass + domainClass + rangeClass)
-
-    # plot the cardinalities
-    if rangeClass == "" and auxiliaryClass == "":
-        fuzzyquantification \
-            .plotCardinalities(domainClass + " Granule cardinality", "Quantifier membership",
-                               "Quantification of " + domainClass + " by " + nameProperty,
-                               'output/' + Main._time + '/graphs/' + domainClass)
+    if pair is None:
+        pair = readGranules(dataPropertyToFuzzify, domainClass, rangeClass, auxiliaryClass)
+    granuleslabels = pair.labels
+
+    pair.quantifierLabels = list(quantifierLabels)
+
+    # get the results and the graphs from the stage cache, if the membership matrix and the quantifiers are unchanged
+    key, cached = fromCache("quantification", StageCache.digest(pair.memberships), granuleslabels, quantifierLabels,
+                            quantifierPrototypes, pair.name(), nameProperty)
+    if cached is None:
+        # execute the process of fuzzy quantification and get the results
+        fuzzyquantification = FuzzyQuantification(quantifierPrototypes, quantifierLabels, pair.memberships,
+                                                  granuleslabels)
+        pair.quantification = fuzzyquantification()
+        pair.cardinalities = fuzzyquantification.cardinalities
+
+        # plot the quantifiers
+        fuzzyquantification.plotQuantifiers("quantifierPrototypes", "Fuzzy membership",
+                                            'output/' + Main._time + '/graphs/' + pair.name())
+
+        # plot the cardinalities
+        if rangeClass == "" and auxiliaryClass == "":
+            fuzzyquantification \
+                .plotCardinalities(domainClass + " Granule cardinality", "Quantifier membership",
+                                   "Quantification of " + domainClass + " by " + nameProperty,
+                                   'output/' + Main._time + '/graphs/' + pair.name())
 
+        else:
+            fuzzyquantification \
+                .plotCardinalities(auxiliaryClass + " Granule cardinality", "Quantifier membership",
+                                   "Quantification of " + domainClass + " by " + auxiliaryClass + " from " + rangeClass,
+                                   'output/' + Main._time + '/graphs/' + pair.name())
+        toCache("quantification", key, (pair.quantification, pair.cardinalities,
+                                        readGraphs(pair, ["CardinalitiesSFP", "Cardinalities"])))
     else:
-        fuzzyquantification \
-            .plotCardinalities(auxiliaryClass + " Granule cardinality", "Quantifier membership",
-                               "Quantification of " + domainClass + " by " + auxiliaryClass + " from " + rangeClass,
-                               'output/' + Main._time + '/graphs/' + auxiliaryClass + domainClass + rangeClass)
+        pair.quantification, pair.cardinalities, graphs = cached
+        writeGraphs(graphs)
+    quantification = pair.quantification
 
     # organize the results in order to save them in the csv file
     header = ["granules"]
@@ -264,42 +814,287 @@ def quantification(quantifierLabels, quantifierPrototypes, dataPropertyToFuzzify
         row.extend([quants.get(quant) for quant in quantifierLabels])
         matrix.append(row)
 
-    # save the results in quantifiers.csv
-    csvhandler = CSVHandler(
-        'output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + "Quantifiers.csv")
-    csvhandler.write(matrix)
-
     # Get the value of sigma-count for every fuzzy sets of granules.
     header = ["granule", "sigma-count"]
     cardinalities = [{"granule": granule, "sigma-count": cardinality}
-                     for granule, cardinality in fuzzyquantification.cardinalities.items()]
+                     for granule, cardinality in pair.cardinalities.items()]
 
-    # Save cardinalities in cardinalities.csv.
-    csvhandler = CSVHandler(
-        'output/' + Main._time + '/csv_files/' + auxiliaryClass + domainClass + rangeClass + "Cardinalities.csv")
-    csvhandler.writeDict(cardinalities, header)
+    if exportEnabled():
+        # save the results in quantifiers.csv
+        csvhandler = CSVHandler(csvFile(pair, "Quantifiers"))
+        csvhandler.write(matrix)
+
+        # Save cardinalities in cardinalities.csv.
+        csvhandler = CSVHandler(csvFile(pair, "Cardinalities"))
+        csvhandler.writeDict(cardinalities, header)
 
     logging.warning("Results of quantification process:")
     logging.warning("Matrix:")
     logging.warning(matrix)
     logging.warning("Cardinalities:")
     logging.warning(cardinalities)
+    return pair
+
+
+def fromCache(stage, *inputs):
+    """
+    Looks for the result of a stage in the stage cache
+
+    :param stage: the name of the stage
+    :param inputs: the inputs of the stage
+    :return: the key of the result and the cached result (None if it is missing or if the cache is disabled)
+    """
+    if Main._cache is None:
+        return None, None
+    key = Main._cache.key(stage, *inputs)
+    result = Main._cache.get(stage, key)
+    if result is not None:
+        logging.warning("\nThe result of the " + stage + " stage has been taken from the stage cache.")
+    return key, result
+
+
+def toCache(stage, key, result):
+    """
+    Stores the result of a stage in the stage cache, if it is enabled
+
+    :param stage: the name of the stage
+    :param key: the key returned by fromCache
+    :param result: the result of the stage
+    """
+    if Main._cache is not None:
+        Main._cache.put(stage, key, result)
+
+
+def readGraphs(pair, suffixes):
+    """
+    Reads the graphs of a (domain, range) pair, in order to store them in the stage cache
+
+    :param pair: the PairResult of the pair
+    :param suffixes: the suffixes of the graphs
+    :return: the dictionary where the keys are the paths of the graphs and the values are their contents
+    """
+    graphs = {}
+    for suffix in suffixes:
+        path = 'output/' + Main._time + '/graphs/' + pair.name() + suffix + '.png'
+        with open(path, "rb") as file:
+            graphs['graphs/' + pair.name() + suffix + '.png'] = file.read()
+    return graphs
+
+
+def writeGraphs(graphs):
+    """
+    Writes into the output folder the graphs taken from the stage cache
+
+    :param graphs: the dictionary returned by readGraphs
+    """
+    for path, content in graphs.items():
+        with open('output/' + Main._time + '/' + path, "wb") as file:
+            file.write(content)
+
+
+def exportEnabled():
+    """
+    Checks if the results of the stages have to be written in the csv files. They are always written when the
+    pipeline is not executed in memory, because every stage reads the results of the previous one from them.
+
+    :return: True if the csv files have to be written, else False
+    """
+    return Main._exportCSV or not Main._inMemory
+
+
+def csvFile(pair, suffix=""):
+    """
+    Creates the path of a csv file of a (domain, range) pair
+
+    :param pair: the PairResult of the pair
+    :param suffix: the suffix that identifies the stage (blank for the dataset)
+    :return: the path of the csv file
+    """
+    return 'output/' + Main._time + '/csv_files/' + pair.name() + suffix + ".csv"
+
+
+def readDataset(dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass=""):
+    """
+    Reads the dataset of a (domain, range) pair from the csv file written by executeQuery
+
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties of a joint pair)
+    :param domainClass: the domain class
+    :param rangeClass: the range class (if empty, the operation is binary)
+    :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
+    :return: the PairResult that holds the identifiers and the values of the dataset
+    """
+    pair = PairResult(domainClass, rangeClass, auxiliaryClass, createNameProperty(dataPropertyToFuzzify))
+    csvhandler = CSVHandler(csvFile(pair))
+    d, fields = csvhandler.readDict()
+    pair.fields = fields
+    pair.dictionary = Main._identifiers
+    if isinstance(dataPropertyToFuzzify, list):
+        pair.properties = [createNameProperty(p) for p in dataPropertyToFuzzify]
+    names = pair.properties or [pair.nameProperty]
+    pair.identifiers = {field: Main._identifiers.encode([r.get(field) for r in d], strip=False)
+                        for field in fields if field not in names}
+    values = np.array([[float(r.get(name)) for name in names] for r in d]).reshape(-1, len(names))
+    pair.values = values if pair.properties else values[:, 0]
+    return pair
+
+
+def readGranules(dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass=""):
+    """
+    Reads the granules of a (domain, range) pair from the csv files written by granulation
+
+    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param domainClass: the domain class
+    :param rangeClass: the range class (if empty, the operation is binary)
+    :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
+    :return: the PairResult that holds the identifiers, the labels and the sparse memberships of the granules (only
+             the labels and the SigmaCount of the granules in "minibatch" mode)
+    """
+    pair = PairResult(domainClass, rangeClass, auxiliaryClass, createNameProperty(dataPropertyToFuzzify))
+    csvhandler = CSVHandler(csvFile(pair, "Partition"))
+    partition, _ = csvhandler.readDict()
+    pair.labels = [row.get("granule") for row in partition]
+    pair.dictionary = Main._identifiers
+    if Main._clusteringMode == "minibatch":
+        # the memberships are only summed, one batch at a time (see streamGranulation)
+        pair.memberships = SigmaCount(len(pair.labels))
+        for _, values, memberships in granuleChunks(pair, Main._clusteringBatchSize):
+            pair.memberships(values, memberships)
+        return pair
+    names, pair.values, pair.memberships = next(granuleChunks(pair))
+    pair.identifiers = {pair.element(): Main._identifiers.encode(names, strip=False)}
+    return pair
+
+
+def granuleChunks(pair, chunkSize=0):
+    """
+    Reads the granules csv file of a (domain, range) pair one chunk of rows at a time
+
+    :param pair: the PairResult of the pair, with the labels of the granules
+    :param chunkSize: the number of rows of a chunk (0 to read all the rows in a single chunk)
+    :return: the iterator of the chunks; every chunk is a tuple of the names of the individuals, their values and
+             their SparseMemberships
+    """
+    indexes = {label: index for index, label in enumerate(pair.labels)}
+    element = pair.element()
+    csvhandler = CSVHandler(csvFile(pair, "Granules"))
+    for rows in csvhandler.readDictChunks(chunkSize):
+        # every row holds the degrees to two consecutive granules of the partition
+        index = [indexes[row.get("granule")] for row in rows]
+        if any(indexes[row.get("nextGranule")] != i + 1 for i, row in zip(index, rows)):
+            raise Exception("[readGranules] ERROR: the granules of a row of " + csvFile(pair, "Granules") +
+                            " are not consecutive.")
+        yield ([row.get(element) for row in rows], np.array([float(row.get(pair.nameProperty)) for row in rows]),
+               SparseMemberships(index, [float(row.get("degree")) for row in rows],
+                                 [float(row.get("nextDegree")) for row in rows], len(pair.labels)))
+
+
+def individualDegrees(pair, element):
+    """
+    Iterates over the membership degrees of the individuals of a (domain, range) pair: they are taken from the sparse
+    memberships of the pair or, if the granulation has been streamed (see streamGranulation), from the granules csv
+    file one batch at a time
+
+    :param pair: the PairResult of the pair
+    :param element: the class of the individuals
+    :return: the iterator of the names of the individuals and the lists of their (granule index, degree) pairs
+    """
+    if isinstance(pair.memberships, SparseMemberships):
+        return zip(pair.names(element), pair.memberships.degrees())
+    return ((name, degrees) for names, _, memberships in granuleChunks(pair, Main._clusteringBatchSize)
+            for name, degrees in zip(names, memberships.degrees()))
+
+
+def readPairResult(dataPropertyToFuzzify, domainClass, rangeClass="", auxiliaryClass=""):
+    """
+    Reads all the results of a (domain, range) pair from the csv files written by the stages
+
+    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param domainClass: the domain class
+    :param rangeClass: the range class (if empty, the operation is binary)
+    :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
+    :return: the PairResult of the pair
+    """
+    pair = readGranules(dataPropertyToFuzzify, domainClass, rangeClass, auxiliaryClass)
+
+    # Get list of centroids from centroids.csv.
+    csvhandler = CSVHandler(csvFile(pair, "Centroids"))
+    pair.centroids = np.array([float(c[0]) for c in csvhandler.read()])
+
+    # Get granules cardinalities from cardinalities.csv.
+    csvhandler = CSVHandler(csvFile(pair, "Cardinalities"))
+    cardinalities, _ = csvhandler.readDict()
+    pair.cardinalities = {row.get("granule"): float(row.get("sigma-count")) for row in cardinalities}
+
+    # Get quantifiers from quantifiers.csv.
+    csvhandler = CSVHandler(csvFile(pair, "Quantifiers"))
+    quantifiers, qlabels = csvhandler.readDict()
+    qlabels.remove("granules")
+    pair.quantifierLabels = qlabels
+    pair.quantification = {row.get("granules"): {label: float(row.get(label)) for label in qlabels}
+                           for row in quantifiers}
+    return pair
 
 
 def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeClassesList="", auxiliaryClass="",
-                objectProperty=""):
+                objectProperty="", results=None):
     """
-    Integrates the results in the original ontology. It picks up the results from previously generated cvs files.
+    Integrates the results in the original ontology. It picks up the results from previously generated cvs files, if
+    they are not passed in memory. The results of a joint granulation are always passed in memory, and every data
+    property is integrated with the projections of the joint granules.
 
     :param ontologyName: the ontology name
-    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties)
     :param domainClassesList: the domain classes list
     :param rangeClassesList: the range classes list (if empty, the operation is binary)
     :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
     :param objectProperty: the object property (if empty, the operation is binary)
+    :param results: the dictionary of the PairResult of every (domain, range) pair
     """
     logging.warning("Integration process in execution...")
     t0 = time()
+
+    # Open ontology.
+    ontology = OWLOntology("ontologies/" + ontologyName)
+
+    # Create a copy of original ontology. New axioms will be written in g"onotologyName".owl
+    ontology.createBackup('output/' + Main._time + '/g_' + ontologyName)
+
+    if isinstance(dataPropertyToFuzzify, list):
+        # Every data property of a joint granulation is integrated with the projections of the joint granules.
+        countGranule = 0
+        for index, dataProperty in enumerate(dataPropertyToFuzzify):
+            getPair = lambda domain, range: results.get((domain, range)).projections[index]
+            countGranule = integrateProperty(ontology, dataProperty, domainClassesList, rangeClassesList,
+                                             auxiliaryClass, objectProperty, getPair, countGranule)
+    else:
+        # Define getPair() function. It's used to get the results of a pair, from memory or from the csv files.
+        getPair = lambda domain, range: results.get((domain, range)) if results is not None else \
+            readPairResult(dataPropertyToFuzzify, domain, range, auxiliaryClass)
+        integrateProperty(ontology, dataPropertyToFuzzify, domainClassesList, rangeClassesList, auxiliaryClass,
+                          objectProperty, getPair)
+
+    # Close the ontology.
+    t1 = time()
+    logging.warning("Time elapsed in integration process: {0:.3f} seconds.\n".format(t1 - t0))
+    ontology.close()
+
+
+def integrateProperty(ontology, dataPropertyToFuzzify, domainClassesList, rangeClassesList, auxiliaryClass,
+                      objectProperty, getPair, countGranule=0):
+    """
+    Adds to the ontology the granules, the cardinalities and the quantifiers of a data property for all the
+    (domain, range) pairs.
+
+    :param ontology: the OWLOntology
+    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param domainClassesList: the domain classes list
+    :param rangeClassesList: the range classes list (if empty, the operation is binary)
+    :param auxiliaryClass: the auxiliary class (if empty, the operation is binary)
+    :param objectProperty: the object property (if empty, the operation is binary)
+    :param getPair: the function that returns the PairResult of a (domain, range) pair of the data property
+    :param countGranule: the number of the granules already added to the ontology
+    :return: the number of the granules added to the ontology, including the previous ones
+    """
     nameProperty = createNameProperty(dataPropertyToFuzzify)
     dataPropertyToFuzzify = "g_" + dataPropertyToFuzzify
 
@@ -315,41 +1110,19 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
     # Set minimum and maximum value.
     k1, k2 = 0, 1000
 
-    # Open ontology.
-    ontology = OWLOntology("ontologies/" + ontologyName)
-
-    # Create a copy of original ontology. New axioms will be written in g"onotologyName".owl
-    ontology.createBackup('output/' + Main._time + '/g_' + ontologyName)
-
-    countGranule = 0
-
     if rangeClassesList == [""] and auxiliaryClass == "" and objectProperty == ["", ""]:
 
         for inheritanceClass in domainClassesList:
 
-            # Get list of centroids from centroids.csv.
-            csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + inheritanceClass + "Centroids.csv")
-            centroids = csvhandler.read()
-            quantifierPrototypes = [float(c[0]) for c in centroids]
+            # Get the results of the pair: centroids, granules, cardinalities and quantifiers.
+            pair = getPair(inheritanceClass, "")
+            quantifierPrototypes = pair.centroids.tolist()
+            glabels = pair.labels
+            qlabels = pair.quantifierLabels
 
             # Get number of quantifierPrototypes.
             N = len(quantifierPrototypes)
 
-            # Get granules from granules.csv.
-            csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + inheritanceClass + "Granules.csv")
-            granules, glabels = csvhandler.readDict()
-            glabels.remove(inheritanceClass)
-            glabels.remove(nameProperty)
-
-            # Get granules cardinalities from cardinalities.csv.
-            csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + inheritanceClass + "Cardinalities.csv")
-            cardinalities, _ = csvhandler.readDict()
-
-            # Get quantifiers from quantifiers.csv.
-            csvhandler = CSVHandler('output/' + Main._time + '/csv_files/' + inheritanceClass + "Quantifiers.csv")
-            quantifiers, qlabels = csvhandler.readDict()
-            qlabels.remove("granules")
-
             # Add fuzzy granules as OWL classes, where each identifier is extracted from glabels list.
             for granule in glabels:
                 ontology.addClass(trim(granule))
@@ -405,18 +1178,12 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
             # Every individual of domain class is defined in relative domain class subclasses and mapped with relative granules.
             # The membership degree is represented using FuzzyOWL2 code written into an annotation property.
 
-            for row in granules:
-                i = 0
-                for granule in glabels:
-                    i = i + 1
-                    label = trim(granule) + nameProperty + inheritanceClass
-                    subClass = row.get(inheritanceClass)
-                    degree = float(row.get(granule))
-                    if degree > 0:
-                        annotation = "<fuzzyOwl2 fuzzyType=\"axiom\"><Degree value=\"{}\"/></fuzzyOwl2>".format(
-                            degree)
-                        ontology.addIndividual(subClass, label, annotation)
-                        ontology.addObjectProperty("mapsTo", subClass, dictGranule.get(inheritanceClass)[i - 1])
+            for subClass, degrees in individualDegrees(pair, inheritanceClass):
+                for i, degree in degrees:
+                    label = trim(glabels[i]) + nameProperty + inheritanceClass
+                    annotation = "<fuzzyOwl2 fuzzyType=\"axiom\"><Degree value=\"{}\"/></fuzzyOwl2>".format(degree)
+                    ontology.addIndividual(subClass, label, annotation)
+                    ontology.addObjectProperty("mapsTo", subClass, dictGranule.get(inheritanceClass)[i])
 
             # Add fuzzy quantifiers as Quantifiers subclasses. Every subclass is extracted from qlabels list.
             ontology.addClass("Quantifier")
@@ -431,13 +1198,8 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
             ontology.addFunctionalDatatypeProperty("hasCardinality")
 
             # Add hasCardinality datatype property that put in relationship Granule's individuals with their sigma-count values.
-            for row in cardinalities:
-                i = 0
-                for label in glabels:
-                    i = i + 1
-                    if row.get("granule") == label:
-                        granule = dictGranule.get(inheritanceClass)[i - 1]
-                sigmacount = float(row.get("sigma-count"))
+            for label, sigmacount in pair.cardinalities.items():
+                granule = dictGranule.get(inheritanceClass)[glabels.index(label)]
                 ontology.addDatatypeProperty("hasCardinality", granule, "double", Round(sigmacount))
 
             # Add hasCardinality object property.
@@ -446,14 +1208,10 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
             ontology.addObjectPropertyRange("g_hasCardinality", "Quantifier")
 
             # Every granule is connected with relative quantifier class.
-            for row in quantifiers:
+            for l, quants in pair.quantification.items():
+                granule = dictGranule.get(inheritanceClass)[glabels.index(l)]
                 for label in qlabels:
-                    i = 0
-                    for l in glabels:
-                        i = i + 1
-                        if row.get("granules") == l:
-                            granule = dictGranule.get(inheritanceClass)[i - 1]
-                    degree = float(row.get(label))
+                    degree = float(quants.get(label))
                     if degree > 0:
                         # The membership degree is represented using FuzzyOWL2 code written into an annotation property.
                         annotation = ontology.fuzzyLabelAnnotation(
@@ -468,32 +1226,15 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
 
         for inheritanceClass in rangeClassesList:
             for inheritanceClassDomain in domainClassesList:
-                # Get list of centroids from centroids.csv.
-                csvhandler = CSVHandler(
-                    'output/' + Main._time + '/csv_files/' + auxiliaryClass + inheritanceClassDomain + inheritanceClass + "Centroids.csv")
-                centroids = csvhandler.read()
-                quantifierPrototypes = [float(c[0]) for c in centroids]
+                # Get the results of the pair: centroids, granules, cardinalities and quantifiers.
+                pair = getPair(inheritanceClassDomain, inheritanceClass)
+                quantifierPrototypes = pair.centroids.tolist()
+                glabels = pair.labels
+                qlabels = pair.quantifierLabels
 
                 # Get number of quantifierPrototypes.
                 N = len(quantifierPrototypes)
 
-                # Get granules from granules.csv.
-                csvhandler = CSVHandler(
-                    'output/' + Main._time + '/csv_files/' + auxiliaryClass + inheritanceClassDomain + inheritanceClass + "Granules.csv")
-                granules, glabels = csvhandler.readDict()
-                glabels = glabels[2:]
-
-                # Get granules cardinalities from cardinalities.csv.
-                csvhandler = CSVHandler(
-                    'output/' + Main._time + '/csv_files/' + auxiliaryClass + inheritanceClassDomain + inheritanceClass + "Cardinalities.csv")
-                cardinalities, _ = csvhandler.readDict()
-
-                # Get quantifiers from quantifiers.csv.
-                csvhandler = CSVHandler(
-                    'output/' + Main._time + '/csv_files/' + auxiliaryClass + inheritanceClassDomain + inheritanceClass + "Quantifiers.csv")
-                quantifiers, qlabels = csvhandler.readDict()
-                qlabels.remove("granules")
-
                 # Add fuzzy granules as OWL classes, where each identifier is extracted from glabels list.
 
                 for granule in glabels:
@@ -553,20 +1294,14 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
 
                 # Every individual of auxiliar class is defined in relative auxialiar class subclasses and mapped with relative granules.
                 # The membership degree is represented using FuzzyOWL2 code written into an annotation property.
-                for row in granules:
-                    i = 0
-                    for granule in glabels:
-                        i = i + 1
+                for subClass, degrees in individualDegrees(pair, auxiliaryClass):
+                    for i, degree in degrees:
                         label = trim(
-                            granule) + nameProperty + auxiliaryClass + inheritanceClassDomain + "From" + inheritanceClass
-                        subClass = row.get(auxiliaryClass)
-                        degree = float(row.get(granule))
-
-                        if degree > 0:
-                            annotation = "<fuzzyOwl2 fuzzyType=\"axiom\"><Degree value=\"{}\"/></fuzzyOwl2>".format(
-                                degree)
-                            ontology.addIndividual(subClass, label, annotation)
-                            ontology.addObjectProperty("mapsTo", subClass, dictGranule.get(inheritanceClass)[i - 1])
+                            glabels[i]) + nameProperty + auxiliaryClass + inheritanceClassDomain + "From" + inheritanceClass
+                        annotation = "<fuzzyOwl2 fuzzyType=\"axiom\"><Degree value=\"{}\"/></fuzzyOwl2>".format(
+                            degree)
+                        ontology.addIndividual(subClass, label, annotation)
+                        ontology.addObjectProperty("mapsTo", subClass, dictGranule.get(inheritanceClass)[i])
 
                 # Add fuzzy quantifiers as Quantifiers subclasses. Every subclass is extracted from qlabels list.
                 ontology.addClass("Quantifier")
@@ -582,13 +1317,8 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
 
                 # Add hasCardinality datatype property that put in relationship Granule's individuals with their sigma-count values.
 
-                for row in cardinalities:
-                    i = 0
-                    for label in glabels:
-                        i = i + 1
-                        if row.get("granule") == label:
-                            granule = dictGranule.get(inheritanceClass)[i - 1]
-                    sigmacount = float(row.get("sigma-count"))
+                for label, sigmacount in pair.cardinalities.items():
+                    granule = dictGranule.get(inheritanceClass)[glabels.index(label)]
                     ontology.addDatatypeProperty("hasCardinality", granule, "double", Round(sigmacount))
 
                 # Add hasCardinality object property.
@@ -597,14 +1327,10 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
                 ontology.addObjectPropertyRange("g_hasCardinality", "Quantifier")
 
                 # Every granule is connected with relative quantifier class.
-                for row in quantifiers:
+                for l, quants in pair.quantification.items():
+                    granule = dictGranule.get(inheritanceClass)[glabels.index(l)]
                     for label in qlabels:
-                        i = 0
-                        for l in glabels:
-                            i = i + 1
-                            if row.get("granules") == l:
-                                granule = dictGranule.get(inheritanceClass)[i - 1]
-                        degree = float(row.get(label))
+                        degree = float(quants.get(label))
                         if degree > 0:
                             # The membership degree is represented using FuzzyOWL2 code written into an annotation property.
                             annotation = ontology.fuzzyLabelAnnotation(
@@ -615,19 +1341,18 @@ def integration(ontologyName, dataPropertyToFuzzify, domainClassesList, rangeCla
                             assertion = "\n\t<ClassAssertion>{0}{1}\n\t\t<NamedIndividual IRI=\"#{2}\"/>\n\t</ClassAssertion>\n"
                             ontology.addAxiom(assertion.format(annotation, someValues, granule))
 
-    # Close the ontology.
-    t1 = time()
-    logging.warning("Time elapsed in integration process: {0:.3f} seconds.\n".format(t1 - t0))
-    ontology.close()
+    return countGranule
 
 
 def createNameProperty(dataPropertyToFuzzify):
     """
     Creates the name property
 
-    :param dataPropertyToFuzzify: the data property to fuzzify
-    :return: the name property
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties of a joint pair)
+    :return: the name property (the names of the data properties one after the other, for a joint pair)
     """
+    if isinstance(dataPropertyToFuzzify, list):
+        return "".join(createNameProperty(p) for p in dataPropertyToFuzzify)
     if not dataPropertyToFuzzify.islower():
         i = -1
         propertyInverse = ""
@@ -657,21 +1382,63 @@ def getIndividualsClass(SPARQLEndpoint, ontologyPrefix, domainClass):
     :param SPARQLEndpoint: the sparql endpoint
     :param ontologyPrefix: the query prefix
     :param domainClass: the domain class
-    :return: the length of the resultset
+    :return: the number of individuals
+    """
+    return countIndividualsClasses(SPARQLEndpoint, ontologyPrefix, [domainClass]).get(domainClass)
+
+
+def countIndividualsClasses(SPARQLEndpoint, ontologyPrefix, classesList, limit=0):
+    """
+    Gets the numbers of individuals of the specified classes with a single query, which groups the individuals by
+    class and returns only their counts. If limit is greater than 0, the individuals of every class are counted up
+    to limit: the counts are cheaper to evaluate under inference and are still enough to decide if a class has more
+    than limit - 1 individuals.
+
+    :param SPARQLEndpoint: the sparql endpoint
+    :param ontologyPrefix: the query prefix
+    :param classesList: the classes list
+    :param limit: the maximum number of individuals counted for every class (0 to count all of them)
+    :return: the dictionary where the keys are the classes and the values are the numbers of individuals
     """
     # obtain a connection to the endpoint
     sparql = SPARQLEndpointInterface(SPARQLEndpoint)
 
-    query = ("PREFIX ontology: " + ontologyPrefix +
-             " SELECT ?individual  WHERE {"
-             "  ?individual a ontology:" + domainClass + ".  } ")
-
-    # sends the query
-    rs, fields = ResultSetConverter.convertToLD(sparql(query))
+    query = countQuery(ontologyPrefix, classesList, limit)
+
+    # get the numbers from the stage cache, if the same query has already been sent to the same end point
+    key, counts = fromCache("pruning", dataSource(SPARQLEndpoint), query)
+    if counts is None and Main._backend is not None:
+        iris = Main._backend.count([ontologyPrefix.strip("<>") + c for c in classesList], limit)
+        counts = {c: iris.get(ontologyPrefix.strip("<>") + c) for c in classesList}
+        toCache("pruning", key, counts)
+    elif counts is None:
+        # sends the query; the classes without individuals are missing from the resultset
+        columns, fields = selectColumns(sparql, query, ["individuals"])
+        counts = {c: 0 for c in classesList}
+        if fields:
+            counts.update(zip(columns["class"].tolist(), columns["individuals"].astype(int).tolist()))
+        toCache("pruning", key, counts)
+    return counts
+
+
+def countQuery(ontologyPrefix, classesList, limit=0):
+    """
+    Builds the SPARQL query that counts the individuals of the specified classes, grouped by class.
 
-    # store only the identifiers of generic class
-    resultset = [row.get("individual").split("#", 1)[1] for row in rs]
-    return len(resultset)
+    :param ontologyPrefix: the query prefix
+    :param classesList: the classes list
+    :param limit: the maximum number of individuals counted for every class (0 to count all of them)
+    :return: the query
+    """
+    if limit > 0:
+        whereClause = " UNION ".join("{ SELECT ?individual (ontology:" + c + " AS ?class) WHERE {"
+                                     "  ?individual a ontology:" + c + ".  } LIMIT " + str(limit) + " }"
+                                     for c in classesList)
+    else:
+        whereClause = (" VALUES ?class {" + "".join(" ontology:" + c for c in classesList) + " }"
+                       "  ?individual a ?class. ")
+    return ("PREFIX ontology: " + ontologyPrefix +
+            " SELECT ?class (COUNT(?individual) AS ?individuals)  WHERE { " + whereClause + " } GROUP BY ?class")
 
 
 def createOutputAndLogFiles():
@@ -695,34 +1462,116 @@ def renameOutputFolder():
     shutil.move('output/' + Main._time, 'output/' + Main._time + '_FAILED')
 
 
-def increaseLabels(fuzzySetLabels):
+def increaseLabels(fuzzySetLabels, index):
     """
-    Increases the counter of fuzzy set label to not incur in a puning error in the integrated ontology
+    Appends the counter of the (domain, range) pair to the fuzzy set labels to not incur in a punning error in the
+    integrated ontology
 
     :param fuzzySetLabels: the fuzzy set labels list
+    :param index: the counter of the (domain, range) pair
     :return: the new countered increased fuzzy set labels list
     """
-    newFuzzySetLabels = []
+    return [label + str(index) for label in fuzzySetLabels]
 
-    for label in fuzzySetLabels:
-        newFuzzySetLabels.append(label + str(Main._index))
-    Main._index += 1
-
-    return newFuzzySetLabels
 
+def pruning(SPARQLEndpoint, ontologyPrefix, classesList, fuzzySetLabelsLength, estimate=False):
+    """
+    Removes the classes that have not more individuals than the fuzzy sets
 
-def pruning(SPARQLEndpoint, ontologyPrefix, classesList, fuzzySetLabelsLength):
+    :param SPARQLEndpoint: the sparql endpoint
+    :param ontologyPrefix: the query prefix
+    :param classesList: the classes list
+    :param fuzzySetLabelsLength: the number of fuzzy sets
+    :param estimate: if True, the individuals are counted only up to fuzzySetLabelsLength + 1
+    :return: the list of the classes with sufficient individuals
+    """
+    counts = countIndividualsClasses(SPARQLEndpoint, ontologyPrefix, classesList,
+                                     fuzzySetLabelsLength + 1 if estimate else 0)
+    prunedClassesList = []
     for c in classesList:
-        if getIndividualsClass(SPARQLEndpoint, ontologyPrefix, c) <= fuzzySetLabelsLength:
+        if counts.get(c) <= fuzzySetLabelsLength:
             logging.warning("Instance of '" + c + "' are not sufficient!")
-            classesList.remove(c)
-    return classesList
+        else:
+            prunedClassesList.append(c)
+    return prunedClassesList
+
+
+def initializeWorker(settings):
+    """
+    Initializes a worker process of the pool, so that it shares the settings of the current run and writes into its
+    output folder and debug.log file
+
+    :param settings: the dictionary of the Main class attributes
+    """
+    for name, value in settings.items():
+        setattr(Main, name, value)
+    SPARQLEndpointInterface.responseCache = Main._responseCache
+    logging.basicConfig(filename='output/' + Main._time + '/debug.log',
+                        level=logging.DEBUG, format='%(message)s')
+
+
+def mainSettings():
+    """
+    Gets the settings of the current run, in order to share them with the worker processes
+
+    :return: the dictionary of the Main class attributes
+    """
+    return {name: value for name, value in vars(Main).items()
+            if name.startswith("_") and not name.startswith("__") and name != "_identifiers"}
+
+
+def processPair(dataPropertyToFuzzify, labels, quantifierLabels, quantifierPrototypes, SPARQLEndPoint, ontologyPrefix,
+                domain, range, auxiliaryClass, objectProperty, pair=None, counter=None):
+    """
+    Executes query, clustering, granulation and quantification for a single (domain, range) pair. It is the job that
+    is scheduled on the process pool when the operations are executed in parallel. If a list of data properties is
+    given, their values are clustered jointly (see jointClustering) and the projections of the joint granules are
+    granulated and quantified for every data property; they are handed over in memory.
+
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties)
+    :param labels: the fuzzy set labels list of the pair (already increased)
+    :param quantifierLabels: the quantifier labels list
+    :param quantifierPrototypes: the quantifier prototypes
+    :param SPARQLEndPoint: the sparql endpoint
+    :param ontologyPrefix: the ontology prefix for the queries
+    :param domain: the domain class
+    :param range: the range class (blank if the operation is binary)
+    :param auxiliaryClass: the auxiliary class (blank if the operation is binary)
+    :param objectProperty: the object property (blank if the operation is binary)
+    :param pair: the PairResult already extracted by executeBulkQuery (if None, the query of the pair is executed)
+    :param counter: the counter of the pair, appended to the labels (see increaseLabels)
+    :return: the PairResult of the pair
+    """
+    # in memory the results are handed over from a stage to the next one, otherwise they are read from the csv files
+    handOver = lambda pair: pair if Main._inMemory else None
+
+    if pair is None:
+        pair = executeQuery(SPARQLEndPoint, ontologyPrefix, dataPropertyToFuzzify, domain, range, auxiliaryClass,
+                            objectProperty)
+    if isinstance(dataPropertyToFuzzify, list):
+        # the joint granules are quantified, then every data property is granulated with the projected centroids
+        pair = jointClustering(labels, dataPropertyToFuzzify, domain, range, auxiliaryClass, handOver(pair))
+        pair = quantification(quantifierLabels, quantifierPrototypes, dataPropertyToFuzzify, domain, range,
+                              auxiliaryClass, pair)
+        pair.projections = [
+            quantification(quantifierLabels, quantifierPrototypes, dataProperty, domain, range, auxiliaryClass,
+                           granulation([label + projection.nameProperty for label in labels], dataProperty, domain,
+                                       range, auxiliaryClass, projection))
+            for dataProperty, projection in zip(dataPropertyToFuzzify, pair.projections)]
+        return pair
+    if Main._clusterRange is not None:
+        pair = validity(labels, dataPropertyToFuzzify, domain, range, auxiliaryClass, handOver(pair), counter)
+    pair = clustering(len(labels), dataPropertyToFuzzify, domain, range, auxiliaryClass, handOver(pair))
+    pair = granulation(labels, dataPropertyToFuzzify, domain, range, auxiliaryClass, handOver(pair))
+    pair = quantification(quantifierLabels, quantifierPrototypes, dataPropertyToFuzzify, domain, range,
+                          auxiliaryClass, handOver(pair))
+    return pair
 
 
 def execute_operations(ontologyName, SPARQLEndPoint, ontologyPrefix, dataPropertyToFuzzify, fuzzySetLabels,
                        quantifierLabels, quantifierPrototypes, domainClasses,
                        rangeClasses=[""], auxiliaryClass="",
-                       objectProperty=[""]):
+                       objectProperty=[""], workers=1):
     """
     Executes all the operations for all the combinations between domain classes list and range classes list. These
     operations are:
@@ -733,10 +1582,14 @@ def execute_operations(ontologyName, SPARQLEndPoint, ontologyPrefix, dataPropert
     - quantification on data
     - integration of results on the original ontology
 
+    Every (domain, range) pair is an independent job: if workers is greater than 1, the jobs are executed on a pool of
+    processes, otherwise they are executed one at a time. The labels of every pair are numbered following the order
+    of the pairs and the results are merged in the same order, so the output is the same in both cases.
+
     :param ontologyName: the ontology name
     :param SPARQLEndPoint: the sparql endpoint SPARQLEndpoint
     :param ontologyPrefix: the ontology prefix for the queries
-    :param dataPropertyToFuzzify: the data property to fuzzify
+    :param dataPropertyToFuzzify: the data property to fuzzify (or the list of the data properties granulated jointly)
     :param fuzzySetLabels: the fuzzy set labels list
     :param quantifierLabels: the quantifier labels list
     :param quantifierPrototypes: the quantifier prototypes
@@ -744,19 +1597,51 @@ def execute_operations(ontologyName, SPARQLEndPoint, ontologyPrefix, dataPropert
     :param rangeClasses: the range classes list (if empty, the operations are binary)
     :param auxiliaryClass: the auxiliary class (if empty, the operations are binary)
     :param objectProperty: the object property (if empty, the operations are binary)
+    :param workers: the number of worker processes
     """
-    pruning(SPARQLEndPoint, ontologyPrefix, domainClasses, len(fuzzySetLabels))
-    for domain in domainClasses:
-        for range in rangeClasses:
-            labels = increaseLabels(fuzzySetLabels)
-            executeQuery(SPARQLEndPoint, ontologyPrefix, dataPropertyToFuzzify, domain, range, auxiliaryClass,
-                         objectProperty)
-            clustering(len(fuzzySetLabels), dataPropertyToFuzzify, domain, range, auxiliaryClass)
-            granulation(labels, dataPropertyToFuzzify, domain, range, auxiliaryClass)
-            quantification(quantifierLabels, quantifierPrototypes, dataPropertyToFuzzify, domain, range,
-                           auxiliaryClass)
+    # the bulk and the concurrent extractions are only useful with a SPARQL end point; the bulk extraction selects the
+    # values of a single data property
+    joint = isinstance(dataPropertyToFuzzify, list)
+    bulk = Main._bulkExtraction and Main._backend is None and not joint
+    # the pages of a paginated extraction are already requested concurrently (see pagesInFlight)
+    prefetch = Main._asyncConnections > 0 and not bulk and Main._backend is None and Main._pageSize == 0
+    domainClasses = pruning(SPARQLEndPoint, ontologyPrefix, domainClasses, len(fuzzySetLabels), Main._pruningEstimate)
+    pairs = [(domain, range) for domain in domainClasses for range in rangeClasses]
+    extracted = {}
+    if bulk:
+        extracted = executeBulkQuery(SPARQLEndPoint, ontologyPrefix, dataPropertyToFuzzify, domainClasses,
+                                     rangeClasses, auxiliaryClass, objectProperty, Main._bulkBatchSize)
+    elif prefetch:
+        # the extraction queries of the pairs that survived the pruning are sent concurrently, one batch of
+        # asyncConnections queries at a time, so that only the resultsets of a batch are held before their conversion
+        for start in range(0, len(pairs), Main._asyncConnections):
+            batch = pairs[start:start + Main._asyncConnections]
+            prefetchQueries(SPARQLEndPoint, [("query", extractionQuery(ontologyPrefix, dataPropertyToFuzzify, domain,
+                                                                       range, auxiliaryClass, objectProperty))
+                                             for domain, range in batch])
+            extracted.update({(domain, range): executeQuery(SPARQLEndPoint, ontologyPrefix, dataPropertyToFuzzify,
+                                                            domain, range, auxiliaryClass, objectProperty)
+                              for domain, range in batch})
+    jobs = [(dataPropertyToFuzzify, increaseLabels(fuzzySetLabels, index), quantifierLabels, quantifierPrototypes,
+             SPARQLEndPoint, ontologyPrefix, domain, range, auxiliaryClass, objectProperty,
+             extracted.get((domain, range)), index)
+            for index, (domain, range) in enumerate(pairs, 1)]
+    if workers > 1 and len(jobs) > 1:
+        logging.warning("\nExecuting {0} pairs on {1} worker processes...".format(len(jobs), workers))
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializeWorker,
+                                 initargs=(mainSettings(),)) as executor:
+            futures = [executor.submit(processPair, *job) for job in jobs]
+            # wait for the results following the order of the pairs, not the order of completion
+            results = [future.result() for future in futures]
+    else:
+        results = [processPair(*job) for job in jobs]
+    # the individuals of the pairs processed by other processes are encoded again with the dictionary of this one
+    for pair in results:
+        pair.share(Main._identifiers)
+    logging.warning("\nProcessed pairs: " + str([(pair.domainClass, pair.rangeClass) for pair in results]))
     integration(ontologyName, dataPropertyToFuzzify, domainClasses, rangeClasses, auxiliaryClass,
-                objectProperty)
+                objectProperty,
+                {(pair.domainClass, pair.rangeClass): pair for pair in results} if Main._inMemory or joint else None)
 
 
 def main():
@@ -769,11 +1654,54 @@ def main():
         consistencycheck = ConsistencyCheck(data)
 
         if consistencycheck():
+            Main._inMemory = data.get("inMemoryPipeline", False)
+            Main._exportCSV = data.get("exportCSV", True)
+            Main._seed = data.get("seed")
+            Main._bulkExtraction = data.get("bulkExtraction", False)
+            Main._bulkBatchSize = data.get("bulkBatchSize", 0)
+            Main._pruningEstimate = data.get("pruningEstimate", False)
+            Main._resultFormat = data.get("resultFormat", "")
+            Main._pageSize = data.get("pageSize", 0)
+            Main._pagesInFlight = data.get("pagesInFlight", 4)
+            Main._keysetPagination = data.get("keysetPagination", False)
+            Main._asyncConnections = data.get("asyncConnections", 0)
+            Main._clusteringPrecision = data.get("clusteringPrecision", "float64")
+            Main._clusteringMode = data.get("clusteringMode", "exact")
+            Main._clusteringBins = data.get("clusteringBins", 1000)
+            Main._clusteringBinning = data.get("clusteringBinning", "width")
+            Main._clusteringBatchSize = data.get("clusteringBatchSize", 65536)
+            Main._clusteringSeeding = data.get("clusteringSeeding", "random")
+            Main._clusteringRestarts = data.get("clusteringRestarts", 1)
+            Main._clusteringWorkers = data.get("clusteringWorkers", 1)
+            Main._clusterRange = data.get("clusterRange")
+            Main._clusteringAcceleration = data.get("clusteringAcceleration")
+            Main._clusteringStopping = data.get("clusteringStopping", "membership")
+            Main._clusteringThreads = data.get("clusteringThreads", 1)
+            if data.get("stageCache"):
+                Main._cache = StageCache(data["stageCache"])
+            if data.get("centroidStore"):
+                Main._centroidStore = CentroidStore(data["centroidStore"], Main._time)
+            if data.get("queryBackend", "sparql") == "local":
+                Main._backend = OWLIndex("ontologies/" + data["ontologyName"])
+            if data.get("responseCache"):
+                Main._responseCache = ResponseCache(data["responseCache"], data.get("responseCacheTTL", 0),
+                                                    data.get("responseCacheSize", 0) * 1024 * 1024,
+                                                    data.get("replay", False))
+                SPARQLEndpointInterface.responseCache = Main._responseCache
+            # the processes of the pairs and of the restarts and the threads of the clustering multiply
+            processes = data.get("workers", 1) * Main._clusteringWorkers * Main._clusteringThreads
+            if processes > (os.cpu_count() or 1):
+                logging.warning("\nworkers, clusteringWorkers and clusteringThreads can run {0} clusterings at "
+                                "once on {1} CPUs: the CPUs are oversubscribed.".format(processes, os.cpu_count()))
             execute_operations(data["ontologyName"], data["SPARQLEndPoint"], data["ontologyPrefix"],
                                data["dataPropertyToFuzzify"], data["fuzzySetsLabels"], data["quantifiersLabels"],
                                data["quantifiersPrototypes"], data["domainClasses"], data["rangeClasses"],
                                data["auxiliaryClass"], [data["objectPropertyToAuxiliaryClass"],
-                                                        data["objectPropertyFromAuxiliaryClass"]])
+                                                        data["objectPropertyFromAuxiliaryClass"]],
+                               data.get("workers", 1))
+            # the centroids of this run become the starting point of the next one
+            if Main._centroidStore is not None:
+                Main._centroidStore.commit()
             logging.warning("\nTHE WHOLE PROCESS WAS PERFORMED IN {0:.3f} SECONDS.".format(time() - t0))
         else:
             # If something is wrong with the configuration file, the output folder is renamed appending '_FAILED' string
@@ -784,6 +1712,8 @@ def main():
 
     except Exception:
         # If an exception is raised during the process, the output folder is renamed appending '_FAILED' string
+        if Main._centroidStore is not None:
+            Main._centroidStore.discard()
         renameOutputFolder()
         raise Exception
 
@@ -0,0 +1,136 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import gzip
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from SPARQLEndpointInterface import AsyncSPARQLClient, SPARQLEndpointInterface
+
+
+class CannedSPARQLHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in SPARQL end-point: it answers every query with a canned JSON
+    result-set that echoes the query, on keep-alive connections.
+    '''
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        query = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())["query"][0]
+        with self.server.lock:
+            self.server.inFlight += 1
+            self.server.maxInFlight = max(self.server.maxInFlight, self.server.inFlight)
+        time.sleep(0.02)
+        with self.server.lock:
+            self.server.inFlight -= 1
+        body = json.dumps({"head": {"vars": ["query"]},
+                           "results": {"bindings": [{"query": {"type": "literal", "value": query}}]}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TSVSPARQLHandler(CannedSPARQLHandler):
+    '''
+    Stand-in SPARQL end-point that answers in TSV, if it is accepted.
+    '''
+
+    def do_POST(self):
+        if "tab-separated-values" not in self.headers.get("Accept", ""):
+            return CannedSPARQLHandler.do_POST(self)
+        query = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())["query"][0]
+        body = ('?query\t?length\n"' + query + '"\t' + str(len(query)) + '\n').encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/tab-separated-values; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SilentSPARQLHandler(CannedSPARQLHandler):
+    '''
+    Stand-in SPARQL end-point that does not answer in time.
+    '''
+
+    def do_POST(self):
+        time.sleep(0.5)
+
+
+class TestAsyncSPARQLClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CannedSPARQLHandler)
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.inFlight = 0
+        self.server.maxInFlight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.uri = "http://127.0.0.1:{0}/inf/sparql".format(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test(self):
+        queries = ["SELECT ?x WHERE { ?x a <urn:C" + str(i) + "> }" for i in range(20)]
+        client = AsyncSPARQLClient(self.uri, connections=3)
+        resultsets = client.run(queries)
+        self.assertEqual([rs["results"]["bindings"][0]["query"]["value"] for rs in resultsets], queries)
+        self.assertLessEqual(self.server.maxInFlight, 3)
+        self.assertLessEqual(self.server.connections, 3)
+        self.assertEqual(client.opened, self.server.connections)
+
+    def test_resultFormat(self):
+        self.server.RequestHandlerClass = TSVSPARQLHandler
+        queries = ["SELECT ?x WHERE { ?x a <urn:C" + str(i) + "> }" for i in range(5)]
+        resultsets = SPARQLEndpointInterface(self.uri).queryAll(queries, 2, "tsv")
+        self.assertEqual([(fields, list(rows)) for fields, rows in resultsets],
+                         [(["query", "length"], [(query, str(len(query)))]) for query in queries])
+        # the end-points that do not support the format answer in JSON
+        self.server.RequestHandlerClass = CannedSPARQLHandler
+        resultsets = SPARQLEndpointInterface(self.uri).queryAll(queries, 2, "csv")
+        self.assertEqual([(fields, list(rows)) for fields, rows in resultsets],
+                         [(["query"], [(query,)]) for query in queries])
+
+    def test_timeout(self):
+        self.server.RequestHandlerClass = SilentSPARQLHandler
+        client = AsyncSPARQLClient(self.uri, connections=2, timeout=0.1)
+        t0 = time.time()
+        self.assertRaises(Exception, client.run, ["SELECT ?x WHERE { ?x a <urn:C> }"])
+        self.assertLess(time.time() - t0, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import shutil
+import tempfile
+import unittest
+
+from utils import CentroidStore
+
+
+class TestCentroidStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test(self):
+        key = CentroidStore.key("Hotel", "", "", "hasPrice", 3)
+        first = CentroidStore(self.directory, "first")
+        first.put(key, [[1.], [2.], [3.]])
+        # the centroids of a run are visible only after the run is committed
+        self.assertIsNone(first.get(key))
+        first.commit()
+        self.assertEqual(first.get(key), [[1.], [2.], [3.]])
+        failed = CentroidStore(self.directory, "failed")
+        failed.put(key, [[4.], [5.], [6.]])
+        failed.discard()
+        self.assertEqual(CentroidStore(self.directory, "next").get(key), [[1.], [2.], [3.]])
+        self.assertNotEqual(CentroidStore.key("Hotel", "", "", "hasPrice", 4), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+from FuzzyClustering import FuzzyClustering, _farthestFirst
+from FuzzyClustering.FuzzyCMeans import FuzzyCMeans
+from FuzzyClustering.Membership import membershipDegrees
+from FuzzyClustering.MiniBatchFuzzyCMeans import MiniBatchFuzzyCMeans
+from FuzzyClustering.Seeding import kmeansPlusPlus, quantilePrototypes
+from FuzzyClustering.Validity import validityIndices
+
+
+def referenceStep(x, mu, m=2.):
+    # one iteration of the fuzzy c-means, computed one example at a time
+    mm = mu ** m
+    c = np.dot(x.T, mm).T / np.sum(mm, axis=0)[:, None]
+    new = np.zeros(mu.shape)
+    for i in range(len(x)):
+        d = np.sqrt(np.sum((x[i] - c) ** 2, axis=1))
+        for j in range(len(c)):
+            new[i, j] = 1. / np.sum((d[j] / d) ** (2. / (m - 1)))
+    return new
+
+
+class TestFuzzyCMeans(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(7)
+        self.x = np.concatenate([rng.normal(0., 1., 300), rng.normal(10., 1., 300)])[:, None]
+        mu = rng.uniform(size=(600, 3))
+        self.mu = mu / mu.sum(axis=1)[:, None]
+
+    def test_step(self):
+        fcm = FuzzyCMeans(self.x, self.mu, chunk=64)
+        fcm.step()
+        np.testing.assert_allclose(fcm.mu, referenceStep(self.x, self.mu), rtol=1e-9, atol=1e-12)
+
+    def test_step_dimensions(self):
+        rng = np.random.RandomState(3)
+        x = np.concatenate([rng.normal(0., 1., (200, 3)), rng.normal(4., 1., (200, 3))])
+        mu = rng.uniform(size=(400, 2))
+        mu /= mu.sum(axis=1)[:, None]
+        fcm = FuzzyCMeans(x, mu, chunk=64)
+        fcm.step()
+        np.testing.assert_allclose(fcm.mu, referenceStep(x, mu), rtol=1e-9, atol=1e-12)
+        fcm.c = [x[0], x[1]]
+        self.assertAlmostEqual(fcm.membership()[0, 0], 1.)
+
+    def test_exact_centroid(self):
+        fcm = FuzzyCMeans([[0.], [1.], [2.]], [[1., 0.], [.5, .5], [0., 1.]])
+        fcm.c = [[0.], [2.]]
+        mu = fcm.membership()
+        self.assertFalse(np.isnan(mu).any())
+        np.testing.assert_allclose(mu, [[1., 0.], [.5, .5], [0., 1.]])
+
+    def test_weights(self):
+        x = np.round(self.x, 0)
+        values, counts = np.unique(x, axis=0, return_counts=True)
+        full = FuzzyCMeans(x, np.zeros((len(x), 3)))
+        weighted = FuzzyCMeans(values, np.zeros((len(values), 3)), weights=counts)
+        full.c = weighted.c = [[-1.], [5.], [11.]]
+        np.testing.assert_allclose(weighted.step(), full.step())
+        np.testing.assert_allclose(weighted.c, full.c)
+
+    def test_float32(self):
+        fcm64 = FuzzyCMeans(self.x, self.mu)
+        fcm32 = FuzzyCMeans(self.x, self.mu, dtype=np.float32)
+        fcm64(emax=1e-6, imax=50)
+        fcm32(emax=1e-6, imax=50)
+        self.assertEqual(fcm32.mu.dtype, np.float32)
+        np.testing.assert_allclose(np.sort(fcm32.c.ravel()), np.sort(fcm64.c.ravel()), atol=1e-3)
+
+    def test_membershipDegrees(self):
+        # squared distances 1 and 4 give 4/5 and 1/5; an example on two centers belongs to them in equal parts
+        d = np.array([[1., 4.], [0., 0.], [0., 9.]])
+        np.testing.assert_allclose(membershipDegrees(d, 2.), [[.8, .2], [.5, .5], [1., 0.]])
+        minibatch = MiniBatchFuzzyCMeans(clusters=2)
+        minibatch.c = np.array([[0.], [3.]])
+        np.testing.assert_allclose(minibatch.memberships(np.array([[1.], [3.]])), [[.8, .2], [0., 1.]])
+
+    def test_minibatch(self):
+        fcm = FuzzyCMeans(self.x, self.mu)
+        fcm(emax=1e-8, imax=200)
+        minibatch = MiniBatchFuzzyCMeans(clusters=3, batchSize=50, seed=1)
+        c = minibatch(lambda: (self.x[i:i + 70, 0] for i in range(0, len(self.x), 70)), emax=1e-6, imax=200)
+        np.testing.assert_allclose(np.sort(c.ravel()), np.sort(fcm.c.ravel()), atol=0.05)
+        np.testing.assert_array_equal(minibatch.bounds, (self.x.min(axis=0), self.x.max(axis=0)))
+
+    def test_histogram(self):
+        rng = np.random.RandomState(11)
+        x = np.concatenate([rng.normal(0., 1., 5000), rng.normal(6., 2., 5000), rng.normal(15., 1., 2000)])[:, None]
+        exact = np.array(FuzzyClustering(x, clusters=3, seeding="quantile")(maxError=1e-9, maxIter=500))
+        # the distinct values weighted by their multiplicities give the centroids of the exact clustering
+        unique = FuzzyClustering(np.round(x, 1), clusters=3, seeding="quantile", mode="unique")
+        rounded = np.array(FuzzyClustering(np.round(x, 1), clusters=3, seeding="quantile")(maxError=1e-9,
+                                                                                           maxIter=500))
+        np.testing.assert_allclose(unique(maxError=1e-9, maxIter=500), rounded, atol=1e-6)
+        self.assertLess(unique.tolerance, 1e-6)
+        for binning in ("width", "quantile"):
+            histogram = FuzzyClustering(x, clusters=3, seeding="quantile", mode="histogram", bins=200,
+                                        binning=binning)
+            centroids = np.array(histogram(maxError=1e-9, maxIter=500))
+            self.assertLessEqual(len(histogram._trainingSet), 200)
+            # the binned centroids are within the width of a bin of the exact ones, and so is their tolerance
+            width = (x.max() - x.min()) / 200
+            np.testing.assert_allclose(centroids, exact, atol=width)
+            self.assertLess(histogram.tolerance, width)
+
+    def test_seeding(self):
+        c = kmeansPlusPlus(self.x, 3, np.random.RandomState(3))
+        np.testing.assert_array_equal(c, kmeansPlusPlus(self.x, 3, np.random.RandomState(3)))
+        self.assertTrue(all(value in self.x for value in c.ravel()))
+        np.testing.assert_array_equal(quantilePrototypes(np.arange(10.).reshape(-1, 1), 2), [[2.], [7.]])
+        x = np.concatenate([self.x, self.x[:300] + 20.])
+        fcm = FuzzyCMeans(x, np.concatenate([self.mu, self.mu[:300]]))
+        fcm(emax=1e-8, imax=200)
+        seeded = FuzzyCMeans(x, None, centers=quantilePrototypes(x, 3))
+        seeded(emax=1e-8, imax=200)
+        np.testing.assert_allclose(np.sort(seeded.c.ravel()), np.sort(fcm.c.ravel()), atol=1e-3)
+        self.assertGreater(seeded.iterations, 0)
+        self.assertAlmostEqual(seeded.objective, fcm.objective, delta=1e-3 * fcm.objective)
+
+    def test_restarts(self):
+        serial = FuzzyClustering(self.x, clusters=3, seed=5)
+        centroids = serial(restarts=3)
+        parallel = FuzzyClustering(self.x, clusters=3, seed=5)
+        self.assertEqual(parallel(restarts=3, workers=2), centroids)
+        self.assertEqual(parallel.objectives, serial.objectives)
+        self.assertEqual(serial.objective, min(serial.objectives))
+        single = FuzzyClustering(self.x, clusters=3, seed=5)
+        single()
+        self.assertEqual(single.objective, serial.objectives[0])
+
+    def test_validity(self):
+        indices = validityIndices([[0.], [0.], [4.]], [[0.], [4.]])
+        self.assertEqual((indices["pc"], indices["pe"], indices["xb"]), (1., 0., 0.))
+        x = np.concatenate([self.x, self.x[:300] + 20.])
+        tables = []
+        for workers in (1, 2):
+            recommended, table = FuzzyClustering(x, seed=5).validity((2, 5), workers=workers)
+            self.assertEqual(recommended, 3)
+            self.assertEqual([row["clusters"] for row in table], [2, 3, 4, 5])
+            tables.append(table)
+        # the number of workers does not change the result, with the restarts of the smallest number of clusters
+        self.assertEqual(tables[0], tables[1])
+        tables = [FuzzyClustering(x, seed=5, seeding="kmeans++").validity((2, 4), restarts=3, workers=workers)
+                  for workers in (1, 2)]
+        self.assertEqual(tables[0], tables[1])
+        # the presorted quantiles and the binary search of the farthest value match the plain computations
+        order = np.sort(x[:, 0]).reshape(-1, 1)
+        np.testing.assert_array_equal(quantilePrototypes(order, 4, presorted=True), quantilePrototypes(x, 4))
+        centroids = np.array([[1.], [4.], [9.]])
+        np.testing.assert_array_equal(_farthestFirst(x, None, centroids),
+                                      _farthestFirst(np.hstack([x, np.zeros_like(x)]), None,
+                                                     np.hstack([centroids, np.zeros_like(centroids)]))[:, :1])
+
+    def test_acceleration(self):
+        # two blobs in three clusters: the plain updates creep toward the optimum
+        x, mu = self.x, self.mu
+        plain = FuzzyCMeans(x, mu)
+        plain(imax=500, ctol=1e-8)
+        for acceleration in ("overrelaxation", "anderson"):
+            accelerated = FuzzyCMeans(x, mu)
+            accelerated(imax=500, ctol=1e-8, acceleration=acceleration)
+            np.testing.assert_allclose(np.sort(accelerated.c.ravel()), np.sort(plain.c.ravel()), atol=1e-6)
+            self.assertLess(accelerated.iterations, plain.iterations)
+            np.testing.assert_allclose(accelerated.mu.sum(axis=1), 1.)
+        # without ctol and otol the centers are tested with emax
+        accelerated = FuzzyCMeans(x, mu)
+        accelerated(imax=100, acceleration="anderson")
+        self.assertGreater(accelerated.iterations, 1)
+        np.testing.assert_allclose(np.sort(accelerated.c.ravel()), np.sort(plain.c.ravel()), atol=1e-6)
+
+    def test_threads(self):
+        # shards of 100 examples, one per thread, against a single thread on chunks of the same size
+        serial = FuzzyCMeans(self.x, self.mu, chunk=100, weights=np.arange(len(self.x)) % 3 + 1.)
+        threaded = FuzzyCMeans(self.x, self.mu, chunk=100, weights=np.arange(len(self.x)) % 3 + 1., workers=4)
+        self.assertEqual(threaded.workers, 4)
+        serial(imax=50)
+        threaded(imax=50)
+        threaded.close()
+        np.testing.assert_allclose(threaded.c, serial.c, atol=1e-10)
+        np.testing.assert_allclose(threaded.mu, serial.mu, atol=1e-10)
+        self.assertAlmostEqual(threaded.objective, serial.objective)
+        self.assertEqual(threaded.iterations, serial.iterations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+from FuzzyGranulation import FuzzyGranulation
+from FuzzyQuantification import FuzzyQuantification, SigmaCount
+
+
+class TestFuzzyGranulation(unittest.TestCase):
+    def setUp(self):
+        self.x = np.random.RandomState(0).uniform(0., 10., 1000)
+        self.chunks = lambda: (self.x[i:i + 128] for i in range(0, len(self.x), 128))
+        self.labels = ["Low", "Mid", "High"]
+
+    def test_bounds(self):
+        self.assertEqual(FuzzyGranulation.bounds(self.chunks()), (self.x.min(), self.x.max()))
+        self.assertRaises(Exception, FuzzyGranulation.bounds, iter([]))
+
+    def test_stream(self):
+        whole = FuzzyGranulation(self.x, [2., 5., 8.], self.labels)
+        memberships = whole()
+        streamed = FuzzyGranulation(None, [2., 5., 8.], self.labels, FuzzyGranulation.bounds(self.chunks()))
+        sigmaCount, chunks = SigmaCount(len(self.labels)), []
+        self.assertEqual(streamed.stream(self.chunks(), sigmaCount,
+                                         lambda chunk, ms: chunks.append((ms.index, ms.left, ms.right))), len(self.x))
+        for expected, parts in zip((memberships.index, memberships.left, memberships.right), zip(*chunks)):
+            np.testing.assert_array_equal(np.concatenate(parts), expected)
+        np.testing.assert_allclose(sigmaCount.sums, memberships.sums())
+        quantifiers = ["Few", "Some", "Most"]
+        expected = FuzzyQuantification([.1, .5, .9], quantifiers, memberships, self.labels)()
+        quantification = FuzzyQuantification([.1, .5, .9], quantifiers, sigmaCount, self.labels)()
+        for label in self.labels:
+            for quantifier in quantifiers:
+                self.assertAlmostEqual(quantification[label][quantifier], expected[label][quantifier])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pickle
+import unittest
+
+import numpy as np
+
+from utils import IdentifierDictionary, PairResult
+
+
+class TestIdentifierDictionary(unittest.TestCase):
+    def test_encode(self):
+        dictionary = IdentifierDictionary()
+        codes = dictionary.encode(["urn:o#h1", "urn:o#h2", "urn:o#h1", "h3", None])
+        self.assertEqual(codes.tolist(), [0, 1, 0, 2, 3])
+        self.assertEqual(dictionary.decode(codes), ["h1", "h2", "h1", "h3", ""])
+        self.assertEqual(dictionary.encode(["urn:o#h1"], strip=False).tolist(), [4])
+        self.assertEqual(dictionary.code("h2"), 1)
+        self.assertEqual(dictionary.code("h9"), -1)
+        self.assertEqual(len(dictionary), 5)
+
+    def test_merge(self):
+        first = IdentifierDictionary(["h1", "h2", "h3"])
+        second = IdentifierDictionary(["h3", "h4", "h1"])
+        codes = first.merge(second)
+        # the shared names keep their codes, the new ones are appended
+        self.assertEqual(codes.tolist(), [2, 3, 0])
+        self.assertEqual(first.names, ["h1", "h2", "h3", "h4"])
+        self.assertEqual(first.decode(codes), second.names)
+
+    def test_subset(self):
+        dictionary = IdentifierDictionary(["h1", "h2", "h3", "h4", "h5"])
+        subset, columns = dictionary.subset({"Hotel": np.array([4, 1, 4]), "City": np.array([2])})
+        self.assertEqual(subset.names, ["h2", "h3", "h5"])
+        self.assertEqual(subset.decode(columns["Hotel"]), ["h5", "h2", "h5"])
+        self.assertEqual(subset.decode(columns["City"]), ["h3"])
+        self.assertEqual(columns["Hotel"].dtype, np.int32)
+
+    def test_share(self):
+        shared = IdentifierDictionary(["h0"])
+        pairs = []
+        for names in (["h1", "h2", "h3"], ["h3", "h4", "h1"]):
+            pair = PairResult("Hotel", nameProperty="price")
+            pair.dictionary = IdentifierDictionary()
+            pair.fields = ["Hotel", "price"]
+            pair.identifiers = {"Hotel": pair.dictionary.encode(names)}
+            pair.values = np.arange(3.)
+            # the pair handed over by another process carries a dictionary of only its own individuals
+            pair = pickle.loads(pickle.dumps(pair))
+            pair.share(shared)
+            self.assertIs(pair.dictionary, shared)
+            self.assertEqual(pair.names("Hotel"), names)
+            pairs.append(pair)
+        self.assertEqual(shared.names, ["h0", "h1", "h2", "h3", "h4"])
+        self.assertEqual(pairs[0].identifiers["Hotel"][2], pairs[1].identifiers["Hotel"][0])
+        self.assertEqual(pairs[1].rows(), [{"Hotel": "h3", "price": 0.}, {"Hotel": "h4", "price": 1.},
+                                           {"Hotel": "h1", "price": 2.}])
+
+
+if __name__ == '__main__':
+    unittest.main()
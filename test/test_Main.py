@@ -0,0 +1,350 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from FuzzyQuantification import SigmaCount
+from OWLOntology import OWLIndex
+from utils import IdentifierDictionary, StageCache
+
+# the pipeline is the __main__ module of the package, so it is loaded from its file
+spec = importlib.util.spec_from_file_location("granulo", os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "__main__.py"))
+granulo = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(granulo)
+
+ONTOLOGY = "http://www.semanticweb.org/ontologies/Hotel.owl#"
+
+LABELS = ["Cheap", "Medium", "Expensive"]
+
+
+def uri(name):
+    return {"type": "uri", "value": ONTOLOGY + name}
+
+
+def literal(value):
+    return {"type": "literal", "value": str(value)}
+
+
+class BulkSPARQLHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in SPARQL end-point: it answers the bulk extraction queries with a
+    canned JSON result-set of the rows of some classes.
+    '''
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)["query"][0]
+        self.server.queries.append(query)
+        if "?rangeClass" in query:
+            bindings = [{"domainClass": uri(domainClass), "rangeClass": uri(rangeClass), "domain": uri(domain),
+                         "range": uri(range), "auxiliary": uri(auxiliary), "value": literal(value)}
+                        for domainClass, rangeClass, domain, range, auxiliary, value in self.server.ternary]
+        else:
+            bindings = [{"domainClass": uri(domainClass), "domain": uri(domain), "value": literal(value)}
+                        for domainClass, domain, value in self.server.binary]
+        variables = list(bindings[0].keys())
+        body = json.dumps({"head": {"vars": variables}, "results": {"bindings": bindings}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TSVSPARQLHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in SPARQL end-point: it answers the extraction queries sent by the
+    asyncio client with the TSV rows of the class of the query.
+    '''
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        query = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())["query"][0]
+        self.server.queries.append(query)
+        domainClass = query.split(" a ontology:")[1].split(".")[0]
+        body = ("?" + domainClass + "\t?Price\n" + "".join("<" + ONTOLOGY + domain + ">\t" + str(value) + "\n"
+                                                         for name, domain, value in self.server.binary
+                                                         if name == domainClass)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/tab-separated-values")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestBulkExtraction(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), BulkSPARQLHandler)
+        self.server.queries = []
+        self.server.binary = [("Hotel", "h1", 120), ("Motel", "m1", 40), ("Hotel", "h2", 80), ("Motel", "m2", 60),
+                              ("Hotel", "h3", 200)]
+        self.server.ternary = [("Hotel", "Rome", "h1", "rome", "o1", 3), ("Motel", "Rome", "m1", "rome", "o2", 1),
+                               ("Hotel", "Paris", "h2", "paris", "o3", 5), ("Hotel", "Rome", "h3", "rome", "o4", 4),
+                               ("Motel", "Paris", "m2", "paris", "o5", 2)]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.uri = "http://127.0.0.1:{0}/sparql".format(self.server.server_address[1])
+        self.settings = (granulo.Main._inMemory, granulo.Main._exportCSV, granulo.Main._identifiers)
+        granulo.Main._inMemory, granulo.Main._exportCSV = True, False
+        granulo.Main._identifiers = IdentifierDictionary()
+
+    def tearDown(self):
+        granulo.Main._inMemory, granulo.Main._exportCSV, granulo.Main._identifiers = self.settings
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_binary(self):
+        pairs = granulo.executeBulkQuery(self.uri, "<" + ONTOLOGY + ">", "hasPrice", ["Hotel", "Motel"],
+                                         objectProperty=["", ""])
+        self.assertEqual(len(self.server.queries), 1)
+        self.assertIn("VALUES ?domainClass { ontology:Hotel ontology:Motel }", self.server.queries[0])
+        self.assertEqual(sorted(pairs), [("Hotel", ""), ("Motel", "")])
+        hotels = pairs[("Hotel", "")]
+        self.assertEqual(hotels.fields, ["Hotel", "Price"])
+        self.assertEqual(hotels.names("Hotel"), ["h1", "h2", "h3"])
+        np.testing.assert_array_equal(hotels.values, [120., 80., 200.])
+        self.assertEqual(pairs[("Motel", "")].names("Motel"), ["m1", "m2"])
+        np.testing.assert_array_equal(pairs[("Motel", "")].values, [40., 60.])
+
+    def test_prefetch(self):
+        self.server.RequestHandlerClass = TSVSPARQLHandler
+        settings = (granulo.Main._resultFormat, granulo.Main._asyncConnections)
+        granulo.Main._resultFormat, granulo.Main._asyncConnections = "tsv", 2
+        try:
+            queries = [("query", granulo.extractionQuery("<" + ONTOLOGY + ">", "hasPrice", domainClass,
+                                                         objectProperty=["", ""]))
+                       for domainClass in ("Hotel", "Motel")]
+            granulo.prefetchQueries(self.uri, queries)
+            self.assertEqual(len(self.server.queries), 2)
+            # the prefetched rows are converted by the extraction, without sending the query again
+            hotels = granulo.executeQuery(self.uri, "<" + ONTOLOGY + ">", "hasPrice", "Hotel", objectProperty=["", ""])
+            self.assertEqual(len(self.server.queries), 2)
+            self.assertEqual(hotels.names("Hotel"), ["h1", "h2", "h3"])
+            np.testing.assert_array_equal(hotels.values, [120., 80., 200.])
+            self.assertEqual(list(granulo.Main._prefetched), [queries[1][1]])
+        finally:
+            granulo.Main._prefetched.clear()
+            granulo.Main._resultFormat, granulo.Main._asyncConnections = settings
+
+    def test_ternary(self):
+        pairs = granulo.executeBulkQuery(self.uri, "<" + ONTOLOGY + ">", "hasStars", ["Hotel", "Motel"],
+                                         ["Rome", "Paris"], "Offer", ["hasOffer", "inCity"], batchSize=2)
+        # the four combinations are listed two at a time
+        self.assertEqual(len(self.server.queries), 2)
+        self.assertIn("VALUES (?domainClass ?rangeClass) { (ontology:Hotel ontology:Rome) "
+                      "(ontology:Hotel ontology:Paris) }", self.server.queries[0])
+        self.assertEqual(len(pairs), 4)
+        rome = pairs[("Hotel", "Rome")]
+        self.assertEqual(rome.fields, ["Hotel", "Rome", "Offer", "Stars"])
+        self.assertEqual(rome.names("Offer"), ["o1", "o4"])
+        self.assertEqual(rome.names("Rome"), ["rome", "rome"])
+        np.testing.assert_array_equal(rome.values, [3., 4.])
+        self.assertEqual(pairs[("Hotel", "Paris")].names("Hotel"), ["h2"])
+        self.assertEqual(pairs[("Motel", "Rome")].names("Offer"), ["o2"])
+
+
+class TestPruning(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.WARNING)
+        cls.backend = granulo.Main._backend
+        granulo.Main._backend = OWLIndex(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      "Hotel.owl"))
+
+    @classmethod
+    def tearDownClass(cls):
+        granulo.Main._backend = cls.backend
+        logging.disable(logging.NOTSET)
+
+    def test_countQuery(self):
+        query = granulo.countQuery("<" + ONTOLOGY + ">", ["Hotel", "Square"])
+        self.assertIn("SELECT ?class (COUNT(?individual) AS ?individuals)", query)
+        self.assertIn("VALUES ?class { ontology:Hotel ontology:Square }", query)
+        self.assertTrue(query.endswith("GROUP BY ?class"))
+        # the estimate counts every class in a subquery of its own, up to the limit
+        query = granulo.countQuery("<" + ONTOLOGY + ">", ["Hotel", "Square"], 7)
+        self.assertEqual(query.count("LIMIT 7"), 2)
+        self.assertIn("(ontology:Square AS ?class)", query)
+        self.assertIn("} LIMIT 7 } UNION { SELECT", query)
+
+    def test_count(self):
+        counts = granulo.countIndividualsClasses("", "<" + ONTOLOGY + ">", ["Hotel", "Hotel_1_Star", "Nothing"])
+        self.assertEqual(counts, {"Hotel": 59, "Hotel_1_Star": 5, "Nothing": 0})
+        counts = granulo.countIndividualsClasses("", "<" + ONTOLOGY + ">", ["Hotel", "Hotel_1_Star", "Nothing"], 7)
+        self.assertEqual(counts, {"Hotel": 7, "Hotel_1_Star": 5, "Nothing": 0})
+
+    def test_pruning(self):
+        # the classes to remove are adjacent, so none of them is skipped while the list is scanned
+        classes = ["Hotel_1_Star", "Hotel_5_Stars", "Square", "Hotel_2_Stars", "Nothing", "Hotel_4_Stars"]
+        for estimate in (False, True):
+            self.assertEqual(granulo.pruning("", "<" + ONTOLOGY + ">", classes, 6, estimate),
+                             ["Hotel_2_Stars", "Hotel_4_Stars"])
+        self.assertEqual(classes, ["Hotel_1_Star", "Hotel_5_Stars", "Square", "Hotel_2_Stars", "Nothing",
+                                   "Hotel_4_Stars"])
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.WARNING)
+        self.directory = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        self.settings = {name: getattr(granulo.Main, name) for name in
+                         ("_time", "_inMemory", "_exportCSV", "_backend", "_identifiers", "_seed", "_cache")}
+        granulo.Main._backend = OWLIndex(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                      "Hotel.owl"))
+        granulo.Main._time = "test"
+        granulo.Main._seed = 1
+        os.chdir(self.directory)
+        os.makedirs("output/test/csv_files")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+        for name, value in self.settings.items():
+            setattr(granulo.Main, name, value)
+        logging.disable(logging.NOTSET)
+
+    def test_handover(self):
+        # the stages read the results of the previous ones from the csv files...
+        granulo.Main._inMemory, granulo.Main._exportCSV = False, True
+        granulo.Main._identifiers = IdentifierDictionary()
+        granulo.executeQuery("", "<" + ONTOLOGY + ">", "hasPrice", "Hotel", objectProperty=["", ""])
+        granulo.clustering(3, "hasPrice", "Hotel")
+        granulo.granulation(LABELS, "hasPrice", "Hotel")
+        read = granulo.readGranules("hasPrice", "Hotel")
+        files = sorted(os.listdir("output/test/csv_files"))
+        self.assertEqual(files, ["Hotel.csv", "HotelCentroids.csv", "HotelGranules.csv", "HotelPartition.csv"])
+        shutil.rmtree("output/test/csv_files")
+        os.makedirs("output/test/csv_files")
+
+        # ... or they are handed over in memory, without writing them
+        granulo.Main._inMemory, granulo.Main._exportCSV = True, False
+        granulo.Main._identifiers = IdentifierDictionary()
+        pair = granulo.executeQuery("", "<" + ONTOLOGY + ">", "hasPrice", "Hotel", objectProperty=["", ""])
+        granulo.clustering(3, "hasPrice", "Hotel", pair=pair)
+        handed = granulo.granulation(LABELS, "hasPrice", "Hotel", pair=pair)
+        self.assertIs(handed, pair)
+        self.assertEqual(os.listdir("output/test/csv_files"), [])
+        self.assertEqual(handed.names("Hotel"), read.names("Hotel"))
+        np.testing.assert_allclose(handed.values, read.values)
+        np.testing.assert_array_equal(handed.memberships.index, read.memberships.index)
+        np.testing.assert_allclose(handed.memberships.left, read.memberships.left)
+        np.testing.assert_allclose(handed.memberships.right, read.memberships.right)
+
+
+    def test_streamGranulation(self):
+        granulo.Main._inMemory, granulo.Main._exportCSV = True, False
+        granulo.Main._identifiers = IdentifierDictionary()
+        pair = granulo.executeQuery("", "<" + ONTOLOGY + ">", "hasPrice", "Hotel", objectProperty=["", ""])
+        granulo.clustering(3, "hasPrice", "Hotel", pair=pair)
+        exact = granulo.granulation(LABELS, "hasPrice", "Hotel", pair=pickle.loads(pickle.dumps(pair)))
+        exact = granulo.quantification(["Few", "Some", "Many"], [.1, .5, .9], "hasPrice", "Hotel", pair=exact)
+
+        # in "minibatch" mode the memberships are written and summed one batch at a time
+        mode, batchSize = granulo.Main._clusteringMode, granulo.Main._clusteringBatchSize
+        granulo.Main._clusteringMode, granulo.Main._clusteringBatchSize = "minibatch", 7
+        try:
+            streamed = granulo.granulation(LABELS, "hasPrice", "Hotel", pair=pair)
+            self.assertIsInstance(streamed.memberships, SigmaCount)
+            np.testing.assert_allclose(streamed.memberships.sums, exact.memberships.sums())
+            streamed = granulo.quantification(["Few", "Some", "Many"], [.1, .5, .9], "hasPrice", "Hotel",
+                                              pair=streamed)
+            self.assertEqual(streamed.cardinalities.keys(), exact.cardinalities.keys())
+            for granule, cardinality in exact.cardinalities.items():
+                self.assertAlmostEqual(streamed.cardinalities[granule], cardinality)
+            # the integration reads the memberships of the individuals back from the granules csv file
+            degrees = list(granulo.individualDegrees(streamed, "Hotel"))
+            self.assertEqual(len(degrees), 59)
+            for (name, degree), (expected, expectedDegree) in zip(degrees, granulo.individualDegrees(exact, "Hotel")):
+                self.assertEqual(name, expected)
+                np.testing.assert_allclose(degree, expectedDegree)
+            # so does the quantification, when the stages are not handed over in memory
+            granulo.Main._exportCSV = True
+            granulo.granulation(LABELS, "hasPrice", "Hotel", pair=pair)
+            read = granulo.readGranules("hasPrice", "Hotel")
+            np.testing.assert_allclose(read.memberships.sums, exact.memberships.sums())
+            self.assertEqual(read.memberships.elements, 59)
+        finally:
+            granulo.Main._clusteringMode, granulo.Main._clusteringBatchSize = mode, batchSize
+
+
+    def _cached(self, stage):
+        return len(os.listdir(os.path.join(self.directory, "cache", stage)))
+
+    def test_stageCache(self):
+        granulo.Main._inMemory, granulo.Main._exportCSV = True, False
+        granulo.Main._cache = StageCache(os.path.join(self.directory, "cache"))
+        pair = granulo.executeQuery("", "<" + ONTOLOGY + ">", "hasPrice", "Hotel", objectProperty=["", ""])
+        centroids = granulo.clustering(3, "hasPrice", "Hotel", pair=pair).centroids
+        granulo.granulation(LABELS, "hasPrice", "Hotel", pair=pair)
+        self.assertEqual((self._cached("query"), self._cached("clustering"), self._cached("granulation")), (1, 1, 1))
+
+        # a hit gives the same results without adding entries
+        cached = granulo.executeQuery("", "<" + ONTOLOGY + ">", "hasPrice", "Hotel", objectProperty=["", ""])
+        self.assertIsNot(cached, pair)
+        np.testing.assert_array_equal(cached.values, pair.values)
+        np.testing.assert_array_equal(granulo.clustering(3, "hasPrice", "Hotel", pair=cached).centroids, centroids)
+        memberships = granulo.granulation(LABELS, "hasPrice", "Hotel", pair=cached).memberships
+        np.testing.assert_array_equal(memberships.dense(), pair.memberships.dense())
+        self.assertEqual((self._cached("query"), self._cached("clustering"), self._cached("granulation")), (1, 1, 1))
+
+        # a change of the seed or of the mode invalidates the clustering, a change of the labels the granulation
+        granulo.Main._seed = 2
+        granulo.clustering(3, "hasPrice", "Hotel", pair=cached)
+        self.assertEqual(self._cached("clustering"), 2)
+        mode = granulo.Main._clusteringMode
+        try:
+            granulo.Main._clusteringMode = "histogram"
+            granulo.clustering(3, "hasPrice", "Hotel", pair=cached)
+        finally:
+            granulo.Main._clusteringMode = mode
+        self.assertEqual(self._cached("clustering"), 3)
+        granulo.granulation(["Low", "Medium", "High"], "hasPrice", "Hotel", pair=cached)
+        self.assertEqual(self._cached("granulation"), 2)
+
+    def test_digest(self):
+        pair = granulo.PairResult("Hotel", nameProperty="price")
+        pair.values = np.array([1., 2.])
+        key = StageCache.digest(pair)
+        pair.values = np.array([1., 3.])
+        self.assertNotEqual(StageCache.digest(pair), key)
+        self.assertNotEqual(StageCache.digest(np.array([1., 2.])), StageCache.digest(np.array([1., 2.], np.float32)))
+        self.assertNotEqual(StageCache.digest([1, [2, 3]]), StageCache.digest([[1, 2], 3]))
+        self.assertEqual(StageCache.digest((1, "a")), StageCache.digest((1, "a")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import logging
+import os
+import tempfile
+import unittest
+
+from OWLOntology import OWLIndex
+
+HOTEL = "http://www.semanticweb.org/ontologies/Hotel.owl#"
+
+SUBPROPERTIES = '''<?xml version="1.0"?>
+<Ontology xmlns="http://www.w3.org/2002/07/owl#" xml:base="urn:test" ontologyIRI="urn:test">
+    <Prefix name="t" IRI="urn:test#"/>
+    <SubDataPropertyOf>
+        <DataProperty abbreviatedIRI="t:hasNetPrice"/>
+        <DataProperty abbreviatedIRI="t:hasPrice"/>
+    </SubDataPropertyOf>
+    <SubDataPropertyOf>
+        <DataProperty abbreviatedIRI="t:hasListPrice"/>
+        <DataProperty abbreviatedIRI="t:hasPrice"/>
+    </SubDataPropertyOf>
+    <ClassAssertion>
+        <Class abbreviatedIRI="t:Hotel"/>
+        <NamedIndividual abbreviatedIRI="t:h1"/>
+    </ClassAssertion>
+    <DataPropertyAssertion>
+        <DataProperty abbreviatedIRI="t:hasPrice"/>
+        <NamedIndividual abbreviatedIRI="t:h1"/>
+        <Literal>50</Literal>
+    </DataPropertyAssertion>
+    <DataPropertyAssertion>
+        <DataProperty abbreviatedIRI="t:hasNetPrice"/>
+        <NamedIndividual abbreviatedIRI="t:h1"/>
+        <Literal>50</Literal>
+    </DataPropertyAssertion>
+    <DataPropertyAssertion>
+        <DataProperty abbreviatedIRI="t:hasListPrice"/>
+        <NamedIndividual abbreviatedIRI="t:h1"/>
+        <Literal>50</Literal>
+    </DataPropertyAssertion>
+    <DataPropertyAssertion>
+        <DataProperty abbreviatedIRI="t:hasListPrice"/>
+        <NamedIndividual abbreviatedIRI="t:h1"/>
+        <Literal>60</Literal>
+    </DataPropertyAssertion>
+</Ontology>
+'''
+
+
+class TestOWLIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.WARNING)
+        cls.index = OWLIndex(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Hotel.owl"))
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def test_count(self):
+        self.assertEqual(self.index.count([HOTEL + "Hotel", HOTEL + "Hotel_1_Star"]),
+                         {HOTEL + "Hotel": 59, HOTEL + "Hotel_1_Star": 5})
+
+    def test_binary(self):
+        self.assertEqual(len(self.index.binary(HOTEL + "Hotel_1_Star", HOTEL + "hasPrice")), 5)
+
+    def test_ternary(self):
+        rows = self.index.ternary(HOTEL + "Bed_and_Breakfast", HOTEL + "Square",
+                                  [HOTEL + "hasDistance", HOTEL + "isDistanceFor"], HOTEL + "hasValue")
+        self.assertEqual(len(rows), 56)
+        self.assertEqual(len(set(rows)), 56)
+
+    def test_subproperties(self):
+        # a value asserted on a property and on its subproperties is returned once
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "test.owl")
+            with open(filename, "w") as file:
+                file.write(SUBPROPERTIES)
+            index = OWLIndex(filename)
+        self.assertEqual(sorted(index.binary("urn:test#Hotel", "urn:test#hasPrice")),
+                         [("urn:test#h1", "50"), ("urn:test#h1", "60")])
+
+
+if __name__ == '__main__':
+    unittest.main()
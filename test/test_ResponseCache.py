@@ -0,0 +1,104 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from SPARQLEndpointInterface import ResponseCache
+
+ENDPOINT = "http://dbpedia.org/sparql"
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _filename(self, cache, statement):
+        return cache._filename(cache.key(ENDPOINT, statement, "json"))
+
+    def test_normalize(self):
+        cache = ResponseCache(self.directory)
+        cache.put(ENDPOINT, "SELECT ?x\n  WHERE { ?x ?p \"a  b\" }", "json", [1])
+        self.assertEqual(cache.get(ENDPOINT, "SELECT ?x WHERE { ?x ?p \"a  b\" }", "json"), [1])
+        self.assertIsNone(cache.get(ENDPOINT, "SELECT ?x WHERE { ?x ?p \"a b\" }", "json"))
+
+    def test_ttl(self):
+        cache = ResponseCache(self.directory, ttl=0.05)
+        cache.put(ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json", [1])
+        self.assertEqual(cache.get(ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json"), [1])
+        time.sleep(0.1)
+        self.assertIsNone(cache.get(ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json"))
+        # an expired response is still served in replay mode
+        replay = ResponseCache(self.directory, ttl=0.05, replay=True)
+        self.assertEqual(replay.get(ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json"), [1])
+
+    def test_eviction(self):
+        statements = ["SELECT ?x WHERE { ?x a <urn:C" + str(i) + "> }" for i in range(3)]
+        cache = ResponseCache(self.directory)
+        for i, statement in enumerate(statements):
+            cache.put(ENDPOINT, statement, "json", list(range(1000)))
+            os.utime(self._filename(cache, statement), (1000 + i, 1000 + i))
+        # the first response is the most recently used one
+        cache.get(ENDPOINT, statements[0], "json")
+        size = os.path.getsize(self._filename(cache, statements[0]))
+        cache = ResponseCache(self.directory, maxSize=int(3.5 * size))
+        cache.put(ENDPOINT, "SELECT ?x WHERE { ?x a <urn:D> }", "json", list(range(1000)))
+        self.assertEqual(cache.get(ENDPOINT, statements[0], "json"), list(range(1000)))
+        self.assertIsNone(cache.get(ENDPOINT, statements[1], "json"))
+        self.assertTrue(os.path.exists(self._filename(cache, statements[2])))
+
+    def test_size(self):
+        cache = ResponseCache(self.directory, maxSize=10 ** 6)
+        for _ in range(5):
+            cache.put(ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json", list(range(1000)))
+        # a response written again does not count twice
+        self.assertEqual(cache._size, sum(size for _, size, _ in cache._entries()))
+
+    def test_replay(self):
+        cache = ResponseCache(self.directory, replay=True)
+        cache.put(ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json", [1])
+        self.assertEqual(list(cache._entries()), [])
+        self.assertRaises(Exception, cache.get, ENDPOINT, "SELECT ?x WHERE { ?x ?p ?o }", "json")
+
+    def test_record(self):
+        cache = ResponseCache(self.directory)
+        rows = [("urn:a", "1"), ("urn:b", None)]
+        recorded = cache.record(ENDPOINT, "SELECT ?x ?y WHERE { ?x ?p ?y }", "tsv", ["x", "y"], iter(rows))
+        self.assertEqual(next(recorded), rows[0])
+        # nothing is stored until the result-set is read to its end
+        self.assertEqual(list(cache._entries()), [])
+        self.assertEqual(list(recorded), rows[1:])
+        self.assertEqual(cache.get(ENDPOINT, "SELECT ?x ?y WHERE { ?x ?p ?y }", "tsv"),
+                         {"fields": ["x", "y"], "rows": [["urn:a", "1"], ["urn:b", None]]})
+        abandoned = cache.record(ENDPOINT, "SELECT ?y WHERE { ?x ?p ?y }", "tsv", ["y"], iter([("1",), ("2",)]))
+        next(abandoned)
+        abandoned.close()
+        self.assertEqual(len(list(cache._entries())), 1)
+        self.assertEqual([name for _, _, names in os.walk(self.directory) for name in names
+                          if name.endswith(".tmp")], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
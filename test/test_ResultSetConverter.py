@@ -0,0 +1,77 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+from utils import IdentifierDictionary, ResultSetConverter
+
+ONTOLOGY = "http://www.semanticweb.org/ontologies/Hotel.owl#"
+
+RESULTSET = {"head": {"vars": ["hotel", "price"]},
+             "results": {"bindings": [{"hotel": {"type": "uri", "value": ONTOLOGY + "h1"},
+                                       "price": {"type": "literal", "value": "120.5"}},
+                                      {"hotel": {"type": "uri", "value": "urn:h2"}},
+                                      {"hotel": {"type": "uri", "value": ONTOLOGY + "h1"},
+                                       "price": {"type": "literal", "value": "80"}}]}}
+
+ROWS = [(ONTOLOGY + "h1", "120.5"), ("urn:h2", None), (ONTOLOGY + "h1", "80")]
+
+
+class TestResultSetConverter(unittest.TestCase):
+    def test_convertToColumns(self):
+        columns, keys = ResultSetConverter.convertToColumns(RESULTSET, ["price"])
+        self.assertEqual(keys, ["hotel", "price"])
+        self.assertEqual(columns["hotel"].tolist(), ["h1", "urn:h2", "h1"])
+        np.testing.assert_array_equal(columns["price"], [120.5, np.nan, 80.])
+        self.assertEqual(columns["price"].dtype, np.float64)
+
+    def test_convertRowsToColumns(self):
+        # the rows are converted in chunks, which give the same columns of the whole result-set
+        expected, _ = ResultSetConverter.convertToColumns(RESULTSET, ["price"])
+        columns, keys = ResultSetConverter.convertRowsToColumns(["hotel", "price"], iter(ROWS), ["price"],
+                                                                chunkSize=2)
+        self.assertEqual(keys, ["hotel", "price"])
+        self.assertEqual(columns["hotel"].tolist(), expected["hotel"].tolist())
+        np.testing.assert_array_equal(columns["price"], expected["price"])
+
+    def test_empty(self):
+        self.assertEqual(ResultSetConverter.convertRowsToColumns(["hotel"], iter([])), ({}, []))
+        self.assertEqual(ResultSetConverter.convertToColumns({"head": {"vars": ["hotel"]},
+                                                              "results": {"bindings": []}}), ({}, []))
+
+    def test_column(self):
+        dictionary = IdentifierDictionary()
+        codes = ResultSetConverter._column([ONTOLOGY + "h1", "urn:h2", ONTOLOGY + "h1", None], False, dictionary)
+        self.assertEqual(codes.dtype, np.int32)
+        self.assertEqual(codes.tolist(), [0, 1, 0, 2])
+        self.assertEqual(dictionary.decode(codes), ["h1", "urn:h2", "h1", ""])
+        self.assertEqual(ResultSetConverter._column(["1", None], True).tolist()[0], 1.)
+        self.assertEqual(ResultSetConverter._column([None, "a#b"], False).tolist(), ["", "b"])
+
+    def test_dictionary(self):
+        dictionary = IdentifierDictionary()
+        columns, _ = ResultSetConverter.convertRowsToColumns(["hotel", "price"], iter(ROWS), ["price"], dictionary)
+        self.assertEqual(dictionary.decode(columns["hotel"]), ["h1", "urn:h2", "h1"])
+        self.assertEqual(dictionary.code("h1"), columns["hotel"][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import gzip
+import io
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from SPARQLEndpointInterface import SPARQLEndpointInterface
+
+TSV = '?x\t?label\t?price\n' \
+      '<urn:a>\t"Grand \\"Hotel\\"\\tRome"@en\t"120.5"^^<http://www.w3.org/2001/XMLSchema#decimal>\n' \
+      '<urn:b>\t\t42\n'
+
+CSV = 'x,label,price\r\n' \
+      'urn:a,"Grand ""Hotel"", Rome",120.5\r\n' \
+      'urn:b,,42\r\n'
+
+
+class TSVSPARQLHandler(BaseHTTPRequestHandler):
+    '''
+    Stand-in SPARQL end-point: it answers every query with a canned TSV
+    result-set, gzip compressed.
+    '''
+
+    def do_GET(self):
+        body = gzip.compress(TSV.encode())
+        self.send_response(200)
+        self.send_header("Content-Type", "text/tab-separated-values; charset=utf-8")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSPARQLEndpointInterface(unittest.TestCase):
+    def test_term(self):
+        self.assertIsNone(SPARQLEndpointInterface._term(""))
+        self.assertEqual(SPARQLEndpointInterface._term("<urn:a>"), "urn:a")
+        self.assertEqual(SPARQLEndpointInterface._term('"42"^^<http://www.w3.org/2001/XMLSchema#integer>'), "42")
+        self.assertEqual(SPARQLEndpointInterface._term('"Rome"@it'), "Rome")
+        self.assertEqual(SPARQLEndpointInterface._term('"a\\\\b\\nc"'), "a\\b\nc")
+        self.assertEqual(SPARQLEndpointInterface._term("42"), "42")
+
+    def test_readTSV(self):
+        fields, rows = SPARQLEndpointInterface._readTSV(io.StringIO(TSV))
+        self.assertEqual(fields, ["x", "label", "price"])
+        self.assertEqual(list(rows), [("urn:a", 'Grand "Hotel"\tRome', "120.5"), ("urn:b", None, "42")])
+
+    def test_readCSV(self):
+        fields, rows = SPARQLEndpointInterface._readCSV(io.StringIO(CSV, newline=""))
+        self.assertEqual(fields, ["x", "label", "price"])
+        self.assertEqual(list(rows), [("urn:a", 'Grand "Hotel", Rome', "120.5"), ("urn:b", None, "42")])
+
+    def test_readJSON(self):
+        resultset = {"head": {"vars": ["x", "price"]},
+                     "results": {"bindings": [{"x": {"type": "uri", "value": "urn:a"},
+                                               "price": {"type": "literal", "value": "120.5"}},
+                                              {"x": {"type": "uri", "value": "urn:b"}}]}}
+        fields, rows = SPARQLEndpointInterface._readJSON(io.StringIO(json.dumps(resultset)))
+        self.assertEqual(fields, ["x", "price"])
+        self.assertEqual(list(rows), [("urn:a", "120.5"), ("urn:b", None)])
+
+    def test_stream(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), TSVSPARQLHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            uri = "http://127.0.0.1:{0}/sparql".format(server.server_address[1])
+            fields, rows = SPARQLEndpointInterface(uri).stream("SELECT ?x ?label ?price WHERE { ?x ?p ?price }")
+            self.assertEqual(fields, ["x", "label", "price"])
+            self.assertEqual(list(rows), [("urn:a", 'Grand "Hotel"\tRome', "120.5"), ("urn:b", None, "42")])
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestPagination(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def _offsetPage(self, rows, latency):
+        def page(size, offset):
+            self.calls.append((size, offset))
+            return ["x"], rows[offset:offset + size], latency
+        return page
+
+    def _keysetPage(self, rows):
+        def page(size, last):
+            self.calls.append((size, last))
+            return ["key", "value"], [row for row in rows if last is None or row[0] > last][:size], 0.
+        return page
+
+    def test_adapt(self):
+        self.assertEqual(SPARQLEndpointInterface._adapt(1000, 1., 2.), 2000)
+        self.assertEqual(SPARQLEndpointInterface._adapt(1000, 10., 2.), 500)
+        self.assertEqual(SPARQLEndpointInterface._adapt(1000, 1.5, 2.), 1333)
+        self.assertEqual(SPARQLEndpointInterface._adapt(150, 10., 2.), 100)
+        self.assertEqual(SPARQLEndpointInterface._adapt(800000, 0., 2.), 1000000)
+
+    def test_offsetPages(self):
+        rows = [(str(i),) for i in range(2350)]
+        page = self._offsetPage(rows, 1.)
+        interface = SPARQLEndpointInterface("urn:endpoint")
+        pages = interface._offsetPages(page, rows[:500], 1., 500, 2, 1.)
+        self.assertEqual(list(pages), rows)
+        # the pages follow each other up to the short last one (the one in flight after it may be cancelled)
+        self.assertEqual(sorted(self.calls)[:4], [(500, 500), (500, 1000), (500, 1500), (500, 2000)])
+        self.assertIn(sorted(self.calls)[4:], [[], [(500, 2500)]])
+
+    def test_offsetPages_short(self):
+        page = self._offsetPage([], 1.)
+        interface = SPARQLEndpointInterface("urn:endpoint")
+        self.assertEqual(list(interface._offsetPages(page, [("0",), ("1",)], 1., 500, 2, 1.)), [("0",), ("1",)])
+        self.assertEqual(self.calls, [])
+
+    def test_offsetPages_adaptive(self):
+        rows = [(str(i),) for i in range(1000)]
+        # the pages take twice the target latency, so every new page is half of the previous one
+        page = self._offsetPage(rows, 2.)
+        interface = SPARQLEndpointInterface("urn:endpoint")
+        self.assertEqual(list(interface._offsetPages(page, rows[:400], 2., 400, 1, 1.)), rows)
+        self.assertEqual(self.calls, [(200, 400), (100, 600), (100, 700), (100, 800), (100, 900), (100, 1000)])
+
+    def test_keysetPages(self):
+        rows = sorted([("a", str(i)) for i in range(3)] + [("b", str(i)) for i in range(7)] +
+                      [("c", str(i)) for i in range(2)] + [("d", "0")])
+        page = self._keysetPage(rows)
+        interface = SPARQLEndpointInterface("urn:endpoint")
+        fields, first, _ = page(4, None)
+        self.assertEqual(list(interface._keysetPages(page, fields.index("key"), first, 4)), rows)
+        # the rows of "b" do not fit in a page, so the page is enlarged until they do
+        self.assertEqual(self.calls, [(4, None), (4, "a"), (8, "a"), (4, "b")])
+
+    def test_keyFilter(self):
+        self.assertEqual(SPARQLEndpointInterface._keyFilter("x", None), "")
+        self.assertEqual(SPARQLEndpointInterface._keyFilter("x", 'say "a\\b"'),
+                         ' FILTER(STR(?x) > "say \\"a\\\\b\\"") ')
+
+    def test_paginate(self):
+        rows = [(str(i),) for i in range(250)]
+        queries = []
+
+        def page(uri, query, resultFormat):
+            queries.append(query)
+            limit, offset = [int(value) for value in query.split("LIMIT ")[1].split(" OFFSET ")]
+            return ["x"], rows[offset:offset + limit], 1.
+
+        original = SPARQLEndpointInterface._page
+        SPARQLEndpointInterface._page = staticmethod(page)
+        try:
+            interface = SPARQLEndpointInterface("urn:endpoint")
+            fields, paginated = interface.paginate("SELECT ?x WHERE { ?x ?p ?o }", ["x"], pageSize=100, inFlight=1,
+                                                   targetLatency=1.)
+            self.assertEqual((fields, list(paginated)), (["x"], rows))
+        finally:
+            SPARQLEndpointInterface._page = original
+        self.assertEqual(queries, ["SELECT ?x WHERE { ?x ?p ?o } ORDER BY ?x LIMIT 100 OFFSET " + str(offset)
+                                   for offset in (0, 100, 200)])
+
+
+if __name__ == '__main__':
+    unittest.main()
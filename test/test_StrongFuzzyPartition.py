@@ -0,0 +1,68 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+
+from FuzzyQuantification import FuzzyQuantification
+from StrongFuzzyPartition import StrongFuzzyPartition
+
+
+class TestStrongFuzzyPartition(unittest.TestCase):
+    def setUp(self):
+        self.sfp = StrongFuzzyPartition([1., 4., 5., 9.], ["A", "B", "C", "D"], (0., 10.))
+
+    def test_memberships(self):
+        # the prototypes, the points between them and the points beyond the domain
+        x = np.concatenate([[-3., 0., 1., 4., 5., 9., 10., 12.], np.linspace(0., 10., 101)])
+        expected = [[degree for _, degree in self.sfp.membership(value)] for value in x]
+        matrix = self.sfp.memberships(x)
+        np.testing.assert_allclose(matrix, expected, atol=1e-12)
+        np.testing.assert_allclose(matrix.sum(axis=1), 1.)
+
+    def test_segments(self):
+        index, left, right = self.sfp.segments([0., 2.5, 4., 7., 9., 11.])
+        np.testing.assert_array_equal(index, [0, 0, 1, 2, 2, 2])
+        np.testing.assert_allclose(left, [1., .5, 1., .5, 0., 0.])
+        np.testing.assert_allclose(right, [0., .5, 0., .5, 1., 1.])
+
+    def test_sparse(self):
+        x = np.linspace(-1., 11., 49)
+        sparse = self.sfp.sparse(x)
+        dense = self.sfp.memberships(x)
+        np.testing.assert_allclose(sparse.sums(), dense.sum(axis=0))
+        for row, degrees in zip(dense, sparse.degrees()):
+            self.assertEqual([k for k, _ in degrees], np.flatnonzero(row).tolist())
+            np.testing.assert_allclose([degree for _, degree in degrees], row[row > 0])
+
+    def test_quantification(self):
+        x = np.linspace(0., 10., 31)
+        labels, quantifiers = ["A", "B", "C", "D"], ["Few", "Some", "Most"]
+        sparse = FuzzyQuantification([.1, .5, .9], quantifiers, self.sfp.sparse(x), labels)
+        dense = FuzzyQuantification([.1, .5, .9], quantifiers, self.sfp.memberships(x), labels)
+        quantification, expected = sparse(), dense()
+        for label in labels:
+            self.assertAlmostEqual(sparse.cardinalities[label], dense.cardinalities[label])
+            for quantifier, degree in expected[label].items():
+                self.assertAlmostEqual(quantification[label][quantifier], degree)
+
+
+if __name__ == '__main__':
+    unittest.main()
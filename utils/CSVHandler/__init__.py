@@ -92,6 +92,45 @@ class CSVHandler(object):
         except:
             raise
 
+    def append(self, dataset):
+        '''
+        This function appends data from dataset parameter to the csv file,
+        so that a file can be written one chunk of rows at a time.
+
+        :Parameters:
+        dataset: matrix of the data to append.
+
+        '''
+        with open(self.filename, "a", newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=",")
+            for row in dataset:
+                writer.writerow(row)
+
+    def readDictChunks(self, chunkSize=0):
+        '''
+        This function reads from the csv one chunk of rows at a time, like
+        readDict, so that only a chunk of rows is held in memory.
+
+        :Parameters:
+        chunkSize: number of rows of a chunk (0 to read all the rows in a
+                   single chunk).
+
+        :Returns:
+        the iterator of the chunks; every chunk is a list where each row is
+        a dictionary that represents the csv file row.
+
+        '''
+        with open(self.filename, "r") as csvfile:
+            reader = csv.DictReader(csvfile)
+            chunk = []
+            for row in reader:
+                chunk.append(row)
+                if len(chunk) == chunkSize:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
     def writeDict(self, dataset, dictkeys):
         '''
         This function writes data from dataset parameter to the csv file.
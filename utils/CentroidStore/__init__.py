@@ -0,0 +1,118 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import os
+import shutil
+
+from ..StageCache import StageCache
+
+
+class CentroidStore(object):
+    '''
+    This class keeps the centroids of the last successful run for every
+    (class, property, number of clusters) key, so that the clustering of a
+    run can start from them. The centroids of a run are written aside and
+    they replace the stored ones only when the run is committed, so that a
+    failed run leaves the store unchanged.
+    '''
+
+    def __init__(self, directory, run):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        directory: the directory where the centroids are stored.
+        run: the name of the current run.
+
+        '''
+        self.directory = directory
+        self.run = run
+
+    @staticmethod
+    def key(*inputs):
+        '''
+        This function creates the key of some centroids.
+
+        :Parameters:
+        inputs: the class, the property and the number of clusters.
+
+        :Returns:
+        the key of the centroids.
+
+        '''
+        return StageCache.digest(("centroids",) + inputs)
+
+    def get(self, key):
+        '''
+        This function reads the centroids of the last successful run.
+
+        :Parameters:
+        key: the key of the centroids.
+
+        :Returns:
+        the list of the centroids, or None if they are missing.
+
+        '''
+        try:
+            with open(os.path.join(self.directory, "current", key + ".json")) as file:
+                return json.load(file)["centroids"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put(self, key, centroids, description=""):
+        '''
+        This function writes the centroids of the current run aside.
+
+        :Parameters:
+        key: the key of the centroids.
+        centroids: the list of the centroids.
+        description: a readable description of the key.
+
+        '''
+        directory = os.path.join(self.directory, "pending", self.run)
+        os.makedirs(directory, exist_ok=True)
+        filename = os.path.join(directory, key + ".json")
+        temporary = filename + "." + str(os.getpid()) + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump({"key": description, "run": self.run, "centroids": centroids}, file)
+        os.replace(temporary, filename)
+
+    def commit(self):
+        '''
+        This function replaces the stored centroids with the ones of the
+        current run.
+
+        '''
+        pending = os.path.join(self.directory, "pending", self.run)
+        if not os.path.isdir(pending):
+            return
+        current = os.path.join(self.directory, "current")
+        os.makedirs(current, exist_ok=True)
+        for filename in os.listdir(pending):
+            if filename.endswith(".json"):
+                os.replace(os.path.join(pending, filename), os.path.join(current, filename))
+        shutil.rmtree(pending, ignore_errors=True)
+
+    def discard(self):
+        '''
+        This function removes the centroids of the current run.
+
+        '''
+        shutil.rmtree(os.path.join(self.directory, "pending", self.run), ignore_errors=True)
@@ -39,6 +39,37 @@ class ConsistencyCheck(object):
         self.fuzzysetlabels = data["fuzzySetsLabels"]
         self.quantifierslabels = data["quantifiersLabels"]
         self.quantifiersprototypes = data["quantifiersPrototypes"]
+        self.workers = data.get("workers", 1)
+        self.inmemorypipeline = data.get("inMemoryPipeline", False)
+        self.exportcsv = data.get("exportCSV", True)
+        self.seed = data.get("seed")
+        self.stagecache = data.get("stageCache", "")
+        self.bulkextraction = data.get("bulkExtraction", False)
+        self.bulkbatchsize = data.get("bulkBatchSize", 0)
+        self.pruningestimate = data.get("pruningEstimate", False)
+        self.resultformat = data.get("resultFormat", "")
+        self.pagesize = data.get("pageSize", 0)
+        self.pagesinflight = data.get("pagesInFlight", 4)
+        self.keysetpagination = data.get("keysetPagination", False)
+        self.asyncconnections = data.get("asyncConnections", 0)
+        self.responsecache = data.get("responseCache", "")
+        self.responsecachettl = data.get("responseCacheTTL", 0)
+        self.responsecachesize = data.get("responseCacheSize", 0)
+        self.replay = data.get("replay", False)
+        self.querybackend = data.get("queryBackend", "sparql")
+        self.clusteringprecision = data.get("clusteringPrecision", "float64")
+        self.clusteringmode = data.get("clusteringMode", "exact")
+        self.clusteringbins = data.get("clusteringBins", 1000)
+        self.clusteringbinning = data.get("clusteringBinning", "width")
+        self.clusteringbatchsize = data.get("clusteringBatchSize", 65536)
+        self.clusteringseeding = data.get("clusteringSeeding", "random")
+        self.clusteringrestarts = data.get("clusteringRestarts", 1)
+        self.clusteringworkers = data.get("clusteringWorkers", 1)
+        self.clusterrange = data.get("clusterRange")
+        self.clusteringacceleration = data.get("clusteringAcceleration")
+        self.clusteringstopping = data.get("clusteringStopping", "membership")
+        self.clusteringthreads = data.get("clusteringThreads", 1)
+        self.centroidstore = data.get("centroidStore", "")
 
     def __call__(self):
         if (self.sparqlendpoint != "" and self.ontologyprefix != "" and self.ontologyname != "" and
@@ -71,13 +102,121 @@ class ConsistencyCheck(object):
             if not ConsistencyCheck.checkname(self.objectpropertyfromauxiliaryclass):
                 logging.warning("'objectPropertyFromAuxiliaryClass' syntax is wrong.")
                 checked = False
-            if not ConsistencyCheck.checkname(self.datapropertytofuzzify):
+            if isinstance(self.datapropertytofuzzify, list):
+                if len(self.datapropertytofuzzify) < 2 or \
+                        len(set(self.datapropertytofuzzify)) != len(self.datapropertytofuzzify):
+                    logging.warning("'dataPropertyToFuzzify' must be a name or a list of at least two different "
+                                    "names.")
+                    checked = False
+                elif not ConsistencyCheck.checklistnames(self.datapropertytofuzzify):
+                    checked = False
+            elif not ConsistencyCheck.checkname(self.datapropertytofuzzify):
                 logging.warning("'dataPropertyToFuzzify' syntax is wrong.")
                 checked = False
             if not ConsistencyCheck.checkfuzzysetlabels(self):
                 checked = False
             if not ConsistencyCheck.checkquantifiers(self):
                 checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.workers):
+                logging.warning("'workers' must be an integer > 0.")
+                checked = False
+            if not isinstance(self.inmemorypipeline, bool):
+                logging.warning("'inMemoryPipeline' must be true or false.")
+                checked = False
+            if not isinstance(self.exportcsv, bool):
+                logging.warning("'exportCSV' must be true or false.")
+                checked = False
+            if self.seed is not None and not (isinstance(self.seed, int) and not isinstance(self.seed, bool)):
+                logging.warning("'seed' must be an integer.")
+                checked = False
+            if not isinstance(self.stagecache, str):
+                logging.warning("'stageCache' must be the path of a directory.")
+                checked = False
+            if not isinstance(self.bulkextraction, bool):
+                logging.warning("'bulkExtraction' must be true or false.")
+                checked = False
+            if not (self.bulkbatchsize == 0 or ConsistencyCheck.checkpositiveinteger(self.bulkbatchsize)):
+                logging.warning("'bulkBatchSize' must be an integer >= 0.")
+                checked = False
+            if not isinstance(self.pruningestimate, bool):
+                logging.warning("'pruningEstimate' must be true or false.")
+                checked = False
+            if self.resultformat not in ["", "tsv", "csv", "json"]:
+                logging.warning("'resultFormat' must be \"tsv\", \"csv\" or \"json\".")
+                checked = False
+            if not (self.pagesize == 0 or ConsistencyCheck.checkpositiveinteger(self.pagesize)):
+                logging.warning("'pageSize' must be an integer >= 0.")
+                checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.pagesinflight):
+                logging.warning("'pagesInFlight' must be an integer > 0.")
+                checked = False
+            if not isinstance(self.keysetpagination, bool):
+                logging.warning("'keysetPagination' must be true or false.")
+                checked = False
+            if not (self.asyncconnections == 0 or ConsistencyCheck.checkpositiveinteger(self.asyncconnections)):
+                logging.warning("'asyncConnections' must be an integer >= 0.")
+                checked = False
+            if not isinstance(self.responsecache, str):
+                logging.warning("'responseCache' must be the path of a directory.")
+                checked = False
+            if not ConsistencyCheck.checknonnegativenumber(self.responsecachettl):
+                logging.warning("'responseCacheTTL' must be a number >= 0.")
+                checked = False
+            if not ConsistencyCheck.checknonnegativenumber(self.responsecachesize):
+                logging.warning("'responseCacheSize' must be a number >= 0.")
+                checked = False
+            if not isinstance(self.replay, bool):
+                logging.warning("'replay' must be true or false.")
+                checked = False
+            elif self.replay and not self.responsecache:
+                logging.warning("'replay' requires the 'responseCache' directory.")
+                checked = False
+            if self.querybackend not in ["sparql", "local"]:
+                logging.warning("'queryBackend' must be \"sparql\" or \"local\".")
+                checked = False
+            if self.clusteringprecision not in ["float64", "float32"]:
+                logging.warning("'clusteringPrecision' must be \"float64\" or \"float32\".")
+                checked = False
+            if self.clusteringmode not in ["exact", "unique", "histogram", "minibatch"]:
+                logging.warning("'clusteringMode' must be \"exact\", \"unique\", \"histogram\" or \"minibatch\".")
+                checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.clusteringbins):
+                logging.warning("'clusteringBins' must be a positive integer.")
+                checked = False
+            if self.clusteringbinning not in ["width", "quantile"]:
+                logging.warning("'clusteringBinning' must be \"width\" or \"quantile\".")
+                checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.clusteringbatchsize):
+                logging.warning("'clusteringBatchSize' must be a positive integer.")
+                checked = False
+            if not ConsistencyCheck.checkseeding(self):
+                logging.warning("'clusteringSeeding' must be \"random\", \"kmeans++\", \"quantile\" or a list of "
+                                "as many numbers as 'fuzzySetsLabels'.")
+                checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.clusteringrestarts):
+                logging.warning("'clusteringRestarts' must be a positive integer.")
+                checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.clusteringworkers):
+                logging.warning("'clusteringWorkers' must be a positive integer.")
+                checked = False
+            if self.clusterrange is not None and not (
+                    isinstance(self.clusterrange, list) and len(self.clusterrange) == 2 and
+                    all(ConsistencyCheck.checkpositiveinteger(c) for c in self.clusterrange) and
+                    2 <= self.clusterrange[0] <= self.clusterrange[1]):
+                logging.warning("'clusterRange' must be a list of two integers [min, max] with 2 <= min <= max.")
+                checked = False
+            if self.clusteringacceleration not in [None, "overrelaxation", "anderson"]:
+                logging.warning("'clusteringAcceleration' must be \"overrelaxation\" or \"anderson\".")
+                checked = False
+            if self.clusteringstopping not in ["membership", "centroids"]:
+                logging.warning("'clusteringStopping' must be \"membership\" or \"centroids\".")
+                checked = False
+            if not ConsistencyCheck.checkpositiveinteger(self.clusteringthreads):
+                logging.warning("'clusteringThreads' must be a positive integer.")
+                checked = False
+            if not isinstance(self.centroidstore, str):
+                logging.warning("'centroidStore' must be the path of a directory.")
+                checked = False
             return checked
         else:
             logging.warning("ERROR: the parameters in the configuration file (config.json) are not setted in the right "
@@ -139,3 +278,15 @@ class ConsistencyCheck(object):
                 logging.warning("'" + s + "' is not a number.")
                 return False
         return True
+
+    def checkpositiveinteger(value):
+        return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+    def checkseeding(self):
+        if isinstance(self.clusteringseeding, list):
+            return len(self.clusteringseeding) == len(self.fuzzysetlabels) and all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) for v in self.clusteringseeding)
+        return self.clusteringseeding in ["random", "kmeans++", "quantile"]
+
+    def checknonnegativenumber(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
@@ -0,0 +1,133 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+MAXCODE = np.iinfo(np.int32).max
+
+
+class IdentifierDictionary(object):
+    '''
+    This class interns the names of the individuals, so that every name is
+    stored once and the individuals are represented by int32 codes. The
+    ontology prefix of an IRI is stripped once, when the IRI is encoded.
+    '''
+
+    def __init__(self, names=()):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        names: the names of the first codes.
+
+        '''
+        self.names = []
+        self._codes = {}
+        for name in names:
+            self._intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def encode(self, values, strip=True):
+        '''
+        This function encodes the individuals.
+
+        :Parameters:
+        values: the IRIs (or the names) of the individuals.
+        strip: if True, the names are the part of the IRIs that follows "#".
+
+        :Returns:
+        the int32 numpy array of the codes of the individuals.
+
+        '''
+        seen = {}
+        codes = np.empty(len(values), dtype=np.int32)
+        for index, value in enumerate(values):
+            code = seen.get(value)
+            if code is None:
+                name = "" if value is None else (value.partition("#")[2] or value) if strip else value
+                code = seen[value] = self._intern(name)
+            codes[index] = code
+        return codes
+
+    def decode(self, codes):
+        '''
+        This function decodes the individuals.
+
+        :Parameters:
+        codes: the codes of the individuals.
+
+        :Returns:
+        the list of the names of the individuals.
+
+        '''
+        names = self.names
+        return [names[code] for code in np.asarray(codes).tolist()]
+
+    def code(self, name):
+        '''
+        This function returns the code of a name, or -1 if it has not been
+        encoded.
+
+        '''
+        return self._codes.get(name, -1)
+
+    def merge(self, other):
+        '''
+        This function interns the names of another dictionary.
+
+        :Parameters:
+        other: the IdentifierDictionary to merge.
+
+        :Returns:
+        the int32 numpy array that maps the codes of the other dictionary to
+        the codes of this one.
+
+        '''
+        return np.array([self._intern(name) for name in other.names], dtype=np.int32)
+
+    def subset(self, columns):
+        '''
+        This function creates a dictionary of only the individuals of some
+        columns of codes.
+
+        :Parameters:
+        columns: the dictionary of the columns of codes.
+
+        :Returns:
+        dictionary: the new IdentifierDictionary;
+        columns: the columns encoded with the new dictionary.
+
+        '''
+        arrays = [np.asarray(column, dtype=np.int32) for column in columns.values()]
+        used = np.unique(np.concatenate(arrays)) if arrays else np.zeros(0, dtype=np.int32)
+        dictionary = IdentifierDictionary(self.names[code] for code in used.tolist())
+        return dictionary, {field: np.searchsorted(used, column).astype(np.int32)
+                            for field, column in zip(columns.keys(), arrays)}
+
+    def _intern(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self.names)
+            if code > MAXCODE:
+                raise Exception("[IdentifierDictionary] ERROR: too many individuals for int32 codes.")
+            self._codes[name] = code
+            self.names.append(name)
+        return code
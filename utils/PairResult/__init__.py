@@ -0,0 +1,126 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+class PairResult(object):
+    '''
+    This class holds the typed results of the operations executed for a
+    (domain, range) pair, so that every stage can hand them over to the next
+    one without writing and parsing csv files. The individuals are held as
+    the int32 codes of an IdentifierDictionary: when the pair is pickled
+    (for the stage cache or for another process) it carries a dictionary of
+    only its own individuals.
+
+    The pair of a joint granulation holds the values of some data properties,
+    one column for each of them, and the pairs of their projections, which
+    are told apart by the tag appended to their name.
+    '''
+
+    def __init__(self, domainClass, rangeClass="", auxiliaryClass="", nameProperty=""):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        domainClass: the domain class.
+        rangeClass: the range class (blank if the operation is binary).
+        auxiliaryClass: the auxiliary class (blank if the operation is binary).
+        nameProperty: the name of the fuzzified data property.
+
+        '''
+        self.domainClass = domainClass
+        self.rangeClass = rangeClass
+        self.auxiliaryClass = auxiliaryClass
+        self.nameProperty = nameProperty
+        self.fields = []
+        self.identifiers = {}
+        self.dictionary = None
+        self.values = None
+        self.centroids = None
+        self.labels = []
+        self.memberships = None
+        self.cardinalities = {}
+        self.quantifierLabels = []
+        self.quantification = {}
+        self.properties = []
+        self.tag = ""
+        self.projections = []
+
+    def name(self):
+        '''
+        This function returns the name used for the files of the pair.
+
+        '''
+        return self.auxiliaryClass + self.domainClass + self.rangeClass + self.tag
+
+    def element(self):
+        '''
+        This function returns the class whose individuals are granulated: the
+        domain class if the operation is binary, the auxiliary class otherwise.
+
+        '''
+        return self.domainClass if (self.rangeClass == "" and self.auxiliaryClass == "") else self.auxiliaryClass
+
+    def names(self, field):
+        '''
+        This function decodes the identifiers of a field.
+
+        :Parameters:
+        field: the field of the identifiers.
+
+        :Returns:
+        the list of the names of the individuals.
+
+        '''
+        return self.dictionary.decode(self.identifiers.get(field))
+
+    def share(self, dictionary):
+        '''
+        This function encodes the identifiers with another dictionary, usually
+        the one shared by all the pairs of a process.
+
+        :Parameters:
+        dictionary: the IdentifierDictionary to use.
+
+        '''
+        if self.dictionary is not dictionary:
+            codes = dictionary.merge(self.dictionary)
+            self.identifiers = {field: codes[column] for field, column in self.identifiers.items()}
+            self.dictionary = dictionary
+        for projection in self.projections:
+            projection.share(dictionary)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.dictionary is not None:
+            state["dictionary"], state["identifiers"] = self.dictionary.subset(self.identifiers)
+        return state
+
+    def rows(self):
+        '''
+        This function rebuilds the dataset as a list of dictionaries, where
+        the keys are the fields of the dataset. It is only used to export it.
+
+        :Returns:
+        the list of dictionaries that represent the rows of the dataset.
+
+        '''
+        values = dict(zip(self.properties, self.values.T.tolist())) if self.properties else \
+            {self.nameProperty: self.values.tolist()}
+        columns = [values[field] if field in values else self.names(field) for field in self.fields]
+        return [dict(zip(self.fields, row)) for row in zip(*columns)]
@@ -17,6 +17,11 @@
 	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+from itertools import islice
+
+import numpy as np
+
+
 def convertToLD(resultset):
     '''
     This function converts the result-set in a list. Each list's row is a
@@ -37,6 +42,94 @@ def convertToLD(resultset):
     return array, keys
 
 
+def convertRowsToLD(fields, rows):
+    '''
+    This function converts the rows of a streamed result-set in a list. Each
+    list's row is a dictionary, where the keys are the fields of the
+    result-set. The rows are consumed while they arrive.
+
+    :Parameters:
+    fields: list of the fields of the result-set.
+    rows: iterator of the rows, where each row is a tuple of values.
+
+    :Returns:
+    array: list of data extracted from result-set; in each row of array
+           there is a dictionary that represents the tuples;
+           keys: list of dictionaries keys that represent the fields of tuple.
+
+    '''
+    array = [dict(zip(fields, row)) for row in rows]
+    return array, (list(fields) if array else [])
+
+
+def convertToColumns(resultset, numericFields=(), dictionary=None):
+    '''
+    This function converts the result-set in columns, one for each field,
+    without building a dictionary for each row. The columns of the numeric
+    fields are float64 numpy arrays; the other columns are numpy arrays of
+    strings, where the IRIs are reduced to the name that follows "#", or
+    int32 numpy arrays of codes if a dictionary is given.
+
+    :Parameters:
+    resultset: the result-set in JSON format.
+    numericFields: list of the fields whose values are numbers.
+    dictionary: the IdentifierDictionary that encodes the IRIs (optional).
+
+    :Returns:
+    columns: dictionary where the keys are the fields and the values are
+             the columns;
+    keys: list of the fields of the result-set (empty if there are no rows).
+
+    '''
+    result = resultset["results"]["bindings"]
+    keys = list(resultset["head"]["vars"]) if result else []
+    columns = {key: _column([row[key]["value"] if key in row else None for row in result], key in numericFields,
+                            dictionary)
+               for key in keys}
+    return columns, keys
+
+
+def convertRowsToColumns(fields, rows, numericFields=(), dictionary=None, chunkSize=65536):
+    '''
+    This function converts the rows of a streamed result-set in columns, one
+    for each field, like convertToColumns. The rows are consumed while they
+    arrive, chunkSize rows at a time, so only a chunk of rows is held in
+    memory besides the columns.
+
+    :Parameters:
+    fields: list of the fields of the result-set.
+    rows: iterator of the rows, where each row is a tuple of values.
+    numericFields: list of the fields whose values are numbers.
+    dictionary: the IdentifierDictionary that encodes the IRIs (optional).
+    chunkSize: number of rows converted at a time.
+
+    :Returns:
+    columns: dictionary where the keys are the fields and the values are
+             the columns;
+    keys: list of the fields of the result-set (empty if there are no rows).
+
+    '''
+    chunks = {field: [] for field in fields}
+    rows = iter(rows)
+    chunk = list(islice(rows, chunkSize))
+    keys = list(fields) if chunk else []
+    while chunk:
+        for field, values in zip(fields, zip(*chunk)):
+            chunks[field].append(_column(values, field in numericFields, dictionary))
+        chunk = list(islice(rows, chunkSize))
+    columns = {field: np.concatenate(chunks[field]) for field in keys}
+    return columns, keys
+
+
+def _column(values, numeric, dictionary=None):
+    if numeric:
+        # the unbound values become nan
+        return np.array(values, dtype=np.float64)
+    if dictionary is not None:
+        return dictionary.encode(values)
+    return np.array(["" if value is None else value.partition("#")[2] or value for value in values], dtype=str)
+
+
 def convertToListOfDict(resultset):
     '''
     This function converts the result-set in a list. Each list's row is a
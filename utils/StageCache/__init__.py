@@ -0,0 +1,150 @@
+"""
+	Copyright 2016 Gioele Gentile, Matteo Caliandro, Rocco Lillo, Rocco Maiullari
+
+	This file is part of GranulO.
+
+	GranulO is free software: you can redistribute it and/or modify
+	it under the terms of the GNU General Public License as published by
+	the Free Software Foundation, either version 3 of the License, or
+	(at your option) any later version.
+
+	GranulO is distributed in the hope that it will be useful,
+	but WITHOUT ANY WARRANTY; without even the implied warranty of
+	MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+	GNU General Public License for more details.
+
+	You should have received a copy of the GNU General Public License
+	along with GranulO.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+
+class StageCache(object):
+    '''
+    This class provides a persistent cache for the results of the stages.
+    Every result is stored in a file named after the hash of the inputs of
+    the stage, so that a stage whose inputs are unchanged is not executed
+    again, even by a different run.
+    '''
+
+    def __init__(self, directory):
+        '''
+        Initializes the instance of the class.
+
+        :Parameters:
+        directory: the directory where the results are stored.
+
+        '''
+        self.directory = directory
+
+    @staticmethod
+    def digest(data):
+        '''
+        This function calculates the digest of a dataset.
+
+        :Parameters:
+        data: numpy array, list, tuple, scalar or object (digested through its
+              attributes) to digest.
+
+        :Returns:
+        the hexadecimal digest of the data.
+
+        '''
+        sha = hashlib.sha256()
+        StageCache._update(sha, data)
+        return sha.hexdigest()
+
+    @staticmethod
+    def _update(sha, data):
+        if isinstance(data, np.ndarray):
+            sha.update(str((data.dtype.str, data.shape)).encode())
+            sha.update(np.ascontiguousarray(data).tobytes())
+        elif isinstance(data, (list, tuple)):
+            sha.update(("[" + str(len(data))).encode())
+            for item in data:
+                StageCache._update(sha, item)
+            sha.update(b"]")
+        elif hasattr(data, "__dict__"):
+            sha.update(("<" + type(data).__name__).encode())
+            for name in sorted(vars(data)):
+                StageCache._update(sha, (name, vars(data)[name]))
+            sha.update(b">")
+        else:
+            sha.update((type(data).__name__ + ":" + repr(data) + ";").encode())
+
+    def key(self, stage, *inputs):
+        '''
+        This function creates the key of a result of a stage.
+
+        :Parameters:
+        stage: the name of the stage.
+        inputs: the inputs of the stage.
+
+        :Returns:
+        the key of the result.
+
+        '''
+        return StageCache.digest((stage,) + inputs)
+
+    def get(self, stage, key):
+        '''
+        This function reads a result from the cache.
+
+        :Parameters:
+        stage: the name of the stage.
+        key: the key of the result.
+
+        :Returns:
+        the cached result, or None if it is missing.
+
+        '''
+        filename = self._filename(stage, key)
+        if not os.path.exists(filename):
+            return None
+        try:
+            with open(filename, "rb") as file:
+                return pickle.load(file)
+        except (EOFError, pickle.UnpicklingError):
+            return None
+
+    def contains(self, stage, key):
+        '''
+        This function checks if a result is in the cache, without reading it.
+
+        :Parameters:
+        stage: the name of the stage.
+        key: the key of the result.
+
+        :Returns:
+        True if the result is in the cache, False otherwise.
+
+        '''
+        return os.path.exists(self._filename(stage, key))
+
+    def put(self, stage, key, result):
+        '''
+        This function writes a result into the cache. The file is written
+        under a temporary name and then renamed, so that a result is never
+        read half-written.
+
+        :Parameters:
+        stage: the name of the stage.
+        key: the key of the result.
+        result: the result to store.
+
+        '''
+        filename = self._filename(stage, key)
+        if not os.path.exists(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temporary = filename + "." + str(os.getpid()) + ".tmp"
+        with open(temporary, "wb") as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, filename)
+
+    def _filename(self, stage, key):
+        return os.path.join(self.directory, stage, key + ".pkl")
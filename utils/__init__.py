@@ -18,7 +18,14 @@
 """
 
 from .CSVHandler import CSVHandler
+from .CentroidStore import CentroidStore
 from .FileHandler import FileHandler
 from .ResultSetConverter import convertToListOfDict
+from .ResultSetConverter import convertRowsToLD
+from .ResultSetConverter import convertToColumns
+from .ResultSetConverter import convertRowsToColumns
 from .ResultSetConverter import convertToMatrix
 from .ConsistencyCheck import ConsistencyCheck
+from .IdentifierDictionary import IdentifierDictionary
+from .PairResult import PairResult
+from .StageCache import StageCache